@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+#
+#  IRIS Client API Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+"""Compare the JSON backends installed on large list responses.
+
+Builds a timeline response and an alerts page similar to the ones returned by the server, then measures
+the time taken by ApiResponse to parse them and by the backends to encode a bulk request body.
+
+    python benchmarks/bench_json_backend.py --events 20000 --alerts 1000
+"""
+import argparse
+import timeit
+
+from dfir_iris_client.helper import json_backend
+from dfir_iris_client.helper.utils import ApiResponse
+
+
+def build_timeline(count: int) -> dict:
+    """Build a timeline response of count events"""
+    return {
+        'status': 'success',
+        'message': '',
+        'data': {
+            'timeline': [{
+                'event_id': index,
+                'event_title': f'Process creation {index}',
+                'event_content': 'C:\\Windows\\System32\\cmd.exe /c whoami /all ' * 4,
+                'event_raw': '{"EventID": 4688, "Channel": "Security", "Computer": "WKS-%d"}' % index,
+                'event_date': '2023-01-01T10:%02d:%02d.000000' % (index // 60 % 60, index % 60),
+                'event_tz': '+00:00',
+                'event_tags': 'edr,process',
+                'event_category_id': 5,
+                'event_in_summary': False,
+                'event_in_graph': True,
+                'event_color': None,
+                'assets': [{'asset_id': index % 50, 'asset_name': f'WKS-{index % 50}'}],
+                'iocs': [{'ioc_id': index % 20, 'ioc_value': f'10.0.0.{index % 20}'}],
+                'custom_attributes': {'Detection': {'rule': {'value': 'Suspicious recon'}}}
+            } for index in range(count)]
+        }
+    }
+
+
+def build_alerts(count: int) -> dict:
+    """Build an alerts page of count alerts"""
+    return {
+        'status': 'success',
+        'message': '',
+        'data': {
+            'total': count,
+            'alerts': [{
+                'alert_id': index,
+                'alert_title': f'Alert {index}',
+                'alert_description': 'Multiple failed logons followed by a success ' * 8,
+                'alert_source': 'SIEM',
+                'alert_source_ref': f'ref-{index}',
+                'alert_source_content': {'raw': {'fields': list(range(30))}},
+                'alert_tags': 'bruteforce,auth',
+                'iocs': [{'ioc_value': f'203.0.113.{index % 250}', 'ioc_type_id': 76}],
+                'assets': [{'asset_name': f'DC-{index % 4}', 'asset_type_id': 9}]
+            } for index in range(count)]
+        }
+    }
+
+
+def run(events: int, alerts: int, number: int) -> None:
+    """Time the parsing and encoding of the payloads with each backend"""
+    payloads = {
+        f'timeline ({events} events)': build_timeline(events),
+        f'alerts page ({alerts} alerts)': build_alerts(alerts)
+    }
+
+    for label, payload in payloads.items():
+        raw = json_backend.BACKENDS['json'].dumps(payload)
+        body = payload['data']
+        print(f'{label}: {len(raw) / 1024 / 1024:.1f} MB')
+
+        # The standard json module goes first, as the reference of the speedups
+        baseline = None
+        for name in ['json'] + [name for name in json_backend.BACKENDS if name != 'json']:
+            json_backend.set_backend(name)
+            # ApiResponse only parses the response once its data is accessed
+            parse = timeit.timeit(lambda: ApiResponse(raw).get_data(), number=number) / number
+            encode = timeit.timeit(lambda: json_backend.dumps(body), number=number) / number
+
+            if baseline is None:
+                baseline = (parse, encode)
+
+            print(f'  {name:8} parse {parse * 1000:8.1f} ms (x{baseline[0] / parse:.1f})   '
+                  f'encode {encode * 1000:8.1f} ms (x{baseline[1] / encode:.1f})')
+
+        json_backend.set_backend()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the JSON backends of the client')
+    parser.add_argument('--events', type=int, default=20000, help='Number of events of the timeline')
+    parser.add_argument('--alerts', type=int, default=1000, help='Number of alerts of the page')
+    parser.add_argument('--number', type=int, default=5, help='Number of runs of each measure')
+    args = parser.parse_args()
+
+    run(args.events, args.alerts, args.number)
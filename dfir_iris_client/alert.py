@@ -16,13 +16,24 @@
 #  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 import json
 import warnings
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Iterator, Union, Dict
 
 from requests import Response
 
-from dfir_iris_client.helper.utils import ApiResponse, ClientApiError
+from dfir_iris_client.helper.concurrency import DEFAULT_MAX_WORKERS, iter_concurrently, run_bulk, BulkResult, \
+    RateLimiter, run_concurrently
+from dfir_iris_client.helper.errors import IrisClientException
+from dfir_iris_client.helper.utils import ApiResponse, ClientApiError, assert_api_resp, get_data_from_resp, \
+    ClientApiData
 from dfir_iris_client.session import ClientSession
 
+"""MAX_IDS_URL_LENGTH
+Maximum length of the list of ids sent in the query string of a single request. Longer lists are split in
+several requests to stay below the URL length limits of the servers and proxies.
+"""
+MAX_IDS_URL_LENGTH = 1500
+
 
 class Alert(object):
     """Handles alert operations"""
@@ -46,11 +57,17 @@ class Alert(object):
         """
         return self._s.pi_get(f"alerts/{alert_id}")
 
-    def get_alerts(self, alert_ids: List[int]) -> ApiResponse:
+    def get_alerts(self, alert_ids: List[int], chunk_size: int = None,
+                   max_workers: int = DEFAULT_MAX_WORKERS) -> ApiResponse:
         """Get alerts from their ids
 
+        The ids are split in chunks small enough to fit in the URL of a request, which are fetched concurrently.
+        The alerts are merged back following the order of the provided ids. Ids not found are ignored.
+
         Args:
             alert_ids (list): Alert ids
+            chunk_size (int): Maximum number of ids per request. Default is as many as fit in MAX_IDS_URL_LENGTH
+            max_workers (int): Maximum number of concurrent requests
 
         Returns:
             ApiResponse: Response object
@@ -59,7 +76,81 @@ class Alert(object):
         if not all(isinstance(element, int) for element in alert_ids):
             return ClientApiError('Expected a list of integers for alert_ids')
 
-        return self._s.pi_get(f"alerts/filter?alert_ids={','.join(str(element) for element in alert_ids)}")
+        alerts = []
+        for resp in self._iter_alerts_chunks(alert_ids, chunk_size=chunk_size, max_workers=max_workers):
+            if resp.is_error():
+                return resp
+
+            alerts.extend(resp.get_data_field('alerts'))
+
+        return ApiResponse(ClientApiData(data={'alerts': alerts, 'total': len(alerts)}))
+
+    def iter_alerts_by_ids(self, alert_ids: List[int], chunk_size: int = None,
+                           max_workers: int = DEFAULT_MAX_WORKERS) -> Iterator[dict]:
+        """ Iterate over alerts from their ids, in the order of the provided ids. Ids not found are skipped.
+
+        Same as get_alerts, except that the alerts of a chunk are yielded as soon as the chunk and the ones
+        before it are fetched, instead of being merged in a single response.
+
+        Args:
+            alert_ids (list): Alert ids
+            chunk_size (int): Maximum number of ids per request. Default is as many as fit in MAX_IDS_URL_LENGTH
+            max_workers (int): Maximum number of concurrent requests
+
+        Returns:
+            Iterator of alerts, as dict
+        """
+        if not all(isinstance(element, int) for element in alert_ids):
+            raise IrisClientException('Expected a list of integers for alert_ids')
+
+        for resp in self._iter_alerts_chunks(alert_ids, chunk_size=chunk_size, max_workers=max_workers):
+            assert_api_resp(resp, soft_fail=False)
+            yield from resp.get_data_field('alerts')
+
+    def _iter_alerts_chunks(self, alert_ids: List[int], chunk_size: int = None,
+                            max_workers: int = DEFAULT_MAX_WORKERS) -> Iterator[ApiResponse]:
+        """ Fetch alerts by chunks of ids and yield one response per chunk, in the order of the ids.
+        The alerts of each successful response are reordered following the ids of the chunk.
+
+        Args:
+            alert_ids (list): Alert ids
+            chunk_size (int): Maximum number of ids per request
+            max_workers (int): Maximum number of concurrent requests
+
+        Returns:
+            Iterator of ApiResponse
+        """
+        alert_ids = list(dict.fromkeys(alert_ids))
+
+        chunks = []
+        chunk = []
+        chunk_length = 0
+        for alert_id in alert_ids:
+            id_length = len(str(alert_id)) + 1
+            if chunk and (chunk_length + id_length > MAX_IDS_URL_LENGTH or
+                          (chunk_size and len(chunk) >= chunk_size)):
+                chunks.append(chunk)
+                chunk = []
+                chunk_length = 0
+
+            chunk.append(alert_id)
+            chunk_length += id_length
+
+        if chunk:
+            chunks.append(chunk)
+
+        def fetch_chunk(ids: List[int]) -> ApiResponse:
+            resp = self._s.pi_get(f"alerts/filter?alert_ids={','.join(str(element) for element in ids)}"
+                                  f"&page=1&per_page={len(ids)}")
+            if resp.is_error():
+                return resp
+
+            alerts = {alert.get('alert_id'): alert for alert in resp.get_data_field('alerts')}
+            return ApiResponse(ClientApiData(data={
+                'alerts': [alerts[alert_id] for alert_id in ids if alert_id in alerts]
+            }), uri=resp.get_uri())
+
+        yield from iter_concurrently(fetch_chunk, chunks, max_workers=max_workers)
 
     def add_alert(self, alert_data: dict) -> ApiResponse:
         """Add an alert
@@ -171,8 +262,11 @@ class Alert(object):
                       alert_classification_id: int = None, alert_customer_id: int = None, alert_start_date: str = None,
                       alert_end_date: str = None, alert_assets: str = None, alert_iocs: str = None, alert_ids: str = None,
                       case_id: int = None, alert_owner_id: int = None,
-                      page: int = 1, per_page: int = 20, sort: str = 'desc') -> ApiResponse:
+                      page: int = 1, per_page: int = 20, sort: str = 'desc',
+                      stream: bool = False) -> Union[ApiResponse, Iterator[dict]]:
         """ Filter alerts
+        If stream is set, the alerts of the page are rather yielded one by one as the response is received,
+        which keeps memory low with large pages.
 
         Args:
             alert_title (str): Alert title
@@ -193,10 +287,11 @@ class Alert(object):
             page (int): Page number
             per_page (int): Number of alerts per page
             sort (str): Sort order
+            stream (bool): Iterate over the alerts without loading the whole response
 
 
         Returns:
-            ApiResponse: Response object
+            ApiResponse: Response object, or iterator of alerts if stream is set
         """
         uri = f"alerts/filter?page={page}&per_page={per_page}&sort={sort}"
         if alert_title:
@@ -244,4 +339,189 @@ class Alert(object):
         if alert_owner_id:
             uri += f"&alert_owner_id={alert_owner_id}"
 
+        if stream:
+            return self._s.pi_get_stream(uri, 'data.alerts')
+
         return self._s.pi_get(uri)
+
+    def iter_alerts(self, max_items: int = None, per_page: int = 100, prefetch: bool = True,
+                    **filters) -> Iterator[dict]:
+        """ Lazily iterate over all the alerts matching the filters, across all pages.
+
+        Pages are requested one by one with filter_alerts. While the alerts of the current page are
+        yielded, the next page is fetched in the background if prefetch is set. At most two pages are held in
+        memory, whatever the number of alerts matching the filters.
+        The iteration stops on the first empty page, or once max_items alerts have been yielded.
+
+        Args:
+            max_items (int): Maximum number of alerts to yield. Default is all alerts
+            per_page (int): Number of alerts requested per page
+            prefetch (bool): Fetch the next page while the current one is processed
+            **filters: Any filter accepted by filter_alerts, except page and per_page
+
+        Returns:
+            Iterator of alerts, as dict
+        """
+        if max_items is not None and max_items <= 0:
+            return
+
+        filters.pop('page', None)
+        filters.pop('per_page', None)
+
+        def fetch_page(page: int) -> List[dict]:
+            resp = self.filter_alerts(page=page, per_page=per_page, **filters)
+            assert_api_resp(resp, soft_fail=False)
+
+            data = get_data_from_resp(resp)
+            return data.get('alerts') if data else []
+
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        page = 1
+        yielded = 0
+
+        try:
+            pending = executor.submit(fetch_page, page) if executor else None
+
+            while True:
+                alerts = pending.result() if executor else fetch_page(page)
+                if not alerts:
+                    return
+
+                page += 1
+                if executor:
+                    if max_items is None or yielded + len(alerts) < max_items:
+                        pending = executor.submit(fetch_page, page)
+
+                    else:
+                        pending = None
+
+                for alert in alerts:
+                    yield alert
+                    yielded += 1
+
+                    if max_items is not None and yielded >= max_items:
+                        return
+
+        finally:
+            if executor:
+                executor.shutdown(wait=False)
+
+    def bulk_update_alerts(self, alert_ids: List[int], alert_data: dict, max_workers: int = DEFAULT_MAX_WORKERS,
+                           rate_limit: float = None) -> BulkResult:
+        """Update many alerts with the same data. The updates are issued concurrently.
+
+        Args:
+            alert_ids (list): Alert ids
+            alert_data (dict): Alert data applied to every alert - The data is defined in the API documentation
+            max_workers (int): Maximum number of concurrent requests
+            rate_limit (float): Maximum number of requests per second. Default is unlimited
+
+        Returns:
+            BulkResult: Outcome of each alert id
+        """
+        return run_bulk(lambda alert_id: self.update_alert(alert_id, alert_data), alert_ids,
+                        max_workers=max_workers, rate_limit=rate_limit)
+
+    def bulk_delete_alerts(self, alert_ids: List[int], max_workers: int = DEFAULT_MAX_WORKERS,
+                           rate_limit: float = None) -> BulkResult:
+        """Delete many alerts. The deletions are issued concurrently.
+
+        Args:
+            alert_ids (list): Alert ids
+            max_workers (int): Maximum number of concurrent requests
+            rate_limit (float): Maximum number of requests per second. Default is unlimited
+
+        Returns:
+            BulkResult: Outcome of each alert id
+        """
+        return run_bulk(self.delete_alert, alert_ids, max_workers=max_workers, rate_limit=rate_limit)
+
+    def bulk_escalate_alerts(self, alert_ids: List[int], escalation_note: str, case_title: str, case_tags: str,
+                             case_template_id: int = None, import_as_event: bool = False,
+                             iocs_import_list: List[str] = None, assets_import_list: List[str] = None,
+                             max_workers: int = DEFAULT_MAX_WORKERS, rate_limit: float = None) -> BulkResult:
+        """Escalate many alerts, each one into its own case. The escalations are issued concurrently.
+        The case title can reference the alert id with {alert_id}, e.g. "Escalation of alert {alert_id}".
+
+        Args:
+            alert_ids (list): Alert ids
+            escalation_note (str): Escalation note
+            case_title (str): Case title
+            case_tags (str): Case tags, a string of comma separated tags
+            case_template_id (int): Case template id
+            import_as_event (bool): Import as event
+            iocs_import_list (list): List of IOCs UUID to import from each alert
+            assets_import_list (list): List of assets UUIDs to import from each alert
+            max_workers (int): Maximum number of concurrent requests
+            rate_limit (float): Maximum number of requests per second. Default is unlimited
+
+        Returns:
+            BulkResult: Outcome of each alert id
+        """
+        def escalate(alert_id: int) -> ApiResponse:
+            return self.escalate_alert(alert_id, iocs_import_list=iocs_import_list or [],
+                                       assets_import_list=assets_import_list or [],
+                                       escalation_note=escalation_note,
+                                       case_title=case_title.replace('{alert_id}', str(alert_id)),
+                                       case_tags=case_tags, case_template_id=case_template_id,
+                                       import_as_event=import_as_event)
+
+        return run_bulk(escalate, alert_ids, max_workers=max_workers, rate_limit=rate_limit)
+
+    def bulk_merge_alerts(self, alert_ids: List[int], target_case_id: Union[int, Dict[int, int]], merge_note: str,
+                          import_as_event: bool = False, iocs_import_list: List[str] = None,
+                          assets_import_list: List[str] = None, max_workers: int = DEFAULT_MAX_WORKERS,
+                          rate_limit: float = None) -> BulkResult:
+        """Merge many alerts into cases.
+
+        Merges into the same case all write to that case, and would only contend with each other on the server
+        if issued at the same time. They are therefore issued one after the other, while the merges into
+        different cases are issued concurrently.
+
+        Args:
+            alert_ids (list): Alert ids
+            target_case_id (int or dict): Target case id of all the alerts, or dict of alert id to target case id
+            merge_note (str): Merge note
+            import_as_event (bool): Import as event
+            iocs_import_list (list): List of IOCs UUID to import from each alert
+            assets_import_list (list): List of assets UUIDs to import from each alert
+            max_workers (int): Maximum number of concurrent requests
+            rate_limit (float): Maximum number of requests per second. Default is unlimited
+
+        Returns:
+            BulkResult: Outcome of each alert id
+        """
+        alert_ids = list(dict.fromkeys(alert_ids))
+        rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+        results = {}
+
+        by_case = {}
+        for alert_id in alert_ids:
+            case_id = target_case_id.get(alert_id) if isinstance(target_case_id, dict) else target_case_id
+            if case_id is None:
+                results[alert_id] = ClientApiError(msg=f'No target case provided for alert #{alert_id}')
+                continue
+
+            by_case.setdefault(case_id, []).append(alert_id)
+
+        def merge_into_case(case_id: int) -> Dict[int, Union[ApiResponse, Exception]]:
+            case_results = {}
+            for alert_id in by_case[case_id]:
+                try:
+                    if rate_limiter:
+                        rate_limiter.acquire()
+
+                    case_results[alert_id] = self.merge_alert(alert_id, target_case_id=case_id,
+                                                              iocs_import_list=iocs_import_list or [],
+                                                              assets_import_list=assets_import_list or [],
+                                                              merge_note=merge_note, import_as_event=import_as_event)
+
+                except Exception as e:
+                    case_results[alert_id] = e
+
+            return case_results
+
+        for case_results in run_concurrently(merge_into_case, by_case, max_workers=max_workers):
+            results.update(case_results)
+
+        return BulkResult({alert_id: results[alert_id] for alert_id in alert_ids})
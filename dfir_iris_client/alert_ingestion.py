@@ -0,0 +1,402 @@
+#  IRIS Client API Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import json
+import logging as logger
+import queue
+import threading
+import time
+from typing import Callable, TextIO
+
+import requests
+
+from dfir_iris_client.alert import Alert
+from dfir_iris_client.helper.alert_dedup import AlertDeduplicator
+from dfir_iris_client.helper.errors import IrisClientException
+from dfir_iris_client.helper.utils import ApiResponse
+from dfir_iris_client.session import ClientSession
+
+log = logger.getLogger(__name__)
+
+# HTTP status codes of the replies retried as transient failures
+RETRY_STATUS_CODES = frozenset([429, 502, 503, 504])
+
+
+class AlertIngestionPipeline(object):
+    """Hands off alerts to a pool of submitters calling Alert.add_alert in the background.
+
+    Alerts are pushed in a bounded in-memory queue, either one by one with submit or from a JSONL stream with
+    feed_jsonl. When the queue is full, the callers are blocked until room is made (backpressure), or the alert
+    is rejected if they asked not to block.
+    If a deduplicator is provided, duplicate alerts are dropped before being queued.
+    Transient failures (connection errors, timeouts, server side errors, and replies with a status code in
+    RETRY_STATUS_CODES, such as throttling) are retried. Alerts refused by the server are not retried.
+
+    Example:
+        with AlertIngestionPipeline(session, workers=8) as pipeline:
+            for alert in detector.alerts():
+                pipeline.submit(alert)
+
+        print(pipeline.get_stats())
+    """
+
+    def __init__(self, session: ClientSession, queue_size: int = 10000, workers: int = 4, max_retries: int = 3,
+                 retry_delay: float = 1.0, on_result: Callable[[dict, ApiResponse], None] = None,
+                 on_error: Callable[[dict, Exception], None] = None, deduplicator: AlertDeduplicator = None):
+        """
+        Init the pipeline. The submitters are not started until start is called or the pipeline is used as a
+        context manager.
+
+        Args:
+            session: Client session to use for the requests
+            queue_size: Maximum number of alerts waiting to be submitted
+            workers: Number of submitters running concurrently
+            max_retries: Number of retries of an alert after a transient failure
+            retry_delay: Delay in seconds before the first retry. It is doubled on each retry
+            on_result: Called with the alert data and the ApiResponse once the server replied
+            on_error: Called with the alert data and the exception once all retries failed
+            deduplicator: Drop the duplicate alerts before they are queued
+        """
+        if workers < 1:
+            raise ValueError('At least one worker is needed')
+
+        self._alert = Alert(session)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._workers_count = workers
+        self._max_retries = max_retries
+        self._retry_delay = retry_delay
+        self._on_result = on_result
+        self._on_error = on_error
+        self._deduplicator = deduplicator
+
+        self._workers = []
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'submitted': 0,
+            'rejected': 0,
+            'deduplicated': 0,
+            'succeeded': 0,
+            'failed': 0,
+            'errors': 0,
+            'retried': 0,
+            'total_latency': 0.0,
+            'max_latency': 0.0,
+            'total_request_time': 0.0
+        }
+        self._started_at = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop(wait=True)
+
+    def start(self) -> None:
+        """Start the submitters. Does nothing if they are already running
+
+        Args:
+
+        Returns:
+            None
+        """
+        if self._workers:
+            return
+
+        self._started_at = time.monotonic()
+        for index in range(self._workers_count):
+            worker = threading.Thread(target=self._run, name=f'iris-alert-submitter-{index}', daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def stop(self, wait: bool = True) -> None:
+        """Stop the submitters. If wait is set, the alerts remaining in the queue are submitted before returning.
+        Otherwise, the submitters are stopped as soon as their current alert is done and the queued alerts
+        are dropped.
+
+        Args:
+            wait: Drain the queue before stopping
+
+        Returns:
+            None
+        """
+        if not self._workers:
+            return
+
+        # Producers may keep the queue full, so the stop signals are never queued by a blocking call
+        pending = len(self._workers)
+        while pending:
+            if not wait:
+                pending += self._drain()
+
+            try:
+                self._queue.put(None, timeout=0.1)
+
+            except queue.Full:
+                continue
+
+            pending -= 1
+
+        for worker in self._workers:
+            worker.join()
+
+        self._workers = []
+
+    def join(self) -> None:
+        """Block until all the alerts submitted so far are processed
+
+        Args:
+
+        Returns:
+            None
+        """
+        self._queue.join()
+
+    def submit(self, alert_data: dict, block: bool = True, timeout: float = None) -> bool:
+        """Queue an alert for submission. If the queue is full, the call blocks until room is made, unless
+        block is unset, in which case the alert is rejected.
+        Duplicate alerts are accepted but dropped without being queued. An alert is only recorded by the
+        deduplicator once the server accepted it.
+
+        Args:
+            alert_data: Alert data - The data is defined in the API documentation
+            block: Wait for room in the queue if it is full
+            timeout: Maximum time to wait for room in the queue, in seconds
+
+        Returns:
+            True if the alert was accepted, False if it was rejected
+        """
+        if not isinstance(alert_data, dict):
+            raise IrisClientException(f'Expected a dict for alert_data but got {type(alert_data)}')
+
+        fingerprint = None
+        if self._deduplicator:
+            fingerprint = self._deduplicator.fingerprint(alert_data)
+            if self._deduplicator.check(alert_data, fingerprint=fingerprint, record=False):
+                self._count('deduplicated')
+                return True
+
+        try:
+            self._queue.put((alert_data, time.monotonic(), fingerprint), block=block, timeout=timeout)
+
+        except queue.Full:
+            self._settle(fingerprint, sent=False)
+            self._count('rejected')
+            return False
+
+        self._count('submitted')
+        return True
+
+    def feed_jsonl(self, stream: TextIO, block: bool = True, timeout: float = None) -> int:
+        """Queue every alert read from a JSONL stream, one alert per line. Empty lines are ignored and invalid
+        lines are logged and skipped.
+
+        Args:
+            stream: Text stream to read, such as an opened file or sys.stdin
+            block: Wait for room in the queue if it is full
+            timeout: Maximum time to wait for room in the queue for each alert, in seconds
+
+        Returns:
+            Number of alerts accepted
+        """
+        accepted = 0
+        for line_number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                alert_data = json.loads(line)
+
+            except ValueError as e:
+                log.error(f'Invalid alert on line {line_number}. {e}')
+                self._count('rejected')
+                continue
+
+            if self.submit(alert_data, block=block, timeout=timeout):
+                accepted += 1
+
+        return accepted
+
+    def get_stats(self) -> dict:
+        """Return the throughput and latency counters of the pipeline.
+        Latencies are in seconds and measured from the submission of the alert to the reply of the server.
+
+        Args:
+
+        Returns:
+            dict
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+
+        done = stats['succeeded'] + stats['errors'] + stats['failed']
+        total_latency = stats.pop('total_latency')
+        total_request_time = stats.pop('total_request_time')
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+
+        stats['queued'] = self._queue.qsize()
+        stats['avg_latency'] = total_latency / done if done else 0.0
+        stats['avg_request_time'] = total_request_time / done if done else 0.0
+        stats['throughput'] = done / elapsed if elapsed else 0.0
+
+        return stats
+
+    def _count(self, counter: str, value: float = 1) -> None:
+        """Increment a counter of the stats
+
+        Args:
+            counter: Name of the counter
+            value: Value to add
+
+        Returns:
+            None
+        """
+        with self._stats_lock:
+            self._stats[counter] += value
+
+    def _drain(self) -> int:
+        """Drop all the alerts waiting in the queue
+
+        Returns:
+            Number of stop signals dropped along with the alerts
+        """
+        signals = 0
+        while True:
+            try:
+                item = self._queue.get_nowait()
+
+            except queue.Empty:
+                return signals
+
+            if item is None:
+                signals += 1
+            else:
+                self._settle(item[2], sent=False)
+
+            self._queue.task_done()
+
+    def _settle(self, fingerprint: str, sent: bool) -> None:
+        """Record an alert reserved by the deduplicator if it was sent, otherwise release it
+
+        Args:
+            fingerprint: Fingerprint of the alert, None if there is no deduplicator
+            sent: Whether the server accepted the alert
+
+        Returns:
+            None
+        """
+        if fingerprint is None:
+            return
+
+        if sent:
+            self._deduplicator.record(fingerprint)
+        else:
+            self._deduplicator.release(fingerprint)
+
+    def _run(self) -> None:
+        """Main loop of a submitter"""
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+
+                alert_data, queued_at, fingerprint = item
+                self._process(alert_data, queued_at, fingerprint)
+
+            except Exception as e:
+                # No-op if the alert was recorded before the error
+                self._settle(item[2], sent=False)
+                log.exception(f'Unexpected error in alert submitter. {e}')
+
+            finally:
+                self._queue.task_done()
+
+    def _process(self, alert_data: dict, queued_at: float, fingerprint: str = None) -> None:
+        """Submit an alert and retry it on transient failures, or when the server replied with a status code in
+        RETRY_STATUS_CODES
+
+        Args:
+            alert_data: Alert data
+            queued_at: Monotonic time at which the alert was queued
+            fingerprint: Fingerprint of the alert reserved by the deduplicator, if any
+
+        Returns:
+            None
+        """
+        delay = self._retry_delay
+        attempt = 0
+
+        while True:
+            request_start = time.monotonic()
+            try:
+                resp = self._alert.add_alert(alert_data)
+
+            except (IrisClientException, requests.exceptions.RequestException) as e:
+                if attempt < self._max_retries:
+                    attempt += 1
+                    self._count('retried')
+                    log.warning(f'Transient failure while submitting alert, retry {attempt}/{self._max_retries}. {e}')
+                    time.sleep(delay)
+                    delay *= 2
+                    continue
+
+                log.error(f'Unable to submit alert after {attempt} retries. {e}')
+                self._record_done('failed', queued_at, request_start)
+                self._settle(fingerprint, sent=False)
+                if self._on_error:
+                    self._on_error(alert_data, e)
+                return
+
+            if resp.is_error() and resp.get_status_code() in RETRY_STATUS_CODES and attempt < self._max_retries:
+                attempt += 1
+                self._count('retried')
+                log.warning(f'Server replied {resp.get_status_code()} while submitting alert, '
+                            f'retry {attempt}/{self._max_retries}')
+                time.sleep(delay)
+                delay *= 2
+                continue
+
+            self._record_done('succeeded' if resp.is_success() else 'errors', queued_at, request_start)
+            self._settle(fingerprint, sent=resp.is_success())
+            if resp.is_error():
+                log.error(f'Alert refused by server. {resp.get_msg()}')
+
+            if self._on_result:
+                self._on_result(alert_data, resp)
+            return
+
+    def _record_done(self, counter: str, queued_at: float, request_start: float) -> None:
+        """Update the counters once an alert is done
+
+        Args:
+            counter: Outcome counter to increment
+            queued_at: Monotonic time at which the alert was queued
+            request_start: Monotonic time at which the last request was issued
+
+        Returns:
+            None
+        """
+        now = time.monotonic()
+        latency = now - queued_at
+
+        with self._stats_lock:
+            self._stats[counter] += 1
+            self._stats['total_latency'] += latency
+            self._stats['total_request_time'] += now - request_start
+            if latency > self._stats['max_latency']:
+                self._stats['max_latency'] = latency
@@ -27,9 +27,12 @@ from dfir_iris_client.session import ClientSession
 from dfir_iris_client.customer import Customer
 from dfir_iris_client.admin import AdminHelper
 from dfir_iris_client.helper.assets_type import AssetTypeHelper
+from dfir_iris_client.helper.case_context import CaseContext, PRELOAD_PARTS
+from dfir_iris_client.helper.concurrency import DEFAULT_MAX_WORKERS, run_concurrently
 from dfir_iris_client.helper.analysis_status import AnalysisStatusHelper
 from dfir_iris_client.helper.compromise_status import CompromiseStatusHelper
 from dfir_iris_client.helper.errors import IrisClientException
+from dfir_iris_client.helper.fan_out import CaseQuery
 from dfir_iris_client.helper.ioc_types import IocTypeHelper
 from dfir_iris_client.helper.events_categories import EventCategoryHelper
 from dfir_iris_client.helper.task_status import TaskStatusHelper
@@ -37,7 +40,7 @@ from dfir_iris_client.users import User
 from dfir_iris_client.helper.tlps import TlpHelper
 from dfir_iris_client.helper.utils import ClientApiError, ApiResponse, get_data_from_resp
 
-from typing import Union, List, BinaryIO
+from typing import Union, List, BinaryIO, Iterator, Callable
 import datetime
 import urllib.parse
 
@@ -387,6 +390,77 @@ class Case(object):
 
         return cid
 
+    def preload(self, cid: int = None, parts: List[str] = None,
+                max_workers: int = DEFAULT_MAX_WORKERS) -> CaseContext:
+        """Fetch the collections of a case concurrently, and return them indexed in a CaseContext, so that the
+        lookups and validations of a playbook run locally afterwards. The responses also fill the response cache
+        of the session, if it has one.
+        Parts which fail to be fetched are reported in the errors of the context rather than raised.
+
+        Args:
+          cid: Case ID
+          parts: Parts to fetch, among summary, assets, iocs, events, tasks, evidences, notes and datastore.
+                 Default is all of them
+          max_workers: Maximum number of concurrent requests
+
+        Returns:
+          CaseContext
+        """
+        cid = self._assert_cid(cid)
+
+        parts = list(dict.fromkeys(parts)) if parts is not None else list(PRELOAD_PARTS)
+        unknown = [part for part in parts if part not in PRELOAD_PARTS]
+        if unknown:
+            raise IrisClientException(f'Unknown parts {unknown}. Expected some of {list(PRELOAD_PARTS)}')
+
+        responses = run_concurrently(lambda part: getattr(self, PRELOAD_PARTS[part])(cid=cid), parts,
+                                     max_workers=max_workers, return_exceptions=True)
+
+        return CaseContext(cid, dict(zip(parts, responses)))
+
+    def query_cases(self, part: str, cids: List[int] = None, where: Callable[[dict], bool] = None,
+                    fields: List[str] = None, case_where: Callable[[dict], bool] = None,
+                    max_workers: int = DEFAULT_MAX_WORKERS) -> CaseQuery:
+        """Query a part of many cases concurrently, such as their IOCs or assets. The records are filtered and
+        projected as they are received, and yielded tagged with the ID of their case under the key cid.
+        Cases which fail to be queried are reported in the errors of the query rather than raised. See CaseQuery.
+
+        Args:
+          part: Part to query in each case, among assets, iocs, events, tasks, evidences and notes
+          cids: IDs of the cases to query. Default is all the cases
+          where: Keep only the records for which this returns True
+          fields: Keep only these fields of the records
+          case_where: Keep only the cases for which this returns True, given the cases as listed by list_cases
+          max_workers: Maximum number of cases queried concurrently
+
+        Returns:
+          CaseQuery, to iterate over the records
+        """
+        cids = self.select_cases(cids=cids, case_where=case_where)
+
+        return CaseQuery(self, part, cids, where=where, fields=fields, max_workers=max_workers)
+
+    def select_cases(self, cids: List[int] = None, case_where: Callable[[dict], bool] = None) -> List[int]:
+        """Return the IDs of the cases matching a condition. The cases are listed only if needed.
+
+        Args:
+          cids: IDs of the cases to select from. Default is all the cases
+          case_where: Keep only the cases for which this returns True, given the cases as listed by list_cases
+
+        Returns:
+          List of case IDs
+        """
+        if cids is not None and case_where is None:
+            return list(cids)
+
+        resp = self.list_cases()
+        if resp.is_error():
+            raise IrisClientException(f'Unable to list the cases. {resp.get_msg()}')
+
+        selected = set(cids) if cids is not None else None
+        return [case.get('case_id') for case in resp.iter_data()
+                if (selected is None or case.get('case_id') in selected) and (case_where is None or case_where(case))]
+
     def get_summary(self, cid: int = None) -> ApiResponse:
         """
         Returns the summary of the specified case id.
@@ -770,19 +844,24 @@ class Case(object):
 
         return self._s.pi_post(f'dim/hooks/call', data=body)
 
-    def list_assets(self, cid: int = None) -> ApiResponse:
+    def list_assets(self, cid: int = None, stream: bool = False) -> Union[ApiResponse, Iterator[dict]]:
         """
         Returns a list of all assets of the target case.
+        If stream is set, the assets are rather yielded one by one as the response is received.
 
         Args:
           cid: int - Case ID
+          stream: Iterate over the assets without loading the whole response
 
         Returns:
-          APIResponse
+          APIResponse, or iterator of assets if stream is set
 
         """
         cid = self._assert_cid(cid)
 
+        if stream:
+            return self._s.pi_get_stream('case/assets/list', 'data.assets', cid=cid)
+
         return self._s.pi_get('case/assets/list', cid=cid)
 
     def add_asset(self, name: str, asset_type: Union[str, int], analysis_status: Union[str, int],
@@ -1041,19 +1120,24 @@ class Case(object):
 
         return self._s.pi_post(f'case/assets/delete/{asset_id}', cid=cid)
 
-    def list_iocs(self, cid: int = None) -> ApiResponse:
+    def list_iocs(self, cid: int = None, stream: bool = False) -> Union[ApiResponse, Iterator[dict]]:
         """
         Returns a list of all iocs of the target case.
+        If stream is set, the iocs are rather yielded one by one as the response is received.
 
         Args:
           cid: Case ID
+          stream: Iterate over the iocs without loading the whole response
 
         Returns:
-          APIResponse
+          APIResponse, or iterator of iocs if stream is set
 
         """
         cid = self._assert_cid(cid)
 
+        if stream:
+            return self._s.pi_get_stream('case/ioc/list', 'data.ioc', cid=cid)
+
         return self._s.pi_get('case/ioc/list', cid=cid)
 
     def add_ioc(self, value: str, ioc_type: Union[str, int], description: str = None,
@@ -1244,21 +1328,28 @@ class Case(object):
 
         return self._s.pi_get(f'case/timeline/events/{event_id}', cid=cid)
 
-    def list_events(self, filter_by_asset: int = 0, cid: int = None) -> ApiResponse:
+    def list_events(self, filter_by_asset: int = 0, cid: int = None,
+                    stream: bool = False) -> Union[ApiResponse, Iterator[dict]]:
         """
         Returns a list of events from the timeline. filter_by_asset can be used to return only the events
         linked to a specific asset. In case the asset doesn't exist, an empty timeline is returned.
+        If stream is set, the events are rather yielded one by one as the response is received.
 
         Args:
           filter_by_asset: Select the timeline of a specific asset by setting an existing asset ID
           cid: Case ID
+          stream: Iterate over the events without loading the whole response
 
         Returns:
-          APIResponse object
+          APIResponse object, or iterator of events if stream is set
 
         """
         cid = self._assert_cid(cid)
 
+        if stream:
+            return self._s.pi_get_stream(f'case/timeline/events/list/filter/{filter_by_asset}', 'data.timeline',
+                                         cid=cid)
+
         return self._s.pi_get(f'case/timeline/events/list/filter/{filter_by_asset}', cid=cid)
 
     def filter_events(self, filter_str: dict = None, cid: int = None) -> ApiResponse:
@@ -1965,19 +2056,25 @@ class Case(object):
 
         return self._s.pi_post(f'global/tasks/delete/{task_id}', cid=1)
 
-    def list_ds_tree(self, cid: int = None) -> ApiResponse:
+    def list_ds_tree(self, cid: int = None, stream: bool = False) -> Union[ApiResponse, Iterator[tuple]]:
         """
         Returns the tree of the Datastore
+        If stream is set, the root nodes of the tree are rather yielded one by one as (node ID, node) pairs,
+        as the response is received.
 
         Args:
           cid: Case ID
+          stream: Iterate over the root nodes without loading the whole response
 
         Returns:
-          APIResponse object
+          APIResponse object, or iterator of (node ID, node) if stream is set
 
         """
         cid = self._assert_cid(cid)
 
+        if stream:
+            return self._s.pi_get_stream(f'datastore/list/tree', 'data', cid=cid, pairs=True)
+
         return self._s.pi_get(f'datastore/list/tree', cid=cid)
 
     def add_ds_file(self, parent_id: int, file_stream: BinaryIO, filename: str, file_description: str,
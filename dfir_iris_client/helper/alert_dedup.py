@@ -0,0 +1,431 @@
+#  IRIS Client API Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import base64
+import hashlib
+import json
+import logging as logger
+import math
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Union
+
+from dfir_iris_client.helper.utils import ApiResponse, ClientApiData
+
+log = logger.getLogger(__name__)
+
+"""DEFAULT_FINGERPRINT_FIELDS
+Alert fields used by default to fingerprint an alert.
+"""
+DEFAULT_FINGERPRINT_FIELDS = ['alert_source', 'alert_source_ref', 'alert_title', 'iocs', 'assets']
+
+"""LIST_FIELDS_VALUES
+For fields holding a list of objects, the key of the objects used in the fingerprint.
+"""
+LIST_FIELDS_VALUES = {
+    'iocs': 'ioc_value',
+    'assets': 'asset_name'
+}
+
+"""_live_deduplicators
+Deduplicators alive in the process, whose locks and reservations are reset in the child processes after a fork.
+"""
+_live_deduplicators = weakref.WeakSet()
+
+
+class BloomFilter(object):
+    """Minimal bloom filter over fingerprints digests. It answers whether a digest was possibly added before,
+    with a false positive rate bounded by the parameters given at init, and never gives false negatives.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001, bits: bytes = None):
+        """
+        Args:
+            capacity: Number of digests expected to be added
+            error_rate: Expected false positive rate once capacity is reached
+            bits: Restore the filter from a previous state
+        """
+        self._size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self._hashes = max(1, int(round(self._size / capacity * math.log(2))))
+        self._bits = bytearray(bits) if bits and len(bits) == (self._size + 7) // 8 else \
+            bytearray((self._size + 7) // 8)
+
+    def _positions(self, digest: bytes):
+        """Derive the bit positions of a digest by double hashing"""
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:16], 'little') | 1
+        return ((h1 + i * h2) % self._size for i in range(self._hashes))
+
+    def add(self, digest: bytes) -> None:
+        """Add a digest to the filter"""
+        for position in self._positions(digest):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, digest: bytes) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(digest))
+
+    def to_bytes(self) -> bytes:
+        """Return the raw bits of the filter"""
+        return bytes(self._bits)
+
+
+class AlertDeduplicator(object):
+    """Drops duplicate alerts client-side, before they reach Alert.add_alert.
+
+    Alerts are fingerprinted on a configurable set of fields. The fingerprints seen within the time window are kept
+    in a size-bounded LRU, which also counts how many times each alert fired. Fingerprints evicted from the LRU
+    are still remembered by a pair of rotating bloom filters covering the window, so that memory stays bounded
+    whatever the volume of alerts.
+
+    The state can be persisted to a file, so that duplicates are still detected across restarts.
+
+    Example:
+        dedup = AlertDeduplicator(window=3600, path='/var/lib/detector/iris_dedup.json')
+        alert = Alert(session)
+        for alert_data in detector.alerts():
+            dedup.add_alert(alert, alert_data)
+        dedup.save()
+    """
+
+    def __init__(self, fields: List[str] = None, window: float = 3600, max_entries: int = 100000,
+                 bloom_capacity: int = 1000000, bloom_error_rate: float = 0.001, path: Union[str, Path] = None):
+        """
+        Args:
+            fields: Alert fields used to fingerprint alerts. Default is DEFAULT_FINGERPRINT_FIELDS
+            window: Time window in seconds during which an identical alert is considered a duplicate
+            max_entries: Maximum number of fingerprints kept in the LRU
+            bloom_capacity: Number of fingerprints each bloom filter is sized for
+            bloom_error_rate: False positive rate of the bloom filters once their capacity is reached
+            path: File where the state is persisted. It is loaded at init if it exists
+        """
+        if window <= 0:
+            raise ValueError('window must be a positive number of seconds')
+
+        self._fields = list(fields) if fields else list(DEFAULT_FINGERPRINT_FIELDS)
+        self._window = window
+        self._max_entries = max_entries
+        self._bloom_capacity = bloom_capacity
+        self._bloom_error_rate = bloom_error_rate
+        self._path = Path(path) if path else None
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._pending = {}
+        _live_deduplicators.add(self)
+        self._bloom_current = BloomFilter(bloom_capacity, bloom_error_rate)
+        self._bloom_previous = BloomFilter(bloom_capacity, bloom_error_rate)
+        self._bloom_started_at = time.time()
+        self._stats = {
+            'unique': 0,
+            'duplicates': 0
+        }
+
+        if self._path and self._path.exists():
+            self.load()
+
+    def fingerprint(self, alert_data: dict) -> str:
+        """Compute the fingerprint of an alert from the configured fields.
+        List fields such as iocs and assets are reduced to their sorted values, so that the order of the
+        IOCs or assets in the alert does not matter.
+
+        Args:
+            alert_data: Alert data
+
+        Returns:
+            Fingerprint as hex str
+        """
+        parts = []
+        for field in self._fields:
+            value = alert_data.get(field)
+
+            if field in LIST_FIELDS_VALUES and isinstance(value, list):
+                key = LIST_FIELDS_VALUES[field]
+                value = sorted(str(item.get(key)) if isinstance(item, dict) else str(item) for item in value)
+
+            parts.append(value)
+
+        canonical = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def check(self, alert_data: dict, fingerprint: str = None, record: bool = True) -> bool:
+        """Return whether an alert is a duplicate of an alert seen within the window, and count it.
+
+        A new alert is recorded right away unless record is unset. It is then only reserved until it is either
+        recorded with record, once it has been sent, or released with release if it could not be sent, so that an
+        alert which never reached the server is not seen as a duplicate afterwards. Concurrent checks of a reserved
+        alert see it as a duplicate.
+
+        Args:
+            alert_data: Alert data
+            fingerprint: Fingerprint of the alert, if already computed. See fingerprint
+            record: Record a new alert right away rather than reserving it
+
+        Returns:
+            True if the alert is a duplicate, otherwise False
+        """
+        fingerprint = fingerprint or self.fingerprint(alert_data)
+        digest = bytes.fromhex(fingerprint)
+        now = time.time()
+
+        with self._lock:
+            self._rotate_blooms(now)
+
+            entry = self._entries.get(fingerprint)
+            if entry is not None and now - entry[0] <= self._window:
+                entry[1] = now
+                entry[2] += 1
+                self._entries.move_to_end(fingerprint)
+                self._stats['duplicates'] += 1
+                return True
+
+            if fingerprint in self._pending:
+                self._pending[fingerprint] += 1
+                self._stats['duplicates'] += 1
+                return True
+
+            # Only fingerprints evicted from the LRU rely on the bloom filters. Expired ones are known to be new.
+            # The first occurrence of an evicted fingerprint is unknown, so it is not brought back in the LRU.
+            if entry is None and (digest in self._bloom_current or digest in self._bloom_previous):
+                self._stats['duplicates'] += 1
+                return True
+
+            self._stats['unique'] += 1
+            self._entries.pop(fingerprint, None)
+            if record:
+                self._record(fingerprint, digest, now, 1)
+            else:
+                self._pending[fingerprint] = 1
+
+            return False
+
+    def record(self, fingerprint: str) -> None:
+        """Record an alert reserved by check once it has been sent
+
+        Args:
+            fingerprint: Fingerprint of the alert
+
+        Returns:
+            None
+        """
+        now = time.time()
+        with self._lock:
+            self._record(fingerprint, bytes.fromhex(fingerprint), now, self._pending.pop(fingerprint, 1))
+
+    def release(self, fingerprint: str) -> None:
+        """Forget an alert reserved by check which could not be sent, so that it is seen as new again
+
+        Args:
+            fingerprint: Fingerprint of the alert
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._pending.pop(fingerprint, None)
+
+    def duplicate_count(self, alert_data: dict, fingerprint: str = None) -> int:
+        """Return how many times an alert fired within the window, as far as the LRU remembers it.
+
+        Args:
+            alert_data: Alert data
+            fingerprint: Fingerprint of the alert, if already computed. See fingerprint
+
+        Returns:
+            Number of occurrences, 0 if the alert is unknown
+        """
+        fingerprint = fingerprint or self.fingerprint(alert_data)
+        with self._lock:
+            if fingerprint in self._pending:
+                return self._pending[fingerprint]
+
+            entry = self._entries.get(fingerprint)
+            if entry is None or time.time() - entry[0] > self._window:
+                return 0
+
+            return entry[2]
+
+    def add_alert(self, alert, alert_data: dict) -> ApiResponse:
+        """Add an alert through the provided Alert helper, unless it is a duplicate. Duplicates are not sent to
+        the server and a client-side success response is returned instead. The alert is only recorded once the
+        server accepted it.
+
+        Args:
+            alert: Alert helper used to add the alert
+            alert_data: Alert data - The data is defined in the API documentation
+
+        Returns:
+            ApiResponse object
+        """
+        fingerprint = self.fingerprint(alert_data)
+        if self.check(alert_data, fingerprint=fingerprint, record=False):
+            return ApiResponse(ClientApiData(message='Duplicate alert dropped client-side',
+                                             data={
+                                                 'duplicate': True,
+                                                 'fingerprint': fingerprint,
+                                                 'count': self.duplicate_count(alert_data, fingerprint=fingerprint)
+                                             }))
+
+        try:
+            resp = alert.add_alert(alert_data)
+
+        except Exception:
+            self.release(fingerprint)
+            raise
+
+        if resp.is_success():
+            self.record(fingerprint)
+        else:
+            self.release(fingerprint)
+
+        return resp
+
+    def get_stats(self) -> dict:
+        """Return the number of unique and duplicate alerts seen, and the number of fingerprints in the LRU
+
+        Args:
+
+        Returns:
+            dict
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+
+        return stats
+
+    def save(self, path: Union[str, Path] = None) -> None:
+        """Persist the state of the deduplicator. The file is written atomically.
+
+        Args:
+            path: File to write. Default is the path provided at init
+
+        Returns:
+            None
+        """
+        path = Path(path) if path else self._path
+        if not path:
+            raise ValueError('No path provided to save the deduplicator state')
+
+        with self._lock:
+            state = {
+                'fields': self._fields,
+                'window': self._window,
+                'bloom_started_at': self._bloom_started_at,
+                'bloom_current': base64.b64encode(self._bloom_current.to_bytes()).decode('ascii'),
+                'bloom_previous': base64.b64encode(self._bloom_previous.to_bytes()).decode('ascii'),
+                'entries': [[fingerprint] + entry for fingerprint, entry in self._entries.items()]
+            }
+
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+
+        os.replace(tmp_path, path)
+
+    def load(self, path: Union[str, Path] = None) -> None:
+        """Restore a state previously saved. Fingerprints out of the window are ignored. The state is ignored if it
+        was saved with a different set of fields.
+
+        Args:
+            path: File to read. Default is the path provided at init
+
+        Returns:
+            None
+        """
+        path = Path(path) if path else self._path
+        try:
+            with open(path) as f:
+                state = json.load(f)
+
+        except (OSError, ValueError) as e:
+            log.warning(f'Unable to load deduplicator state from {path}. {e}')
+            return
+
+        if state.get('fields') != self._fields:
+            log.warning(f'Deduplicator state in {path} uses different fields. Ignoring it')
+            return
+
+        now = time.time()
+        with self._lock:
+            self._bloom_started_at = state.get('bloom_started_at', now)
+            self._bloom_current = BloomFilter(self._bloom_capacity, self._bloom_error_rate,
+                                              base64.b64decode(state.get('bloom_current', '')))
+            self._bloom_previous = BloomFilter(self._bloom_capacity, self._bloom_error_rate,
+                                               base64.b64decode(state.get('bloom_previous', '')))
+            self._rotate_blooms(now)
+
+            self._entries.clear()
+            for fingerprint, first_seen, last_seen, count in state.get('entries', [])[-self._max_entries:]:
+                if now - first_seen <= self._window:
+                    self._entries[fingerprint] = [first_seen, last_seen, count]
+
+    def _record(self, fingerprint: str, digest: bytes, now: float, count: int) -> None:
+        """Remember a new fingerprint in the LRU and the bloom filters. Expects the lock to be held.
+
+        Args:
+            fingerprint: Fingerprint of the alert
+            digest: Fingerprint as bytes
+            now: Current time
+            count: Number of occurrences seen so far
+
+        Returns:
+            None
+        """
+        self._bloom_current.add(digest)
+        self._entries.pop(fingerprint, None)
+        self._entries[fingerprint] = [now, now, count]
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def _rotate_blooms(self, now: float) -> None:
+        """Rotate the bloom filters once the current one covers a full window. A fingerprint is therefore remembered
+        between one and two windows by the bloom filters. Expects the lock to be held.
+
+        Args:
+            now: Current time
+
+        Returns:
+            None
+        """
+        elapsed = now - self._bloom_started_at
+        if elapsed < self._window:
+            return
+
+        if elapsed < 2 * self._window:
+            self._bloom_previous = self._bloom_current
+
+        else:
+            self._bloom_previous = BloomFilter(self._bloom_capacity, self._bloom_error_rate)
+
+        self._bloom_current = BloomFilter(self._bloom_capacity, self._bloom_error_rate)
+        self._bloom_started_at = now
+
+
+def _reset_after_fork() -> None:
+    """Replace the locks of the deduplicators inherited by a forked child, and drop the reservations of the alerts
+    being added by the threads of the parent, which do not exist in the child and would never settle them
+    """
+    for deduplicator in list(_live_deduplicators):
+        deduplicator._lock = threading.Lock()
+        deduplicator._pending = {}
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,231 @@
+#  IRIS Client API Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+from typing import Any, Dict, Iterable, List, Union
+
+from dfir_iris_client.helper.utils import ApiResponse
+
+"""PRELOAD_PARTS
+Parts of a case fetched by Case.preload, with the Case method fetching each of them.
+"""
+PRELOAD_PARTS = {
+    'summary': 'get_summary',
+    'assets': 'list_assets',
+    'iocs': 'list_iocs',
+    'events': 'list_events',
+    'tasks': 'list_tasks',
+    'evidences': 'list_evidences',
+    'notes': 'list_notes_directories',
+    'datastore': 'list_ds_tree'
+}
+
+"""PART_LIST_FIELDS
+Field of the data of each part holding its records, None if the data is the records itself.
+"""
+PART_LIST_FIELDS = {
+    'assets': 'assets',
+    'iocs': 'ioc',
+    'events': 'timeline',
+    'tasks': 'tasks',
+    'evidences': 'evidences',
+    'notes': None
+}
+
+
+class CaseContext(object):
+    """Snapshot of the collections of a case fetched at once by Case.preload, indexed for local lookups.
+    Assets are indexed by name, IOCs by value and notes by path, the path of a note being the names of its
+    directories and its title joined by slashes, such as Investigation/Host triage/Timeline.
+
+    The parts which could not be fetched are reported in errors, and their data is empty.
+
+    Example:
+        context = case.preload(cid=1, parts=['assets', 'iocs'])
+        asset_id = context.asset_id('DC01')
+        missing = context.missing_iocs(['10.0.0.1', 'evil.com'])
+    """
+
+    def __init__(self, cid: int, responses: Dict[str, Union[ApiResponse, Exception]]):
+        """
+        Args:
+            cid: Case ID
+            responses: Dict of part name to the ApiResponse fetched for it, or the exception raised
+        """
+        self.cid = cid
+        self.responses = {}
+        self.errors = {}
+
+        for part, response in responses.items():
+            if isinstance(response, ApiResponse) and response.is_success():
+                self.responses[part] = response
+
+            else:
+                self.errors[part] = response.get_msg() if hasattr(response, 'get_msg') else str(response)
+
+        self.asset_ids = {asset.get('asset_name'): asset.get('asset_id') for asset in self.records('assets')}
+        self.ioc_ids = {}
+        for ioc in self.records('iocs'):
+            self.ioc_ids.setdefault(ioc.get('ioc_value'), ioc.get('ioc_id'))
+
+        self.note_ids = _index_notes(self.records('notes'))
+
+    def __repr__(self):
+        return f'<CaseContext cid={self.cid} parts={sorted(self.responses)} errors={sorted(self.errors)}>'
+
+    def is_complete(self) -> bool:
+        """True if every part requested was fetched"""
+        return not self.errors
+
+    def data(self, part: str) -> Any:
+        """Return the data of a part, or None if it was not fetched
+
+        Args:
+          part: Name of the part. See PRELOAD_PARTS
+
+        Returns:
+          Data of the response of the part
+        """
+        response = self.responses.get(part)
+        return response.get_data() if response is not None else None
+
+    def records(self, part: str) -> List[dict]:
+        """Return the records of a collection part, such as the assets or the events
+
+        Args:
+          part: Name of the part. See PRELOAD_PARTS
+
+        Returns:
+          List of records, empty if the part was not fetched
+        """
+        data = self.data(part)
+        field = PART_LIST_FIELDS.get(part)
+        if field is not None:
+            data = data.get(field) if isinstance(data, dict) else None
+
+        return data if isinstance(data, list) else []
+
+    @property
+    def summary(self) -> Union[dict, None]:
+        """Summary of the case"""
+        return self.data('summary')
+
+    @property
+    def assets(self) -> List[dict]:
+        """Assets of the case"""
+        return self.records('assets')
+
+    @property
+    def iocs(self) -> List[dict]:
+        """IOCs of the case"""
+        return self.records('iocs')
+
+    @property
+    def events(self) -> List[dict]:
+        """Events of the timeline of the case"""
+        return self.records('events')
+
+    @property
+    def tasks(self) -> List[dict]:
+        """Tasks of the case"""
+        return self.records('tasks')
+
+    @property
+    def evidences(self) -> List[dict]:
+        """Evidences of the case"""
+        return self.records('evidences')
+
+    @property
+    def notes_directories(self) -> List[dict]:
+        """Notes directories of the case"""
+        return self.records('notes')
+
+    @property
+    def ds_tree(self) -> Union[dict, None]:
+        """Tree of the datastore of the case"""
+        return self.data('datastore')
+
+    def asset_id(self, name: str) -> Union[int, None]:
+        """Return the ID of an asset from its name, or None if the case has no such asset"""
+        return self.asset_ids.get(name)
+
+    def ioc_id(self, value: str) -> Union[int, None]:
+        """Return the ID of an IOC from its value, or None if the case has no such IOC"""
+        return self.ioc_ids.get(value)
+
+    def note_id(self, path: str) -> Union[int, None]:
+        """Return the ID of a note from its path, or None if the case has no such note"""
+        return self.note_ids.get(path.strip('/'))
+
+    def missing_assets(self, names: Iterable[str]) -> List[str]:
+        """Return the names of the assets the case does not have"""
+        return [name for name in names if name not in self.asset_ids]
+
+    def missing_iocs(self, values: Iterable[str]) -> List[str]:
+        """Return the values of the IOCs the case does not have"""
+        return [value for value in values if value not in self.ioc_ids]
+
+
+def _index_notes(directories: List[dict]) -> Dict[str, int]:
+    """Index the notes of the directories by path. Directories are either listed flat with their parent_id,
+    or nested in the subdirectories of their parent.
+
+    Args:
+      directories: Notes directories, as returned by list_notes_directories
+
+    Returns:
+      Dict of note path to note ID
+    """
+    by_id = {}
+    parents = {}
+
+    def collect(directory: dict, parent_id: Any) -> None:
+        directory_id = directory.get('id')
+        if directory_id not in by_id or directory.get('notes'):
+            by_id[directory_id] = directory
+
+        parent_id = directory.get('parent_id') or parent_id
+        if parent_id is not None or directory_id not in parents:
+            parents[directory_id] = parent_id
+
+        for subdirectory in directory.get('subdirectories') or []:
+            if isinstance(subdirectory, dict):
+                collect(subdirectory, directory_id)
+
+    for directory in directories:
+        collect(directory, None)
+
+    paths = {}
+
+    def path_of(directory_id: Any) -> str:
+        if directory_id not in paths:
+            names = []
+            current = directory_id
+            while current in by_id and len(names) <= len(by_id):
+                names.append(by_id[current].get('name') or '')
+                current = parents.get(current)
+
+            paths[directory_id] = '/'.join(reversed(names))
+
+        return paths[directory_id]
+
+    note_ids = {}
+    for directory_id, directory in by_id.items():
+        directory_path = path_of(directory_id)
+        for note in directory.get('notes') or []:
+            title = note.get('title', note.get('note_title'))
+            note_ids[f'{directory_path}/{title}'] = note.get('id', note.get('note_id'))
+
+    return note_ids
@@ -0,0 +1,311 @@
+#  IRIS Client API Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import hashlib
+import logging as logger
+from collections import Counter
+from typing import Any, Callable, Dict, List, Tuple
+
+from dfir_iris_client.helper.case_context import PART_LIST_FIELDS, PRELOAD_PARTS
+from dfir_iris_client.helper.concurrency import DEFAULT_MAX_WORKERS, iter_concurrently
+from dfir_iris_client.helper.errors import IrisClientException
+from dfir_iris_client.helper.task_status import TaskStatusHelper
+from dfir_iris_client.helper.utils import ApiResponse
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+log = logger.getLogger(__name__)
+
+"""STATISTICS_PARTS
+Parts of the cases fetched to compute their statistics.
+"""
+STATISTICS_PARTS = ('tasks', 'iocs', 'assets', 'events')
+
+"""CLOSED_TASK_STATUSES
+Statuses of the tasks which are not counted as open.
+"""
+CLOSED_TASK_STATUSES = frozenset(['Done', 'Canceled'])
+
+"""COMPROMISED_STATUS_ID
+Compromise status of the compromised assets.
+"""
+COMPROMISED_STATUS_ID = 1
+
+"""_ISO_PREFIXES
+Length of the prefix of an ISO 8601 date identifying its period, by histogram interval.
+"""
+_ISO_PREFIXES = {'Y': 4, 'M': 7, 'D': 10, 'h': 13}
+
+
+class CaseStatistics(object):
+    """Statistics of a single case, with the hash of the content they were computed from.
+
+    The statistics are counters, by name:
+        - counts: number of tasks, open_tasks, iocs, assets, compromised_assets and events
+        - tasks_by_status: number of tasks by status name
+        - iocs_by_type: number of IOCs by type name
+        - iocs_by_tlp: number of IOCs by TLP name
+        - events_per_period: number of events by period of the histogram interval, such as 2023-01-31 for days
+    """
+
+    __slots__ = ('cid', 'digest', 'counters')
+
+    def __init__(self, cid: int, digest: bytes, counters: Dict[str, Counter]):
+        """
+        Args:
+            cid: Case ID
+            digest: Hash of the responses the statistics were computed from
+            counters: Dict of statistic name to Counter
+        """
+        self.cid = cid
+        self.digest = digest
+        self.counters = counters
+
+    def __repr__(self):
+        return f'<CaseStatistics cid={self.cid} counts={dict(self.counters.get("counts", {}))}>'
+
+
+class StatisticsAggregator(object):
+    """Aggregates the statistics of many cases, such as their open tasks, IOCs by type and TLP, compromised assets
+    and volume of events over time.
+
+    The cases are fetched concurrently with the list methods of Case. The statistics of each case are kept along
+    with a hash of the responses they were computed from: when refreshed, a case whose responses did not change is
+    neither parsed nor computed again. The totals are updated incrementally, by removing the former statistics of
+    the cases which changed and adding their new ones.
+
+    Example:
+        aggregator = StatisticsAggregator(Case(session))
+        totals = aggregator.refresh(case_where=lambda c: not c['case_close_date'])
+        print(totals['counts']['open_tasks'], totals['iocs_by_tlp'])
+
+        totals = aggregator.refresh(case_where=lambda c: not c['case_close_date'])
+        print(aggregator.last_refresh)
+    """
+
+    def __init__(self, case, interval: str = 'D', max_workers: int = DEFAULT_MAX_WORKERS):
+        """
+        Args:
+            case: Case instance issuing the requests
+            interval: Period of the histogram of the events - Y, M, D or h
+            max_workers: Maximum number of cases fetched concurrently
+        """
+        if interval not in _ISO_PREFIXES:
+            raise IrisClientException(f'Unknown interval {interval}. Expected one of {list(_ISO_PREFIXES)}')
+
+        self._case = case
+        self._interval = interval
+        self._max_workers = max_workers
+
+        self.per_case = {}
+        self.errors = {}
+        self.last_refresh = {}
+        self._totals = {}
+        self._task_statuses = None
+
+    def __repr__(self):
+        return f'<StatisticsAggregator cases={len(self.per_case)} errors={len(self.errors)}>'
+
+    @property
+    def totals(self) -> Dict[str, Counter]:
+        """Statistics summed over all the cases, as a dict of statistic name to Counter. See CaseStatistics"""
+        return {name: Counter(counter) for name, counter in self._totals.items()}
+
+    def refresh(self, cids: List[int] = None, case_where: Callable[[dict], bool] = None) -> Dict[str, Counter]:
+        """Fetch the cases and update the statistics of the ones which changed since the last refresh.
+        Cases which are no longer selected are removed from the totals. Cases which fail to be fetched keep their
+        former statistics, if any, and are reported in errors.
+
+        Args:
+          cids: IDs of the cases. Default is all the cases
+          case_where: Keep only the cases for which this returns True, given the cases as listed by list_cases
+
+        Returns:
+          Totals, see totals
+        """
+        cids = self._case.select_cases(cids=cids, case_where=case_where)
+        report = {'cases': len(cids), 'recomputed': 0, 'unchanged': 0, 'failed': 0, 'removed': 0}
+        self.errors = {}
+
+        for cid in set(self.per_case) - set(cids):
+            self._remove(self.per_case.pop(cid))
+            report['removed'] += 1
+
+        outcomes = iter_concurrently(self._fetch, cids, max_workers=self._max_workers, return_exceptions=True)
+        for cid, outcome in zip(cids, outcomes):
+            if isinstance(outcome, Exception):
+                log.warning(f'Unable to fetch the statistics of case {cid}. {outcome}')
+                self.errors[cid] = str(outcome)
+                report['failed'] += 1
+                continue
+
+            statistics, changed = outcome
+            if not changed:
+                report['unchanged'] += 1
+                continue
+
+            previous = self.per_case.get(cid)
+            if previous is not None:
+                self._remove(previous)
+
+            self.per_case[cid] = statistics
+            self._add(statistics)
+            report['recomputed'] += 1
+
+        self.last_refresh = report
+        return self.totals
+
+    def _fetch(self, cid: int) -> Tuple[CaseStatistics, bool]:
+        """Fetch a case and compute its statistics if its content changed
+
+        Args:
+          cid: Case ID
+
+        Returns:
+          (CaseStatistics, whether they were computed again)
+        """
+        responses = {}
+        for part in STATISTICS_PARTS:
+            resp = getattr(self._case, PRELOAD_PARTS[part])(cid=cid)
+            if resp.is_error():
+                raise IrisClientException(f'Unable to fetch the {part}. {resp.get_msg()}')
+
+            responses[part] = resp
+
+        digest = hashlib.blake2b(self._interval.encode('utf-8'), digest_size=16)
+        for part in STATISTICS_PARTS:
+            digest.update(responses[part].get_digest())
+
+        digest = digest.digest()
+        previous = self.per_case.get(cid)
+        if previous is not None and previous.digest == digest:
+            return previous, False
+
+        task_statuses = None
+        if any(task.get('status_name') is None for task in responses['tasks'].iter_data(PART_LIST_FIELDS['tasks'])):
+            task_statuses = self._get_task_statuses()
+
+        return CaseStatistics(cid, digest, compute_counters(responses, self._interval, task_statuses)), True
+
+    def _get_task_statuses(self) -> Dict[Any, str]:
+        """Return the names of the task statuses by ID, fetched on first use"""
+        if self._task_statuses is None:
+            resp = TaskStatusHelper(self._case._s).list_task_status_types()
+            if resp.is_error():
+                raise IrisClientException(f'Unable to fetch the task statuses. {resp.get_msg()}')
+
+            self._task_statuses = {status.get('id'): status.get('status_name') for status in resp.get_data()}
+
+        return self._task_statuses
+
+    def _add(self, statistics: CaseStatistics) -> None:
+        """Add the statistics of a case to the totals"""
+        for name, counter in statistics.counters.items():
+            self._totals.setdefault(name, Counter()).update(counter)
+
+    def _remove(self, statistics: CaseStatistics) -> None:
+        """Remove the statistics of a case from the totals, dropping the keys left at zero"""
+        for name, counter in statistics.counters.items():
+            total = self._totals.get(name)
+            if total is None:
+                continue
+
+            total.subtract(counter)
+            for key in [key for key in counter if total[key] <= 0]:
+                del total[key]
+
+
+def compute_counters(responses: Dict[str, ApiResponse], interval: str = 'D',
+                     task_statuses: Dict[Any, str] = None) -> Dict[str, Counter]:
+    """Compute the statistics of a case from the responses of its list methods. See CaseStatistics.
+
+    Args:
+      responses: Dict of part name to ApiResponse, for the parts in STATISTICS_PARTS
+      interval: Period of the histogram of the events - Y, M, D or h
+      task_statuses: Names of the task statuses by ID, for the tasks listed without status_name
+
+    Returns:
+      Dict of statistic name to Counter
+    """
+    def records(part: str) -> list:
+        return list(responses[part].iter_data(PART_LIST_FIELDS[part]))
+
+    def status_name(task: dict) -> str:
+        name = task.get('status_name')
+        if name is None:
+            name = (task_statuses or {}).get(task.get('task_status_id'))
+
+        if name is None:
+            raise IrisClientException(f'Unknown status {task.get("task_status_id")} of task {task.get("task_id")}. '
+                                      f'Provide the names of the task statuses')
+
+        return name
+
+    tasks = records('tasks')
+    iocs = records('iocs')
+    assets = records('assets')
+    events = records('events')
+
+    tasks_by_status = Counter(status_name(task) for task in tasks)
+    compromised = sum(1 for asset in assets if asset.get('asset_compromise_status_id') == COMPROMISED_STATUS_ID or
+                      asset.get('asset_compromised') is True)
+
+    counts = Counter({
+        'tasks': len(tasks),
+        'open_tasks': sum(count for status, count in tasks_by_status.items() if status not in CLOSED_TASK_STATUSES),
+        'iocs': len(iocs),
+        'assets': len(assets),
+        'compromised_assets': compromised,
+        'events': len(events)
+    })
+
+    return {
+        'counts': counts,
+        'tasks_by_status': tasks_by_status,
+        'iocs_by_type': Counter(ioc.get('ioc_type', ioc.get('ioc_type_id')) for ioc in iocs),
+        'iocs_by_tlp': Counter(ioc.get('tlp_name', ioc.get('ioc_tlp_id')) for ioc in iocs),
+        'events_per_period': event_histogram([event.get('event_date') for event in events], interval)
+    }
+
+
+def event_histogram(dates: List[str], interval: str = 'D') -> Counter:
+    """Count ISO 8601 dates by period. The dates are binned at once by numpy if it is installed.
+
+    Args:
+      dates: Dates as ISO 8601 strings. Missing dates are ignored
+      interval: Period of the histogram - Y, M, D or h
+
+    Returns:
+      Counter of period, such as 2023-01-31 for days, to number of dates
+    """
+    dates = [date for date in dates if date]
+    if not dates:
+        return Counter()
+
+    if numpy is not None:
+        try:
+            periods, counts = numpy.unique(numpy.array(dates, dtype='datetime64[us]').astype(f'datetime64[{interval}]'),
+                                           return_counts=True)
+            return Counter(dict(zip(numpy.datetime_as_string(periods).tolist(), counts.tolist())))
+
+        except ValueError:
+            pass
+
+    length = _ISO_PREFIXES[interval]
+    return Counter(date[:length] for date in dates)
@@ -0,0 +1,232 @@
+#  IRIS Client API Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import contextvars
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Union, Any
+
+"""DEFAULT_MAX_WORKERS
+Default number of requests issued concurrently by the helpers fanning out requests.
+"""
+DEFAULT_MAX_WORKERS = 8
+
+"""_live_rate_limiters
+Rate limiters alive in the process, whose locks are replaced in the child processes after a fork.
+"""
+_live_rate_limiters = weakref.WeakSet()
+
+
+class RateLimiter(object):
+    """Thread-safe token bucket limiting the rate at which calls are made.
+    Each call to acquire consumes a token, and blocks until one is available.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Args:
+            rate: Maximum number of calls per second
+            burst: Number of calls that can be made at once before the rate applies
+        """
+        if rate <= 0:
+            raise ValueError('rate must be a positive number of calls per second')
+
+        self._rate = rate
+        self._burst = max(1, burst)
+        self._tokens = float(self._burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+        _live_rate_limiters.add(self)
+
+    def acquire(self) -> None:
+        """Wait until a call can be made
+
+        Args:
+
+        Returns:
+            None
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self._burst, self._tokens + (now - self._last) * self._rate)
+                self._last = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                wait = (1 - self._tokens) / self._rate
+
+            time.sleep(wait)
+
+
+class BulkResult(object):
+    """Outcome report of an operation applied to many objects. It maps each object ID to the ApiResponse returned
+    for it, or to the exception raised while processing it.
+    """
+
+    def __init__(self, results: dict = None):
+        """
+        Args:
+            results: Dict of object ID to ApiResponse or Exception
+        """
+        self.results = results if results is not None else {}
+
+    def __bool__(self):
+        return self.is_success()
+
+    def __len__(self):
+        return len(self.results)
+
+    def __iter__(self):
+        return iter(self.results.items())
+
+    def __repr__(self):
+        return f'<BulkResult succeeded={len(self.succeeded())} failed={len(self.failed())}>'
+
+    def is_success(self) -> bool:
+        """True if every object succeeded"""
+        return not self.failed()
+
+    def succeeded(self) -> List:
+        """List of the IDs which succeeded"""
+        return [object_id for object_id, result in self.results.items() if _is_success(result)]
+
+    def failed(self) -> List:
+        """List of the IDs which failed, either refused by the server or because of an exception"""
+        return [object_id for object_id, result in self.results.items() if not _is_success(result)]
+
+    def get(self, object_id: Any) -> Union[Any, Exception, None]:
+        """Return the ApiResponse or exception of an object ID"""
+        return self.results.get(object_id)
+
+    def errors(self) -> dict:
+        """Dict of the failed IDs to a printable reason of the failure"""
+        errors = {}
+        for object_id in self.failed():
+            result = self.results[object_id]
+            errors[object_id] = result.get_msg() if hasattr(result, 'get_msg') else str(result)
+
+        return errors
+
+
+def _reset_after_fork() -> None:
+    """Replace the locks of the rate limiters inherited by a forked child, which may have been held by threads
+    which do not exist in it
+    """
+    for rate_limiter in list(_live_rate_limiters):
+        rate_limiter._lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _is_success(result) -> bool:
+    """Tell whether a result of a bulk operation is a success"""
+    return not isinstance(result, Exception) and result is not None and result.is_success()
+
+
+def iter_concurrently(func: Callable, items: Iterable, max_workers: int = DEFAULT_MAX_WORKERS,
+                      return_exceptions: bool = False, rate_limiter: RateLimiter = None) -> Iterator:
+    """Call func on each item from a pool of threads and yield the results in the order of the items.
+    The calls run in a copy of the context of the caller at the time of this call, so that the session set with
+    use_session applies to them even if the results are consumed outside of its block.
+
+    Args:
+      func: Callable taking one item
+      items: Items to process
+      max_workers: Maximum number of concurrent calls
+      return_exceptions: Yield the exceptions raised by func instead of raising them
+      rate_limiter: Limit the rate of the calls
+
+    Returns:
+      Iterator of results
+    """
+    return _iter_concurrently(func, list(items), contextvars.copy_context(), max_workers, return_exceptions,
+                              rate_limiter)
+
+
+def _iter_concurrently(func: Callable, items: list, context: contextvars.Context, max_workers: int,
+                       return_exceptions: bool, rate_limiter: RateLimiter) -> Iterator:
+    """Yield the results of iter_concurrently, running each call in a copy of context"""
+    if not items:
+        return
+
+    def call(item):
+        try:
+            if rate_limiter:
+                rate_limiter.acquire()
+
+            return context.copy().run(func, item)
+
+        except Exception as e:
+            if return_exceptions:
+                return e
+            raise
+
+    if max_workers <= 1 or len(items) == 1:
+        for item in items:
+            yield call(item)
+        return
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        yield from executor.map(call, items)
+
+
+def run_concurrently(func: Callable, items: Iterable, max_workers: int = DEFAULT_MAX_WORKERS,
+                     return_exceptions: bool = False, rate_limiter: RateLimiter = None) -> List:
+    """Call func on each item from a pool of threads and return the results in the order of the items.
+
+    Args:
+      func: Callable taking one item
+      items: Items to process
+      max_workers: Maximum number of concurrent calls
+      return_exceptions: Return the exceptions raised by func instead of raising them
+      rate_limiter: Limit the rate of the calls
+
+    Returns:
+      List of results
+    """
+    return list(iter_concurrently(func, items, max_workers=max_workers, return_exceptions=return_exceptions,
+                                  rate_limiter=rate_limiter))
+
+
+def run_bulk(func: Callable, object_ids: Iterable, max_workers: int = DEFAULT_MAX_WORKERS,
+             rate_limit: float = None) -> BulkResult:
+    """Call func on each object ID concurrently and collect the outcome of each of them.
+    Exceptions raised by func are caught and reported in the result.
+
+    Args:
+      func: Callable taking an object ID and returning an ApiResponse
+      object_ids: IDs of the objects to process. Duplicates are processed once
+      max_workers: Maximum number of concurrent calls
+      rate_limit: Maximum number of calls per second. Default is unlimited
+
+    Returns:
+      BulkResult
+    """
+    object_ids = list(dict.fromkeys(object_ids))
+    rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+
+    results = run_concurrently(func, object_ids, max_workers=max_workers, return_exceptions=True,
+                               rate_limiter=rate_limiter)
+
+    return BulkResult(dict(zip(object_ids, results)))
@@ -0,0 +1,183 @@
+#  IRIS Client API Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import contextvars
+import logging as logger
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, List
+
+from dfir_iris_client.helper.case_context import PART_LIST_FIELDS, PRELOAD_PARTS
+from dfir_iris_client.helper.concurrency import DEFAULT_MAX_WORKERS
+from dfir_iris_client.helper.errors import IrisClientException
+
+log = logger.getLogger(__name__)
+
+"""STREAMED_PARTS
+Parts whose records are streamed as the responses are received rather than parsed at once.
+"""
+STREAMED_PARTS = frozenset(['assets', 'iocs', 'events'])
+
+_DONE = object()
+
+
+class _WhereFailure(object):
+    """Exception raised by the where callback of a query, handed over to the caller"""
+
+    __slots__ = ('error',)
+
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+class CaseQuery(object):
+    """Query running over many cases at once. The records of a part, such as the IOCs, are fetched for each case
+    concurrently, filtered and projected locally as they are received, and yielded as soon as they are available,
+    each tagged with the ID of its case under the key cid. Records of different cases are thus interleaved.
+
+    A case which can not be queried, because of a timeout or a lack of permission for instance, does not stop the
+    query: it is reported in errors, which is complete once the iteration is over. The results of a case listed
+    in errors may be partial: when a case fails midway, such as while its records are streamed, the records
+    yielded before the failure are kept.
+
+    Exceptions raised by where are not errors of the cases. They stop the query and are raised to the caller.
+
+    Example:
+        query = case.query_cases('iocs', where=lambda ioc: ioc['ioc_type'] == 'ip-dst',
+                                 fields=['ioc_value', 'ioc_tlp'],
+                                 case_where=lambda c: c['client_name'] == 'ACME' and not c['case_close_date'])
+        for ioc in query:
+            print(ioc['cid'], ioc['ioc_value'])
+
+        print(query.errors)
+    """
+
+    def __init__(self, case, part: str, cids: Iterable[int], where: Callable[[dict], bool] = None,
+                 fields: List[str] = None, max_workers: int = DEFAULT_MAX_WORKERS, buffer_size: int = 1024):
+        """
+        Args:
+            case: Case instance issuing the requests
+            part: Part to query in each case, among assets, iocs, events, tasks, evidences and notes
+            cids: IDs of the cases to query
+            where: Keep only the records for which this returns True. Default is all the records
+            fields: Keep only these fields of the records. Default is all of them
+            max_workers: Maximum number of cases queried concurrently
+            buffer_size: Maximum number of records received and not yet consumed
+        """
+        if part not in PART_LIST_FIELDS:
+            raise IrisClientException(f'Unknown part {part}. Expected one of {list(PART_LIST_FIELDS)}')
+
+        self._case = case
+        self._part = part
+        self._where = where
+        self._fields = list(fields) if fields is not None else None
+        self._max_workers = max_workers
+        self._buffer_size = buffer_size
+
+        self.cids = list(dict.fromkeys(cids))
+        self.errors = {}
+
+    def __repr__(self):
+        return f'<CaseQuery part={self._part} cases={len(self.cids)} errors={len(self.errors)}>'
+
+    def __iter__(self) -> Iterator[dict]:
+        self.errors = {}
+        if not self.cids:
+            return
+
+        records = queue.Queue(maxsize=self._buffer_size)
+        stop = threading.Event()
+        context = contextvars.copy_context()
+
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    records.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+
+            return False
+
+        def query_case(cid: int) -> None:
+            case_records = None
+            try:
+                case_records = self._records(cid)
+                for record in case_records:
+                    if self._where is not None:
+                        try:
+                            keep = self._where(record)
+                        except Exception as e:
+                            put(_WhereFailure(e))
+                            return
+
+                        if not keep:
+                            continue
+
+                    if not put(self._project(record, cid)):
+                        return
+
+            except Exception as e:
+                log.warning(f'Unable to query case {cid}. {e}')
+                self.errors[cid] = str(e)
+
+            finally:
+                if hasattr(case_records, 'close'):
+                    case_records.close()
+
+                put(_DONE)
+
+        executor = ThreadPoolExecutor(max_workers=min(self._max_workers, len(self.cids)))
+        try:
+            for cid in self.cids:
+                executor.submit(context.copy().run, query_case, cid)
+
+            pending = len(self.cids)
+            while pending:
+                item = records.get()
+                if item is _DONE:
+                    pending -= 1
+                elif isinstance(item, _WhereFailure):
+                    raise item.error
+                else:
+                    yield item
+
+        finally:
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _records(self, cid: int) -> Iterator[dict]:
+        """Return the records of the part in a case, streamed if the part supports it"""
+        method = getattr(self._case, PRELOAD_PARTS[self._part])
+        if self._part in STREAMED_PARTS:
+            return method(cid=cid, stream=True)
+
+        resp = method(cid=cid)
+        if resp.is_error():
+            raise IrisClientException(f'Server replied {resp.get_status()}. {resp.get_msg()}')
+
+        return resp.iter_data(PART_LIST_FIELDS[self._part])
+
+    def _project(self, record: dict, cid: int) -> dict:
+        """Keep the selected fields of a record and tag it with its case ID"""
+        if self._fields is None:
+            projected = dict(record)
+        else:
+            projected = {field: record.get(field) for field in self._fields}
+
+        projected['cid'] = cid
+        return projected
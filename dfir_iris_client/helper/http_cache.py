@@ -0,0 +1,386 @@
+#  IRIS Client API Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import fnmatch
+import hashlib
+import logging as logger
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Union
+
+from requests import Response
+
+from dfir_iris_client.helper import json_backend
+from dfir_iris_client.helper.utils import ApiResponse
+
+log = logger.getLogger(__name__)
+
+
+class CacheEntry(object):
+    """Response of a GET request kept by the ConditionalCache, with its validators"""
+
+    __slots__ = ('etag', 'last_modified', 'digest', 'body', 'api_response')
+
+    def __init__(self, etag: str, last_modified: str, digest: bytes, body: bytes, api_response: ApiResponse = None):
+        """
+        Args:
+            etag: ETag header sent by the server, if any
+            last_modified: Last-Modified header sent by the server, if any
+            digest: Hash of the body
+            body: Raw body of the response
+            api_response: ApiResponse built from the body, parsed once and shared by all the hits
+        """
+        self.etag = etag
+        self.last_modified = last_modified
+        self.digest = digest
+        self.body = body
+        self.api_response = api_response
+
+    def get_api_response(self, uri: str) -> ApiResponse:
+        """Return the ApiResponse of the entry, building it from the body if it was loaded from disk"""
+        if self.api_response is None:
+            self.api_response = ApiResponse(self.body, uri=uri, digest=self.digest)
+
+        return self.api_response
+
+
+class ConditionalCache(object):
+    """Cache of the GET responses of a session, revalidated with the server on each request as per HTTP semantics.
+
+    The validators of the responses, ETag and Last-Modified, are sent back in If-None-Match and If-Modified-Since,
+    and a 304 Not Modified reply is served from the cache. The server does not send validators for every endpoint,
+    in which case the body is downloaded again but hashed: if it did not change, the response parsed the previous
+    time is returned instead of parsing it again.
+
+    The entries are kept in memory in least recently used order, bounded in number and in size. They can also be
+    written to a directory, so that they survive the process and are shared with the other processes using it.
+    The directory is bounded as well, the files written first being removed first. The files written by other
+    processes are accounted for when the cache is created.
+
+    The files hold the raw responses of the server, which are not encrypted. They are readable by the user running
+    the process only, and the directory is created likewise if it does not exist. The endpoints returning
+    sensitive data can be excluded with no_store, in which case their responses are neither kept in memory nor
+    written to disk.
+
+    The ApiResponses served from the cache are shared by all the requests of the same URL, and their data should
+    not be modified.
+
+    Example:
+        session = ClientSession(apikey=apikey, host=host, http_cache=ConditionalCache(directory='~/.iris_cache',
+                                                                                     no_store=['manage/users/*']))
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024,
+                 directory: Union[str, Path] = None, max_disk_entries: int = 4096,
+                 max_disk_bytes: int = 256 * 1024 * 1024, no_store: List[str] = None):
+        """
+        Args:
+            max_entries: Maximum number of responses kept in memory
+            max_bytes: Maximum total size of the bodies kept in memory
+            directory: Directory where the responses are also stored. Default is memory only
+            max_disk_entries: Maximum number of responses stored in the directory
+            max_disk_bytes: Maximum total size of the files of the directory
+            no_store: Patterns of the endpoint paths whose responses are never cached, as understood by fnmatch,
+                      such as manage/users/*
+        """
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._directory = Path(directory).expanduser() if directory else None
+        self._max_disk_entries = max_disk_entries
+        self._max_disk_bytes = max_disk_bytes
+        self._no_store = list(no_store or [])
+        if self._directory is not None:
+            self._directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+        self._init_process_state()
+
+    def _init_process_state(self) -> None:
+        """Init the entries, counters and lock of the cache, and index the files of the directory"""
+        self._entries = OrderedDict()
+        self._size = 0
+        self._stats = {'not_modified': 0, 'unchanged': 0, 'changed': 0, 'stored': 0}
+        self._lock = threading.Lock()
+        self._files = OrderedDict()
+        self._disk_size = 0
+        self._stored_uris = {}
+
+        if self._directory is not None:
+            self._index_files()
+
+    def __getstate__(self) -> dict:
+        """Pickle the cache as its configuration only. The responses on disk remain available to the copy"""
+        return {'max_entries': self._max_entries, 'max_bytes': self._max_bytes, 'directory': self._directory,
+                'max_disk_entries': self._max_disk_entries, 'max_disk_bytes': self._max_disk_bytes,
+                'no_store': self._no_store}
+
+    def __setstate__(self, state: dict) -> None:
+        self._max_entries = state['max_entries']
+        self._max_bytes = state['max_bytes']
+        self._directory = state['directory']
+        self._max_disk_entries = state.get('max_disk_entries', 4096)
+        self._max_disk_bytes = state.get('max_disk_bytes', 256 * 1024 * 1024)
+        self._no_store = state.get('no_store', [])
+        self._init_process_state()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the counters of the cache
+
+        Returns:
+          dict with the number of responses served after a 304 (not_modified), with an unchanged body (unchanged),
+          with a changed body (changed), and the number of new responses stored (stored)
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def clear(self) -> None:
+        """Drop all the responses, in memory and on disk
+
+        Returns:
+          None
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self._files.clear()
+            self._disk_size = 0
+
+        if self._directory is not None:
+            for path in self._directory.glob('*.cache'):
+                path.unlink(missing_ok=True)
+
+    def stores(self, uri: str) -> bool:
+        """Tell whether the responses of a URI are cached, that is whether its endpoint does not match no_store
+
+        Args:
+          uri: URI requested, such as manage/users/list
+
+        Returns:
+          bool
+        """
+        if not self._no_store:
+            return True
+
+        stored = self._stored_uris.get(uri)
+        if stored is None:
+            if len(self._stored_uris) > 4 * self._max_entries:
+                self._stored_uris = {}
+
+            path = uri.partition('?')[0].strip('/')
+            stored = not any(fnmatch.fnmatchcase(path, pattern) for pattern in self._no_store)
+            self._stored_uris[uri] = stored
+
+        return stored
+
+    def request_headers(self, key: str) -> Dict[str, str]:
+        """Return the conditional headers to send with a GET request
+
+        Args:
+          key: Key of the request. See ClientSession._cache_key
+
+        Returns:
+          dict of headers, empty if no response with validators is cached
+        """
+        entry = self._get(key)
+        headers = {}
+        if entry is None:
+            return headers
+
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+
+        return headers
+
+    def handle(self, key: str, response: Response, uri: str) -> Union[ApiResponse, None]:
+        """Return the ApiResponse of a GET response, from the cache if the response is unchanged. Successful
+        responses are stored.
+
+        Args:
+          key: Key of the request. See ClientSession._cache_key
+          response: Response of the server
+          uri: URI requested
+
+        Returns:
+          ApiResponse, or None if the response is not cacheable and is left to the caller. None is also returned
+          on a 304 reply whose response was evicted meanwhile, in which case the caller has to request it again
+          without the conditional headers
+        """
+        if response.status_code == 304:
+            entry = self._get(key)
+            if entry is not None:
+                self._count('not_modified')
+                return entry.get_api_response(uri)
+
+            return None
+
+        if response.status_code != 200 or 'no-store' in response.headers.get('Cache-Control', '') or \
+                not self.stores(uri):
+            return None
+
+        body = response.content
+        digest = hashlib.blake2b(body, digest_size=16).digest()
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+
+        entry = self._get(key)
+        if entry is not None and entry.digest == digest:
+            self._count('unchanged')
+            if (etag, last_modified) != (entry.etag, entry.last_modified):
+                entry.etag, entry.last_modified = etag, last_modified
+                self._write(key, entry)
+
+            return entry.get_api_response(uri)
+
+        api_response = ApiResponse(body, uri=uri, digest=digest)
+        if not api_response.is_success():
+            return api_response
+
+        self._count('changed' if entry is not None else 'stored')
+        entry = CacheEntry(etag, last_modified, digest, body, api_response)
+        self._put(key, entry)
+        self._write(key, entry)
+
+        return api_response
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._stats[counter] += 1
+
+    def _get(self, key: str) -> Union[CacheEntry, None]:
+        """Return the entry of a key, from memory or else from disk"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        entry = self._read(key)
+        if entry is not None:
+            self._put(key, entry)
+
+        return entry
+
+    def _put(self, key: str, entry: CacheEntry) -> None:
+        """Keep an entry in memory, evicting the least recently used ones beyond the bounds"""
+        if len(entry.body) > self._max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous.body)
+
+            self._entries[key] = entry
+            self._size += len(entry.body)
+
+            while len(self._entries) > self._max_entries or self._size > self._max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.body)
+
+    def _path(self, key: str) -> Path:
+        return self._directory / f'{hashlib.sha256(key.encode("utf-8")).hexdigest()}.cache'
+
+    def _read(self, key: str) -> Union[CacheEntry, None]:
+        """Load an entry from disk. The file holds a JSON header line followed by the body"""
+        if self._directory is None:
+            return None
+
+        try:
+            with open(self._path(key), 'rb') as cache_file:
+                header = json_backend.loads(cache_file.readline())
+                body = cache_file.read()
+
+        except FileNotFoundError:
+            return None
+
+        except (OSError, ValueError) as e:
+            log.warning(f'Ignoring unreadable cache file for {key}. {e}')
+            return None
+
+        if header.get('key') != key:
+            return None
+
+        return CacheEntry(header.get('etag'), header.get('last_modified'), bytes.fromhex(header.get('digest')), body)
+
+    def _write(self, key: str, entry: CacheEntry) -> None:
+        """Store an entry on disk. The file is replaced atomically, so that concurrent readers never see it partial"""
+        if self._directory is None:
+            return
+
+        header = json_backend.dumps({'key': key, 'etag': entry.etag, 'last_modified': entry.last_modified,
+                                     'digest': entry.digest.hex()})
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=self._directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as cache_file:
+                cache_file.write(header + b'\n')
+                cache_file.write(entry.body)
+
+            path = self._path(key)
+            os.replace(temp_path, path)
+
+        except OSError as e:
+            log.warning(f'Unable to write the cache file for {key}. {e}')
+            return
+
+        self._track_file(path.name, len(header) + 1 + len(entry.body))
+
+    def _index_files(self) -> None:
+        """Index the files of the directory, oldest first, and remove the oldest ones beyond the bounds"""
+        files = []
+        for path in self._directory.glob('*.cache'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+
+            files.append((stat.st_mtime, path.name, stat.st_size))
+
+        with self._lock:
+            for _, name, size in sorted(files):
+                self._files[name] = size
+                self._disk_size += size
+
+        self._track_file(None, 0)
+
+    def _track_file(self, name: Union[str, None], size: int) -> None:
+        """Record a file written to the directory as the most recent one, and remove the oldest files beyond the
+        bounds of the directory"""
+        evicted = []
+        with self._lock:
+            if name is not None:
+                self._disk_size -= self._files.pop(name, 0)
+                self._files[name] = size
+                self._disk_size += size
+
+            while self._files and (len(self._files) > self._max_disk_entries or
+                                   self._disk_size > self._max_disk_bytes):
+                evicted_name, evicted_size = self._files.popitem(last=False)
+                self._disk_size -= evicted_size
+                evicted.append(evicted_name)
+
+        for evicted_name in evicted:
+            try:
+                (self._directory / evicted_name).unlink(missing_ok=True)
+            except OSError as e:
+                log.warning(f'Unable to remove the cache file {evicted_name}. {e}')
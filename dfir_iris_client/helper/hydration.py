@@ -0,0 +1,219 @@
+#  IRIS Client API Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import logging as logger
+import weakref
+from typing import Iterable, List
+
+from dfir_iris_client.helper.concurrency import DEFAULT_MAX_WORKERS, run_concurrently
+from dfir_iris_client.helper.errors import IrisStatus, OperationSuccess, OperationFailure
+from dfir_iris_client.helper.objects_def import objects_list_map, objects_map
+from dfir_iris_client.helper.utils import get_object_mapper
+
+log = logger.getLogger(__name__)
+
+
+class HydrationBatch(object):
+    """Groups partial IrisDynamicObjects loaded together, such as the assets of the events of a timeline.
+    When one of them needs to be fully loaded, all the partial members of the batch are loaded at once.
+    Members are weakly referenced.
+    """
+    __slots__ = ('_members', '__weakref__')
+
+    def __init__(self):
+        self._members = weakref.WeakSet()
+
+    def __len__(self):
+        return len(self._members)
+
+    def add(self, obj) -> None:
+        """Add an object to the batch
+
+        Args:
+          obj: Partial IrisDynamicObject
+
+        Returns:
+          None
+        """
+        self._members.add(obj)
+        obj._batch = self
+
+    def hydrate(self, max_workers: int = DEFAULT_MAX_WORKERS) -> IrisStatus:
+        """Fully load all the partial members of the batch, and empty it
+
+        Args:
+          max_workers: Maximum number of concurrent requests
+
+        Returns:
+          IrisStatus
+        """
+        members = list(self._members)
+        self._members.clear()
+
+        return hydrate_objects(members, max_workers=max_workers)
+
+
+def _is_untouched(obj) -> bool:
+    """Tell whether an object can be overwritten with the data of the server, that is, whether it is synced and has
+    no local changes. As with iris_dynamic_property, objects changed locally are never loaded over.
+
+    Args:
+      obj: IrisDynamicObject
+
+    Returns:
+      bool
+    """
+    return obj.is_synced and not obj.dirty_attributes
+
+
+def _init_from_id(obj) -> bool:
+    """Fully load a partial object on its own
+
+    Args:
+      obj: Partial IrisDynamicObject
+
+    Returns:
+      True if the object was loaded
+    """
+    ret = obj.init_from_id(obj.id)
+    if not ret:
+        log.error(f'Unable to load {obj.object_name} #{obj.id}. {ret}')
+        return False
+
+    obj._is_partial = False
+    return True
+
+
+def _hydrate_from_list(objs: List) -> List:
+    """Fully load partial objects of the same type and case from the list endpoint of their type.
+
+    Args:
+      objs: Partial IrisDynamicObjects of the same class, session and case
+
+    Returns:
+      List of the objects not found in the list, which still need to be loaded
+    """
+    first = objs[0]
+    method, data_key = objects_list_map[first.object_name]
+    id_field = objects_map[first.object_name].get('id')
+
+    resp = getattr(first._ch, method)(cid=first._cid)
+    if resp.is_error():
+        log.warning(f'Unable to list {first.object_name} of case #{first._cid}. {resp.get_msg()}')
+        return objs
+
+    records = resp.get_data_field(data_key) or []
+    by_id = {record.get(id_field): record for record in records}
+    mapper = get_object_mapper(type(first))
+
+    remaining = []
+    for obj in objs:
+        if not _is_untouched(obj):
+            continue
+
+        record = by_id.get(obj.id)
+        if record is None:
+            remaining.append(obj)
+            continue
+
+        obj._is_partial = False
+        mapper(obj, record)
+        obj._set_sync_state(True)
+
+    return remaining
+
+
+def hydrate_objects(objs: Iterable, max_workers: int = DEFAULT_MAX_WORKERS) -> IrisStatus:
+    """Fully load partial IrisDynamicObjects in as few requests as possible.
+
+    Objects are grouped by type and case. Groups of several objects whose type can be listed are loaded with a single
+    request to the list endpoint of the case. The other objects are loaded with concurrent requests, at most
+    max_workers at a time. Objects which are not partial, or were changed locally, are ignored.
+
+    Args:
+      objs: IrisDynamicObjects
+      max_workers: Maximum number of concurrent requests
+
+    Returns:
+      IrisStatus
+    """
+    groups = {}
+    for obj in objs:
+        if not getattr(obj, '_is_partial', False) or obj.id is None or not _is_untouched(obj):
+            continue
+
+        groups.setdefault((type(obj), obj._ch), []).append(obj)
+
+    total = sum(len(group) for group in groups.values())
+
+    listable = []
+    remaining = []
+    for (cls, _), group in groups.items():
+        if len(group) > 1 and cls.object_name in objects_list_map:
+            listable.append(group)
+        else:
+            remaining.extend(group)
+
+    for group_remaining in run_concurrently(_hydrate_from_list, listable, max_workers=max_workers):
+        remaining.extend(group_remaining)
+
+    loaded = run_concurrently(_init_from_id, remaining, max_workers=max_workers, return_exceptions=True)
+    failed = [obj for obj, ret in zip(remaining, loaded) if ret is not True]
+
+    for group in groups.values():
+        for obj in group:
+            if not obj._is_partial and getattr(obj, '_batch', None) is not None:
+                obj._batch = None
+
+    if failed:
+        return OperationFailure(message=f'Unable to load {len(failed)} objects out of {total}', data=failed)
+
+    return OperationSuccess(message=f'{total} objects loaded', data={'loaded': total})
+
+
+def prefetch(objs: Iterable, attribute: str = None, max_workers: int = DEFAULT_MAX_WORKERS) -> IrisStatus:
+    """Fully load a collection of partial IrisDynamicObjects and, if an attribute is provided, the partial objects
+    they reference through it. This avoids a request per object when iterating over a collection.
+
+    Example:
+        prefetch(events, 'assets')
+        for event in events:
+            for asset in event.assets:
+                print(asset.name)
+
+    Args:
+      objs: IrisDynamicObjects
+      attribute: Attribute of the objects holding an object or a list of objects to load as well
+      max_workers: Maximum number of concurrent requests
+
+    Returns:
+      IrisStatus
+    """
+    objs = list(objs)
+    ret = hydrate_objects(objs, max_workers=max_workers)
+    if not ret or attribute is None:
+        return ret
+
+    children = []
+    for obj in objs:
+        value = getattr(obj, attribute, None)
+        if isinstance(value, (list, tuple, set)):
+            children.extend(value)
+
+        elif value is not None:
+            children.append(value)
+
+    return hydrate_objects(children, max_workers=max_workers)
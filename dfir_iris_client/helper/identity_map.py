@@ -0,0 +1,144 @@
+#  IRIS Client API Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import os
+import threading
+import weakref
+from typing import Any, Tuple
+
+
+class IdentityMap(object):
+    """Keeps track of the canonical instance of each server object materialized in a session.
+    Objects are keyed by (object_name, cid, id) and weakly referenced, so that an object is released as soon as
+    nothing else uses it. Loading the same server object twice then returns the same instance, which is fetched
+    and hydrated only once.
+    """
+
+    def __init__(self):
+        self._objects = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._objects)
+
+    def __contains__(self, obj):
+        return self._objects.get(self.key(obj)) is obj
+
+    @staticmethod
+    def key(obj) -> Tuple[str, int, Any]:
+        """Return the identity key of an IrisObject
+
+        Args:
+          obj: IrisObject
+
+        Returns:
+          (object_name, cid, id)
+        """
+        return obj.object_name, obj._cid, obj.id
+
+    def get(self, object_name: str, cid: int, object_id: Any) -> Any:
+        """Return the canonical instance of a server object if it is still alive, otherwise None
+
+        Args:
+          object_name: Name of the object in objects_def
+          cid: Case ID of the object
+          object_id: ID of the object
+
+        Returns:
+          IrisObject or None
+        """
+        return self._objects.get((object_name, cid, object_id))
+
+    def add(self, obj) -> Any:
+        """Register an object as canonical if no other instance is registered for the same server object.
+        Objects without ID are not registered.
+
+        Args:
+          obj: IrisObject
+
+        Returns:
+          The canonical instance, which is either obj or the instance registered before it
+        """
+        if obj.id is None:
+            return obj
+
+        key = self.key(obj)
+        with self._lock:
+            canonical = self._objects.get(key)
+            if canonical is None:
+                self._objects[key] = obj
+                return obj
+
+        return canonical
+
+    def remove(self, obj) -> None:
+        """Unregister an object, if it is the canonical instance
+
+        Args:
+          obj: IrisObject
+
+        Returns:
+          None
+        """
+        key = self.key(obj)
+        with self._lock:
+            if self._objects.get(key) is obj:
+                del self._objects[key]
+
+    def clear(self) -> None:
+        """Unregister all the objects"""
+        with self._lock:
+            self._objects.clear()
+
+
+"""_identity_maps
+Identity maps of the sessions. Sessions are weakly referenced so that their maps are released with them.
+"""
+_identity_maps = weakref.WeakKeyDictionary()
+_identity_maps_lock = threading.Lock()
+
+
+def get_identity_map(session) -> IdentityMap:
+    """Return the identity map of a session, creating it on first use.
+
+    Args:
+      session: ClientSession
+
+    Returns:
+      IdentityMap
+    """
+    identity_map = _identity_maps.get(session)
+    if identity_map is None:
+        with _identity_maps_lock:
+            identity_map = _identity_maps.get(session)
+            if identity_map is None:
+                identity_map = IdentityMap()
+                _identity_maps[session] = identity_map
+
+    return identity_map
+
+
+def _reset_after_fork() -> None:
+    """Replace the locks inherited by a forked child, which may have been held by threads which do not exist in it"""
+    global _identity_maps_lock
+    _identity_maps_lock = threading.Lock()
+
+    for identity_map in list(_identity_maps.values()):
+        identity_map._lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -14,18 +14,73 @@
 #  You should have received a copy of the GNU Lesser General Public License
 #  along with this program; if not, write to the Free Software Foundation,
 #  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import datetime
+import weakref
 from abc import abstractmethod
 
 from dfir_iris_client.case import Case
+from dfir_iris_client.helper.concurrency import DEFAULT_MAX_WORKERS, BulkResult, run_concurrently, RateLimiter
 from dfir_iris_client.helper.errors import IrisStatus, \
-    BaseOperationSuccess, OperationFailure, ObjectNotInitialized
-from dfir_iris_client.helper.utils import get_iris_session, map_object
+    BaseOperationSuccess, OperationSuccess, OperationFailure, ObjectNotInitialized, IrisClientException, InvalidObjectMapping
+from dfir_iris_client.helper.identity_map import get_identity_map
+from dfir_iris_client.helper.objects_def import objects_map, objects_update_map, objects_update_fields, \
+    objects_update_current
+from dfir_iris_client.helper.unit_of_work import current_unit_of_work
+from dfir_iris_client.helper.utils import get_iris_session, map_object, assert_api_resp
 
 """
 For future use only
 """
 
 
+def _body_value(field: str, value):
+    """Convert a value to the format expected by the update endpoints, as the update methods of the Case helper do.
+    Tags are sent as a comma separated string, dates in ISO format, and assignees as a list of user IDs.
+
+    Args:
+        field: Field of the body
+        value: Value of the attribute, or of the field of the current version of the object
+
+    Returns:
+        Value to send
+    """
+    if field.endswith('_tags') and isinstance(value, (list, tuple)):
+        return ','.join(value)
+
+    if isinstance(value, datetime.datetime):
+        return value.strftime('%Y-%m-%dT%H:%M:%S.%f')
+
+    if field == 'task_assignees_id':
+        if isinstance(value, int):
+            return [value]
+
+        if isinstance(value, list):
+            return [item.get('id') if isinstance(item, dict) else item for item in value]
+
+    return value
+
+
+def _load_partial(instance) -> None:
+    """Fully load a partial IrisDynamicObject. If it belongs to a HydrationBatch, all the partial objects of the
+    batch are loaded at once. Otherwise, the object is loaded on its own with init_from_id.
+
+    Args:
+        instance: Partial IrisDynamicObject
+
+    Returns:
+        None
+    """
+    batch = getattr(instance, '_batch', None)
+    if batch is not None:
+        batch.hydrate()
+
+    if instance._is_partial:
+        ret = instance.init_from_id(instance.id)
+        if not ret: raise Exception(ObjectNotInitialized(str(ret)))
+
+        instance._is_partial = False
+
+
 class iris_obj_property(object):
     """Defines a custom property allowing to automatically flip the sync state of an IrisObject.
     When a iris_obj_property property is set, the corresponding IrisObject is set to desync state.
@@ -68,7 +123,8 @@ class iris_obj_property(object):
 
         For example, setting case.name = "My value", actually results in case._name = "My value".
 
-        Once the set is done, the instance._set_unsynced() is called to flip the sync state of the IrisObject.
+        Once the set is done, the instance._set_unsynced() is called to flip the sync state of the IrisObject,
+        and the attribute is recorded as dirty so that save() only sends the changed fields.
 
         Args:
             instance: IrisObject instance
@@ -80,8 +136,10 @@ class iris_obj_property(object):
         if self.fset:
             return self.fset(instance, value)
 
-        setattr(instance, f"_{self.field.__name__}", value)
+        attribute = f"_{self.field.__name__}"
+        setattr(instance, attribute, value)
         instance._set_unsynced()
+        instance.mark_dirty(attribute)
 
     def getter(self, fget):
         """Setter of the getter
@@ -168,6 +226,8 @@ class iris_dynamic_property(object):
 
         If the instance is partial, then the base method init_from_id is called. This implies that the instance
         ID has been set. This has to be done by methods when they partially initialize an object.
+        If the instance was loaded along with other partial objects (see HydrationBatch), all of them are loaded
+        at once instead.
         If this is not the case or the init fails an Exception(ObjectNotInitialized()) exception is raised.
         Once the loading is done, the partial state of the IrisDynamicObject is flipped.
 
@@ -187,10 +247,7 @@ class iris_dynamic_property(object):
             return self.fget(instance)
 
         if instance._is_partial and instance._is_synced:
-            ret = instance.init_from_id(instance.id)
-            if not ret: raise Exception(ObjectNotInitialized(str(ret)))
-
-            instance._is_partial = False
+            _load_partial(instance)
 
         return getattr(instance, f"_{self.field.__name__}")
 
@@ -207,7 +264,8 @@ class iris_dynamic_property(object):
 
         For example, setting case.name = "My value", actually results in case._name = "My value".
 
-        Once the set is done, the instance._set_unsynced() is called to flip the sync state of the IrisObject.
+        Once the set is done, the instance._set_unsynced() is called to flip the sync state of the IrisObject,
+        and the attribute is recorded as dirty so that save() only sends the changed fields.
 
         Args:
             instance: IrisObject instance
@@ -220,12 +278,12 @@ class iris_dynamic_property(object):
             return self.fset(instance, value)
 
         if instance._is_partial and instance._is_synced:
-            ret = instance.init_from_id(instance.id)
-            if not ret: raise Exception(ObjectNotInitialized(str(ret)))
-            instance._is_partial = False
+            _load_partial(instance)
 
-        setattr(instance, f"_{self.field.__name__}", value)
+        attribute = f"_{self.field.__name__}"
+        setattr(instance, attribute, value)
         instance._set_unsynced()
+        instance.mark_dirty(attribute)
 
     def getter(self, fget):
         """Setter of the getter
@@ -250,40 +308,52 @@ class iris_dynamic_property(object):
         return type(self)(self.field, self.fget, fset)
 
 
-class IrisObject(object):
-    """Defines a standard IrisObject. These are used by the abstraction layer of the client.
-    They automatically find the ClientSession and implement the basic attributes and methods
-    allowing the abstraction layer to function.
+"""_case_helpers
+Case helpers shared by the IrisObjects, keyed by session and case ID. The helpers are weakly referenced, so that
+they are released with the last object using them, and their session along with them. A helper holds its session,
+so the ID of the session in the key can not be reused while the helper is alive.
+"""
+_case_helpers = weakref.WeakValueDictionary()
+
+
+def get_case_helper(session, cid: int = None) -> Case:
+    """Return the Case helper shared by all the IrisObjects of a session and a case ID, creating it on first use.
+    The shared helpers must not be altered with set_cid. Objects changing of case switch to the helper of
+    their new case instead.
 
     Args:
+      session: ClientSession of the objects
+      cid: Case ID
 
     Returns:
-
+      Case helper
     """
-    object_name = "base"
+    key = (id(session), cid)
+    helper = _case_helpers.get(key)
+    if helper is None:
+        helper = _case_helpers.setdefault(key, Case(session=session, case_id=cid))
 
-    def __init__(self, cid: int = None):
-        """
-        Fetch the client session and initiate a case helper class with the provided CID.
-        The CID at init is not mandatory and can be set later on with set_cid. However this needs
-        to be done before any method of the class is called, otherwise the CaseHelper won't know to
-        with which case it needs to talk to.
-        By default, objects are initiated in an unsynced state.
+    return helper
 
-        """
-        from dfir_iris_client.session import ClientSession
-        self._s: ClientSession = get_iris_session()
-        self._ch = Case(session=self._s, case_id=cid)
 
-        self._cid = cid
-        self._id = None
-        self._is_synced = False
+class BaseIrisObject(object):
+    """Defines the attributes and methods common to all IrisObjects, whatever their storage.
+    It is not meant to be used directly, see IrisObject and CompactIrisObject.
+
+    Args:
+
+    Returns:
+
+    """
+    __slots__ = ()
+
+    object_name = "base"
 
     def __int__(self):
         return self._id
 
     def set_cid(self, cid: int) -> IrisStatus:
-        """Set the case ID and propagate to the helper class
+        """Set the case ID and switch to the shared case helper of the case
 
         Args:
           cid: Case ID
@@ -293,7 +363,7 @@ class IrisObject(object):
 
         """
         self._cid = cid
-        self._ch.set_cid(cid)
+        self._ch = get_case_helper(self._s, cid)
 
         return BaseOperationSuccess
 
@@ -320,7 +390,7 @@ class IrisObject(object):
         return self._is_synced
 
     def _set_sync_state(self, state: bool) -> None:
-        """Internal method to flip the sync state
+        """Internal method to flip the sync state. A synced object has no dirty attributes.
 
         Args:
           state: bool: Sync state to set
@@ -329,6 +399,119 @@ class IrisObject(object):
             IrisStatus
         """
         self._is_synced = state
+        if state:
+            self._dirty = None
+
+    @property
+    def dirty_attributes(self) -> frozenset:
+        """Attributes changed locally since the object was last synced with the server"""
+        return frozenset(getattr(self, '_dirty', None) or ())
+
+    def mark_dirty(self, *attributes: str) -> None:
+        """Record attributes as changed locally, so that they are sent by the next save.
+        Attributes set through iris_obj_property and iris_dynamic_property are recorded automatically.
+
+        Args:
+          *attributes: Names of the attributes, as defined in objects_def
+
+        Returns:
+            None
+        """
+        dirty = getattr(self, '_dirty', None)
+        if dirty is None:
+            dirty = set()
+            self._dirty = dirty
+
+        dirty.update(attributes)
+        self._is_synced = False
+
+    def save(self) -> IrisStatus:
+        """Send the local changes of the object to the server.
+
+        Only the dirty attributes are sent when the update endpoint of the object accepts partial bodies, without
+        fetching the object first. Otherwise, the current version of the object is fetched first and the dirty
+        attributes are set over it, as the update methods of the Case helper do, so that the unchanged fields are
+        never overwritten by stale or unloaded attributes. Nothing is sent if the object has no dirty attributes.
+
+        Within a unit of work of the session of the object, the save is deferred until the unit of work is flushed.
+
+        Args:
+
+        Returns:
+            IrisStatus
+        """
+        uow = current_unit_of_work()
+        if uow is not None and uow.session is self._s:
+            uow.save(self)
+            return OperationSuccess(message='Save deferred to the unit of work')
+
+        return self._flush_save()
+
+    def _flush_save(self) -> IrisStatus:
+        """Send the local changes of the object to the server. See save.
+
+        Args:
+
+        Returns:
+            IrisStatus
+        """
+        dirty = getattr(self, '_dirty', None)
+        if not dirty:
+            return BaseOperationSuccess
+
+        body = self._update_body()
+        if isinstance(body, IrisStatus):
+            return body
+
+        uri, _ = objects_update_map[self.object_name]
+        ret = assert_api_resp(self._s.pi_post(uri.format(id=self.id), data=body))
+        if ret:
+            id_field = objects_map[self.object_name].get('id')
+            if isinstance(ret.data, dict) and ret.data.get(id_field) == self.id:
+                map_object(self, ret.data)
+
+            self._set_sync_state(True)
+
+        return ret
+
+    def _update_body(self):
+        """Build the body of the update request of the object, from its dirty attributes. See save.
+
+        Args:
+
+        Returns:
+            Dict of the body, or an IrisStatus if the object can't be updated
+        """
+        if self.object_name not in objects_update_map:
+            return OperationFailure(f'Objects {self.object_name} can not be saved')
+
+        if self.id is None:
+            return ObjectNotInitialized(f'{self.object_name} has no ID. Only existing objects can be saved')
+
+        fields = objects_update_fields[self.object_name]
+        read_only = sorted(self.dirty_attributes.difference(fields))
+        if read_only:
+            return OperationFailure(f'Attributes {", ".join(read_only)} of {self.object_name} are read only')
+
+        body = {}
+        _, partial = objects_update_map[self.object_name]
+        if not partial:
+            method, current_fields = objects_update_current[self.object_name]
+            ret = getattr(self._ch, method)(self.id)
+            if ret.is_error():
+                return OperationFailure(f'Unable to fetch {self.object_name} #{self.id} for update. {ret.get_msg()}')
+
+            current = ret.get_data()
+            body = {field: _body_value(field, current.get(current_field))
+                    for field, current_field in current_fields.items()}
+
+        for attribute in self.dirty_attributes:
+            field = fields[attribute]
+            body[field] = _body_value(field, getattr(self, attribute, None))
+
+        body['cid'] = self._cid
+
+        return body
 
     def _set_unsynced(self):
         """Set the instance to unsynced state"""
@@ -374,7 +557,9 @@ class IrisObject(object):
         return ret
 
     def reset(self, keep_id=False, keep_cid=False):
-        """Resets an IRIS object. Acts as a new object.
+        """Resets an IRIS object. Acts as a new object of the same session: the attributes mapped in objects_def
+        are cleared and the state set by the init of the class is restored. The attributes are written directly,
+        so that the object is neither dirty nor loaded by its dynamic properties.
 
         Args:
           keep_id: If set, the object will keep its current ID. (Default value = False)
@@ -383,12 +568,72 @@ class IrisObject(object):
         Returns:
 
         """
-        id = self.id if keep_id else None
+        id = self._id if keep_id else None
         cid = self._cid if keep_cid else None
 
-        self.__init__()
+        if not keep_id or not keep_cid:
+            get_identity_map(self._s).remove(self)
+
+        self._reinit()
+
         self.set_id(id)
-        self.set_cid(cid)
+        if cid is not None:
+            self.set_cid(cid)
+
+    @abstractmethod
+    def _reinit(self) -> None:
+        """Clear the mapped attributes and run the init of the class again, in the session of the object"""
+        raise NotImplementedError
+
+
+class IrisObject(BaseIrisObject):
+    """Defines a standard IrisObject. These are used by the abstraction layer of the client.
+    They automatically find the ClientSession and implement the basic attributes and methods
+    allowing the abstraction layer to function.
+
+    Args:
+
+    Returns:
+
+    """
+    object_name = "base"
+
+    def __init__(self, cid: int = None):
+        """
+        Fetch the client session and get the shared case helper of the provided CID.
+        The CID at init is not mandatory and can be set later on with set_cid. However this needs
+        to be done before any method of the class is called, otherwise the CaseHelper won't know to
+        with which case it needs to talk to.
+        By default, objects are initiated in an unsynced state.
+
+        """
+        from dfir_iris_client.session import ClientSession
+        self._s: ClientSession = get_iris_session()
+        self._ch = get_case_helper(self._s, cid)
+
+        self._cid = cid
+        self._id = None
+        self._is_synced = False
+        self._dirty = None
+
+    def _reinit(self) -> None:
+        """Clear the mapped attributes in the __dict__ of the object and run its init again in its session,
+        so that the state set by the init of subclasses is restored as well. See reset"""
+        from dfir_iris_client.session import use_session
+        session = self._s
+        state = self.__dict__
+
+        for attribute in _reset_attributes(type(self)):
+            if attribute in state:
+                state[attribute] = None
+
+        state.pop('_batch', None)
+        if state.get('_is_partial'):
+            # Cleared before the init, so that the dynamic properties it sets do not load the object
+            state['_is_partial'] = False
+
+        with use_session(session):
+            self.__init__()
 
 
 class IrisDynamicObject(IrisObject):
@@ -406,6 +651,93 @@ class IrisDynamicObject(IrisObject):
 
     def init_from_data(self, data: dict, partial: bool = False) -> IrisStatus:
         """Init the object from an API data response. Set the sync state according to the init operation return.
+        Once initialised, the object becomes the canonical instance of the server object in the identity map of the
+        session, unless another instance already is.
+
+        Args:
+          data: API data response
+          partial: Partial load of the object
+
+        Returns:
+          IrisStatus
+
+        """
+        self._is_partial = partial
+        ret = map_object(self, data)
+
+        self._set_sync_state(ret.is_success())
+        if ret.is_success():
+            get_identity_map(self._s).add(self)
+
+        return ret
+
+
+class CompactIrisObject(BaseIrisObject):
+    """Defines a memory-compact IrisDynamicObject. Instances have no __dict__: their attributes are stored in slots
+    and the session is reached through the case helper shared by all the objects of the same session and case.
+    Mapped attributes which were never set read as None.
+
+    The classes of the objects are generated from objects_def with compact_class. They are meant for large
+    collections, such as a timeline of hundreds of thousands of events.
+
+    Args:
+
+    Returns:
+
+    """
+    __slots__ = ('_ch', '_cid', '_id', '_is_synced', '_is_partial', '_batch', '_dirty', '__weakref__')
+
+    _mapped_attributes = frozenset()
+
+    def __init__(self, cid: int = None, session=None):
+        """
+        Get the shared case helper of the provided session and CID. If no session is provided, the global session
+        is used. By default, objects are initiated in an unsynced and not partial state.
+
+        Args:
+            cid: Case ID
+            session: ClientSession of the object
+        """
+        self._ch = get_case_helper(session if session is not None else get_iris_session(), cid)
+        self._cid = cid
+        self._id = None
+        self._is_synced = False
+        self._is_partial = False
+        self._batch = None
+        self._dirty = None
+
+    def _reinit(self) -> None:
+        """Clear the slots of the mapped attributes and run the init again with the session of the object.
+        See reset"""
+        session = self._s
+        for attribute in self._mapped_attributes:
+            try:
+                object.__delattr__(self, attribute)
+            except AttributeError:
+                pass
+
+        self.__init__(session=session)
+
+    def __getattr__(self, item):
+        if item in self._mapped_attributes:
+            return None
+
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{item}'")
+
+    @property
+    def _s(self):
+        """Session of the object, reached through the shared case helper"""
+        return self._ch._s
+
+    @property
+    def is_partial(self) -> bool:
+        """ """
+        return self._is_partial
+
+    def init_from_data(self, data: dict, partial: bool = False) -> IrisStatus:
+        """Init the object from an API data response. Set the sync state according to the init operation return.
+        Once initialised, the object becomes the canonical instance of the server object in the identity map of the
+        session, unless another instance already is.
 
         Args:
           data: API data response
@@ -419,5 +751,110 @@ class IrisDynamicObject(IrisObject):
         ret = map_object(self, data)
 
         self._set_sync_state(ret.is_success())
+        if ret.is_success():
+            get_identity_map(self._s).add(self)
+
+        return ret
+
+
+def reset_objects(objs, keep_id: bool = False, keep_cid: bool = False) -> None:
+    """Reset many IrisObjects at once. See reset.
+
+    Args:
+      objs: IrisObjects to reset
+      keep_id: If set, the objects keep their current ID
+      keep_cid: If set, the objects keep their current Case ID
+
+    Returns:
+      None
+    """
+    for obj in objs:
+        obj.reset(keep_id=keep_id, keep_cid=keep_cid)
+
+
+"""_reset_attributes_cache
+Attributes cleared by reset, per class.
+"""
+_reset_attributes_cache = {}
+
+
+def _reset_attributes(cls) -> tuple:
+    """Return the attributes of a class cleared by reset, which are the attributes mapped in objects_def but the ID
+
+    Args:
+      cls: IrisObject class
+
+    Returns:
+      Tuple of attribute names
+    """
+    attributes = _reset_attributes_cache.get(cls)
+    if attributes is None:
+        attributes = tuple(attribute for attribute in objects_map.get(cls.object_name, ()) if attribute != 'id')
+        _reset_attributes_cache[cls] = attributes
+
+    return attributes
+
+
+def save_objects(objs, max_workers: int = DEFAULT_MAX_WORKERS, rate_limit: float = None) -> BulkResult:
+    """Save many IrisObjects concurrently. Each object with dirty attributes costs a single write request and no
+    read. Objects without dirty attributes are not sent.
+
+    Args:
+      objs: IrisObjects to save
+      max_workers: Maximum number of concurrent requests
+      rate_limit: Maximum number of requests per second. Default is unlimited
+
+    Returns:
+      BulkResult keyed by (object_name, cid, id) of each object. Within a unit of work, the saves are deferred
+      until it is flushed
+    """
+    objs = list(objs)
+
+    uow = current_unit_of_work()
+    if uow is not None:
+        return BulkResult({(obj.object_name, obj._cid, obj.id): obj.save() for obj in objs})
+
+    rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+
+    results = run_concurrently(lambda obj: obj.save(), objs, max_workers=max_workers, return_exceptions=True,
+                               rate_limiter=rate_limiter)
+
+    return BulkResult({(obj.object_name, obj._cid, obj.id): result for obj, result in zip(objs, results)})
+
+
+_compact_classes = {}
+
+
+def compact_class(object_name: str) -> type:
+    """Return the CompactIrisObject class of an objects_def entry, generating it on first use.
+    Each attribute of the entry gets its own slot.
+
+    Example:
+        CompactEvent = compact_class('event')
+        events = map_objects(CompactEvent, case.list_events().get_data_field('timeline'), cid=1)
+
+    Args:
+      object_name: Name of the objects_def entry
+
+    Returns:
+      CompactIrisObject subclass
+    """
+    cls = _compact_classes.get(object_name)
+    if cls is not None:
+        return cls
+
+    obj_def = objects_map.get(object_name)
+    if not obj_def:
+        raise IrisClientException(InvalidObjectMapping(f'Unrecognised {object_name} for mapping'))
+
+    attributes = tuple(attribute for attribute in obj_def if attribute != 'id')
+    class_name = 'Compact' + ''.join(part.capitalize() for part in object_name.split('_'))
+
+    cls = type(class_name, (CompactIrisObject,), {
+        '__slots__': attributes,
+        '__doc__': f'CompactIrisObject generated from the {object_name} entry of objects_def',
+        'object_name': object_name,
+        '_mapped_attributes': frozenset(attributes)
+    })
 
-        return ret
\ No newline at end of file
+    return _compact_classes.setdefault(object_name, cls)
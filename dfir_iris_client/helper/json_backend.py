@@ -0,0 +1,149 @@
+#  IRIS Client API Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import json
+import logging as logger
+import os
+from typing import Any, Callable, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+log = logger.getLogger(__name__)
+
+
+class JsonBackend(object):
+    """Encoder and decoder of the JSON exchanged with the server.
+    Bodies are encoded to UTF-8 bytes, and responses can be decoded from bytes or str.
+    """
+
+    def __init__(self, name: str, loads: Callable[[Union[bytes, str]], Any], dumps: Callable[[Any], bytes]):
+        """
+        Args:
+            name: Name of the backend
+            loads: Decode a JSON document
+            dumps: Encode an object to a JSON document in UTF-8 bytes
+        """
+        self.name = name
+        self.loads = loads
+        self.dumps = dumps
+
+    def __repr__(self):
+        return f'<JsonBackend {self.name}>'
+
+
+def _stdlib_dumps(obj: Any) -> bytes:
+    """Encode an object with the standard json module"""
+    return json.dumps(obj).encode('utf-8')
+
+
+def _orjson_dumps(obj: Any) -> bytes:
+    """Encode an object with orjson, falling back to the standard json module for what orjson refuses,
+    such as integers larger than 64 bits"""
+    try:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    except TypeError:
+        return _stdlib_dumps(obj)
+
+
+def _msgspec_dumps(obj: Any) -> bytes:
+    """Encode an object with msgspec, falling back to the standard json module for what msgspec refuses"""
+    try:
+        return msgspec.json.encode(obj)
+    except (TypeError, OverflowError):
+        return _stdlib_dumps(obj)
+
+
+"""BACKENDS
+Available JSON backends, by order of preference.
+"""
+BACKENDS = {}
+if orjson is not None:
+    BACKENDS['orjson'] = JsonBackend('orjson', orjson.loads, _orjson_dumps)
+
+if msgspec is not None:
+    BACKENDS['msgspec'] = JsonBackend('msgspec', msgspec.json.decode, _msgspec_dumps)
+
+BACKENDS['json'] = JsonBackend('json', json.loads, _stdlib_dumps)
+
+_backend = None
+
+
+def set_backend(name: str = None) -> JsonBackend:
+    """Select the JSON backend used by the client. By default, the backend set in the environment variable
+    IRIS_CLIENT_JSON_BACKEND is used, otherwise the fastest one installed among orjson, msgspec and the standard
+    json module.
+
+    Args:
+      name: Name of the backend - orjson, msgspec or json
+
+    Returns:
+      JsonBackend selected
+    """
+    global _backend
+
+    name = name or os.getenv('IRIS_CLIENT_JSON_BACKEND')
+    if name and name not in BACKENDS:
+        log.warning(f'JSON backend {name} is not installed. Using {next(iter(BACKENDS))} instead')
+        name = None
+
+    _backend = BACKENDS[name or next(iter(BACKENDS))]
+    return _backend
+
+
+def get_backend() -> JsonBackend:
+    """Return the JSON backend used by the client
+
+    Args:
+
+    Returns:
+      JsonBackend
+    """
+    return _backend
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Decode a JSON document with the selected backend
+
+    Args:
+      data: JSON document
+
+    Returns:
+      Decoded object
+    """
+    return _backend.loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode an object to a JSON document with the selected backend
+
+    Args:
+      obj: Object to encode
+
+    Returns:
+      JSON document in UTF-8 bytes
+    """
+    return _backend.dumps(obj)
+
+
+set_backend()
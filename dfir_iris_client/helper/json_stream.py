@@ -0,0 +1,135 @@
+#  IRIS Client API Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import logging as logger
+from typing import Any, Iterator, Tuple
+
+from requests import Response
+
+from dfir_iris_client.helper import json_backend
+from dfir_iris_client.helper.errors import IrisClientException, ApiRequestFailure
+from dfir_iris_client.helper.utils import ApiResponse
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+log = logger.getLogger(__name__)
+
+
+def _check_response(response: Response, uri: str) -> None:
+    """Raise if a streamed response is an error. The body of errors is small and read in full to report the
+    message of the server.
+
+    Args:
+      response: Streamed response
+      uri: URI requested
+
+    Returns:
+      None
+    """
+    if response.status_code < 400:
+        return
+
+    try:
+        api_response = ApiResponse(response.content, uri=uri, status_code=response.status_code)
+        error = ApiRequestFailure(message=api_response.get_msg(), data=api_response.get_data(), uri=uri)
+
+    except IrisClientException:
+        error = ApiRequestFailure(message=f'Server replied {response.status_code}', uri=uri)
+
+    finally:
+        response.close()
+
+    raise IrisClientException(error)
+
+
+def _walk(document: Any, path: str) -> Any:
+    """Return the value at a dotted path of a parsed document, or None if the path does not exist"""
+    for key in path.split('.') if path else []:
+        if not isinstance(document, dict):
+            return None
+        document = document.get(key)
+
+    return document
+
+
+def iter_items(response: Response, path: str, uri: str = None) -> Iterator[Any]:
+    """Return an iterator over the items of a list of a streamed response, yielded one by one as they are parsed.
+    The response is parsed incrementally with ijson if it is installed, so that only one item at a time is held
+    in memory. Otherwise, the response is parsed in full before the items are yielded.
+    Errors replied by the server are raised right away, before iterating.
+
+    Args:
+      response: Response of a request issued with stream set
+      path: Dotted path of the list in the response, such as data.timeline
+      uri: URI requested, for error reporting
+
+    Returns:
+      Iterator of items
+    """
+    _check_response(response, uri)
+    return _iter_streamed(response, path, pairs=False)
+
+
+def iter_kvitems(response: Response, path: str, uri: str = None) -> Iterator[Tuple[str, Any]]:
+    """Return an iterator over the key and value pairs of an object of a streamed response, yielded one by one as
+    they are parsed. See iter_items.
+
+    Args:
+      response: Response of a request issued with stream set
+      path: Dotted path of the object in the response, such as data
+      uri: URI requested, for error reporting
+
+    Returns:
+      Iterator of (key, value)
+    """
+    _check_response(response, uri)
+    return _iter_streamed(response, path, pairs=True)
+
+
+def _iter_streamed(response: Response, path: str, pairs: bool) -> Iterator:
+    """Parse a streamed response and yield the items of the list, or the pairs of the object, at path.
+    The response is closed once done.
+
+    Args:
+      response: Streamed response
+      path: Dotted path of the list or object
+      pairs: Yield the pairs of an object instead of the items of a list
+
+    Returns:
+      Iterator
+    """
+    try:
+        if ijson is not None:
+            response.raw.decode_content = True
+            if pairs:
+                yield from ijson.kvitems(response.raw, path, use_float=True)
+            else:
+                yield from ijson.items(response.raw, f'{path}.item', use_float=True)
+            return
+
+        log.debug('ijson is not installed. Parsing the response in full')
+        value = _walk(json_backend.loads(response.content), path)
+        if pairs and isinstance(value, dict):
+            yield from value.items()
+
+        elif not pairs and isinstance(value, list):
+            yield from value
+
+    finally:
+        response.close()
@@ -114,3 +114,141 @@ objects_map = {
         "_size": "file_size"
     }
 }
+
+"""objects_list_map
+Case helper method listing all the objects of a type in a case, and key of the list in the data of its response.
+Used to load many objects of the same case at once.
+"""
+objects_list_map = {
+    "asset": ("list_assets", "assets"),
+    "ioc": ("list_iocs", "ioc"),
+    "event": ("list_events", "timeline"),
+    "case_task": ("list_tasks", "tasks"),
+    "evidence": ("list_evidences", "evidences")
+}
+
+"""objects_update_map
+Endpoint updating an object of each type, and whether it accepts partial bodies. For the endpoints which do not,
+the unchanged fields are sent along with the changed ones, see objects_update_current.
+"""
+objects_update_map = {
+    "asset": ("case/assets/update/{id}", True),
+    "ioc": ("case/ioc/update/{id}", True),
+    "event": ("case/timeline/events/update/{id}", False),
+    "case_task": ("case/tasks/update/{id}", False),
+    "global_task": ("global/tasks/update/{id}", False),
+    "note": ("case/notes/update/{id}", False),
+    "evidence": ("case/evidences/update/{id}", False)
+}
+
+"""objects_update_fields
+Field of the body of the update request in which each attribute is saved, as sent by the update methods of the Case
+helper. The attributes not listed are read only, such as the dates set by the server.
+"""
+objects_update_fields = {
+    "asset": {
+        "_name": "asset_name",
+        "_description": "asset_description",
+        "_ip": "asset_ip",
+        "tags": "asset_tags",
+        "_domain": "asset_domain",
+        "_additional_info": "asset_info",
+        "analysis_status": "analysis_status_id",
+        "asset_type": "asset_type_id"
+    },
+    "ioc": {
+        "_value": "ioc_value",
+        "_description": "ioc_description",
+        "_tags": "ioc_tags",
+        "_tlp": "ioc_tlp_id",
+        "_ioc_type": "ioc_type_id"
+    },
+    "event": {
+        "_category": "event_category_id",
+        "_color": "event_color",
+        "_content": "event_content",
+        "date": "event_date",
+        "_in_graph": "event_in_graph",
+        "_in_summary": "event_in_summary",
+        "_raw_content": "event_raw",
+        "_source": "event_source",
+        "_tags": "event_tags",
+        "_title": "event_title",
+        "_tz": "event_tz"
+    },
+    "case_task": {
+        "_title": "task_title",
+        "assignee": "task_assignees_id",
+        "_description": "task_description",
+        "status": "task_status_id",
+        "tags": "task_tags"
+    },
+    "global_task": {
+        "_title": "task_title",
+        "assignee": "task_assignee_id",
+        "_description": "task_description",
+        "status": "task_status_id",
+        "tags": "task_tags"
+    },
+    "note": {
+        "_title": "note_title",
+        "_content": "note_content"
+    },
+    "evidence": {
+        "_description": "file_description",
+        "_filename": "filename",
+        "_hash": "file_hash",
+        "_size": "file_size"
+    }
+}
+
+"""objects_update_current
+For the update endpoints which do not accept partial bodies, Case helper method fetching the current version of an
+object, and the complete body of the update request, as sent by the update methods of the Case helper, with the
+field of the current version each field is taken from. The changed attributes are then set over it.
+"""
+objects_update_current = {
+    "event": ("get_event", {
+        "event_title": "event_title",
+        "event_in_graph": "event_in_graph",
+        "event_in_summary": "event_in_summary",
+        "event_content": "event_content",
+        "event_raw": "event_raw",
+        "event_source": "event_source",
+        "event_assets": "event_assets",
+        "event_iocs": "event_iocs",
+        "event_category_id": "event_category_id",
+        "event_color": "event_color",
+        "event_date": "event_date",
+        "event_tags": "event_tags",
+        "event_tz": "event_tz",
+        "custom_attributes": "custom_attributes"
+    }),
+    "case_task": ("get_task", {
+        "task_assignees_id": "task_assignees",
+        "task_description": "task_description",
+        "task_status_id": "task_status_id",
+        "task_tags": "task_tags",
+        "task_title": "task_title",
+        "custom_attributes": "custom_attributes"
+    }),
+    "global_task": ("get_global_task", {
+        "task_assignee_id": "task_assignee_id",
+        "task_description": "task_description",
+        "task_status_id": "task_status_id",
+        "task_tags": "task_tags",
+        "task_title": "task_title"
+    }),
+    "note": ("get_note", {
+        "note_title": "note_title",
+        "note_content": "note_content",
+        "custom_attributes": "custom_attributes"
+    }),
+    "evidence": ("get_evidence", {
+        "filename": "filename",
+        "file_size": "file_size",
+        "file_description": "file_description",
+        "file_hash": "file_hash",
+        "custom_attributes": "custom_attributes"
+    })
+}
@@ -0,0 +1,340 @@
+#  IRIS Client API Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import fnmatch
+import logging as logger
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Tuple, Union
+from urllib.parse import parse_qs
+
+from dfir_iris_client.helper.utils import ApiResponse
+
+log = logger.getLogger(__name__)
+
+"""DEFAULT_TTLS
+Time to live in seconds of the GET responses cached by default, by pattern of the endpoint path.
+The first pattern matching a path applies. Paths matching none of them are not cached.
+"""
+DEFAULT_TTLS = {
+    'manage/cases/*': 30,
+    'case/summary/fetch': 30,
+    'case/assets/*': 30,
+    'case/ioc/*': 30,
+    'case/tasks/*': 30,
+    'case/evidences/*': 30,
+    'case/notes/*': 30,
+    'case/timeline/events/*': 30,
+    'manage/users/*': 300,
+    'manage/customers/*': 300,
+    'manage/groups/*': 300,
+    'manage/ioc-types/*': 3600,
+    'manage/asset-type/*': 3600,
+    'manage/case-classifications/*': 3600,
+    'manage/tlp/*': 3600,
+    'manage/event-categories/*': 3600,
+    'manage/analysis-status/*': 3600,
+    'manage/task-status/*': 3600,
+    'manage/compromise-status/*': 3600,
+    'manage/outcome-status/*': 3600,
+    'manage/alert-status/*': 3600
+}
+
+"""WRITE_ACTIONS
+Segments of the endpoint paths which modify the objects under the segments preceding them,
+such as update in case/ioc/update/1.
+"""
+WRITE_ACTIONS = frozenset(['add', 'update', 'delete', 'close', 'reopen', 'deactivate', 'rename', 'move', 'edit',
+                           'escalate', 'merge', 'unmerge', 'update-status', 'upload'])
+
+_ID_RE = re.compile(r'^\d+$')
+
+
+def parse_uri(uri: str) -> Tuple[str, Union[str, None]]:
+    """Split a URI requested by a session into its path and its case ID
+
+    Args:
+      uri: URI, such as case/ioc/list?cid=1
+
+    Returns:
+      (path, cid) where cid is None if the URI has none
+    """
+    path, _, query = uri.partition('?')
+    cid = parse_qs(query).get('cid') if query else None
+    return path.strip('/'), cid[0] if cid else None
+
+
+def write_scope(path: str) -> Union[Tuple[str, Union[str, None]], None]:
+    """Return the objects modified by a request, if it is a write
+
+    Args:
+      path: Path of the endpoint, such as case/ioc/update/1
+
+    Returns:
+      (prefix, object_id) such as ('case/ioc', '1'), object_id being None for creations and collections.
+      None if the request does not write.
+    """
+    segments = path.split('/')
+    for index, segment in enumerate(segments):
+        if segment in WRITE_ACTIONS:
+            object_id = segments[index + 1] if index + 1 < len(segments) else None
+            return '/'.join(segments[:index]), object_id
+
+    return None
+
+
+def write_matcher(uri: str) -> Union[Callable[[str, Union[str, None]], bool], None]:
+    """Return a predicate telling whether a GET request is affected by a write. A write affects the objects it
+    modifies and the listings under its prefix, for its case only if it has a case ID.
+
+    Args:
+      uri: URI of the write, such as case/ioc/update/1?cid=1
+
+    Returns:
+      Callable taking the path and the case ID of a GET request, or None if the request does not write
+    """
+    path, cid = parse_uri(uri)
+    scope = write_scope(path)
+    if scope is None:
+        return None
+
+    prefix, object_id = scope
+    prefix = f'{prefix}/' if prefix else ''
+
+    def is_affected(get_path: str, get_cid: Union[str, None]) -> bool:
+        if not get_path.startswith(prefix):
+            return False
+
+        remainder = get_path[len(prefix):]
+        if _ID_RE.match(remainder):
+            return remainder == object_id
+
+        return cid is None or get_cid is None or get_cid == cid
+
+    return is_affected
+
+
+class ResponseCache(object):
+    """Cache of the GET responses of a session, serving repeated requests locally for a while.
+
+    Each endpoint gets the time to live of the first pattern of ttls matching its path, and endpoints matching no
+    pattern are not cached. The cache is bounded and evicts the least recently used responses first.
+
+    The cache is written through: when a request modifying objects succeeds, the responses it affects are evicted.
+    For instance, a successful case/ioc/update/1 evicts case/ioc/1 and the listings under case/ioc of the same case,
+    such as case/ioc/list.
+
+    A GET response received while a write of its scope completed may predate the write. Each scope thus has a
+    generation, bumped by its invalidations: the generation of a GET request is taken before it is sent, and its
+    response is not kept if the generation changed in the meantime.
+
+    The ApiResponses served from the cache are shared by all the requests of the same URI, and their data should
+    not be modified.
+
+    Example:
+        session = ClientSession(apikey=apikey, host=host, response_cache=ResponseCache(ttls={'case/ioc/*': 10}))
+        ...
+        print(session.response_cache.stats())
+    """
+
+    def __init__(self, ttls: Dict[str, float] = None, max_entries: int = 1024):
+        """
+        Args:
+            ttls: Time to live in seconds by pattern of the endpoint paths, as understood by fnmatch.
+                  Default is DEFAULT_TTLS
+            max_entries: Maximum number of responses kept
+        """
+        self._ttls = dict(ttls if ttls is not None else DEFAULT_TTLS)
+        self._max_entries = max_entries
+        self._init_process_state()
+
+    def _init_process_state(self) -> None:
+        """Init the entries, counters and lock of the cache"""
+        self._entries = OrderedDict()
+        self._ttl_of_path = {}
+        self._generations = {}
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evicted': 0, 'invalidated': 0}
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        """Pickle the cache as its configuration only"""
+        return {'ttls': self._ttls, 'max_entries': self._max_entries}
+
+    def __setstate__(self, state: dict) -> None:
+        self._ttls = state['ttls']
+        self._max_entries = state['max_entries']
+        self._init_process_state()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the counters of the cache
+
+        Returns:
+          dict with the number of hits, misses, responses expired, evicted to make room, and invalidated by writes
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def clear(self) -> None:
+        """Drop all the responses
+
+        Returns:
+          None
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def ttl(self, path: str) -> Union[float, None]:
+        """Return the time to live of the responses of an endpoint
+
+        Args:
+          path: Path of the endpoint, such as case/ioc/list
+
+        Returns:
+          Seconds, or None if the endpoint is not cached
+        """
+        if path not in self._ttl_of_path:
+            if len(self._ttl_of_path) > 4 * self._max_entries:
+                self._ttl_of_path = {}
+
+            ttl = None
+            if write_scope(path) is None:
+                ttl = next((ttl for pattern, ttl in self._ttls.items() if fnmatch.fnmatchcase(path, pattern)), None)
+
+            self._ttl_of_path[path] = ttl
+
+        return self._ttl_of_path[path]
+
+    def get(self, uri: str) -> Union[ApiResponse, None]:
+        """Return the cached response of a GET request if it has not expired
+
+        Args:
+          uri: URI requested
+
+        Returns:
+          ApiResponse or None
+        """
+        if not self.ttl(parse_uri(uri)[0]):
+            return None
+
+        with self._lock:
+            entry = self._entries.get(uri)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+
+            expires, _, _, api_response = entry
+            if expires <= time.monotonic():
+                del self._entries[uri]
+                self._stats['expired'] += 1
+                self._stats['misses'] += 1
+                return None
+
+            self._entries.move_to_end(uri)
+            self._stats['hits'] += 1
+            return api_response
+
+    def generation(self, uri: str) -> int:
+        """Return the generation of the scope of a GET request, to be taken before the request is sent. See put
+
+        Args:
+          uri: URI requested
+
+        Returns:
+          Generation, which changes whenever a write invalidates responses of the scope
+        """
+        path, cid = parse_uri(uri)
+        with self._lock:
+            return self._generation(path, cid)
+
+    def _generation(self, path: str, cid: Union[str, None]) -> int:
+        """Sum the invalidation counters of the scopes which include a path. Expects the lock to be held"""
+        scopes = ('*',) if cid is None else (cid, None)
+        segments = path.split('/')
+        generation = 0
+        for index in range(len(segments)):
+            prefix = '/'.join(segments[:index])
+            for scope in scopes:
+                generation += self._generations.get((prefix, scope), 0)
+
+        return generation
+
+    def put(self, uri: str, api_response: ApiResponse, generation: int = None) -> None:
+        """Keep the response of a GET request if its endpoint is cached and it succeeded
+
+        Args:
+          uri: URI requested
+          api_response: Response of the server
+          generation: Generation of the request taken before it was sent. The response is not kept if a write
+                      invalidated its scope since. Default is to keep it
+
+        Returns:
+          None
+        """
+        path, cid = parse_uri(uri)
+        ttl = self.ttl(path)
+        if not ttl or not api_response.is_success():
+            return
+
+        with self._lock:
+            if generation is not None and generation != self._generation(path, cid):
+                log.debug(f'Not caching {uri}, invalidated while it was requested')
+                return
+
+            self._entries[uri] = (time.monotonic() + ttl, path, cid, api_response)
+            self._entries.move_to_end(uri)
+
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evicted'] += 1
+
+    def invalidate(self, uri: str) -> int:
+        """Evict the responses affected by a successful write. Listings are evicted for the case of the write only,
+        or for all the cases if the write has no case ID.
+
+        Args:
+          uri: URI of the write, such as case/ioc/update/1?cid=1
+
+        Returns:
+          Number of responses evicted
+        """
+        is_affected = write_matcher(uri)
+        if is_affected is None:
+            return 0
+
+        path, cid = parse_uri(uri)
+        prefix = write_scope(path)[0]
+        with self._lock:
+            for generation_scope in (cid, '*'):
+                key = (prefix, generation_scope)
+                self._generations[key] = self._generations.get(key, 0) + 1
+
+            stale = [key for key, (_, cached_path, cached_cid, _) in self._entries.items()
+                     if is_affected(cached_path, cached_cid)]
+
+            for key in stale:
+                del self._entries[key]
+
+            self._stats['invalidated'] += len(stale)
+
+        if stale:
+            log.debug(f'{uri} invalidated {len(stale)} cached responses')
+
+        return len(stale)
@@ -0,0 +1,321 @@
+#  IRIS Client API Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import array
+import datetime
+import logging as logger
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Union
+
+from dfir_iris_client.helper import json_backend
+from dfir_iris_client.helper.errors import IrisClientException
+from dfir_iris_client.helper.utils import ApiResponse
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+log = logger.getLogger(__name__)
+
+"""DATETIME_SUFFIXES
+Suffixes of the fields holding a date or a time in the API data, parsed as datetimes by default.
+"""
+DATETIME_SUFFIXES = ('_date', '_time', '_added', '_update')
+
+_UTC_OFFSET_RE = re.compile(r'[T ].*(?:Z|[+-]\d{2}:?\d{2})$')
+
+
+class ResultTable(object):
+    """Columnar view of the records returned by a list endpoint, such as the events of a timeline or a page of
+    alerts. The columns are built in a single pass over the records, which can come from a streamed response,
+    so that the list of dicts is never held in memory as a whole.
+
+    Columns are typed once built:
+        - integers without missing values are stored in compact int64 arrays
+        - floats are stored in float64 arrays, missing values being NaN
+        - dates and times are parsed at once into datetime64 arrays if numpy is installed, or into datetimes.
+          Times with a UTC offset are parsed into aware datetimes, which datetime64 can not hold
+        - other values, including nested objects, are kept as lists
+
+    The table exports to pandas, Arrow and Parquet without copying the numeric and datetime columns. These
+    exports need pandas or pyarrow to be installed.
+
+    Example:
+        table = ResultTable.from_records(case.list_events(stream=True))
+        df = table.to_pandas()
+
+        table = ResultTable.from_response(alert.filter_alerts(per_page=1000), 'alerts')
+        table.to_parquet('alerts.parquet')
+    """
+
+    def __init__(self, columns: Dict[str, Union[list, array.array, Any]] = None):
+        """
+        Args:
+            columns: Dict of column name to the values of the column. All the columns must have the same length
+        """
+        self._columns = dict(columns) if columns else {}
+
+        lengths = {len(values) for values in self._columns.values()}
+        if len(lengths) > 1:
+            raise ValueError('All the columns of a ResultTable must have the same length')
+
+        self._length = lengths.pop() if lengths else 0
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict], columns: List[str] = None,
+                     datetime_columns: List[str] = None) -> 'ResultTable':
+        """Build a table from records, such as the items of a list endpoint.
+
+        Args:
+            records: Iterable of dicts
+            columns: Columns to keep. Default is all the fields found in the records, missing values being None
+            datetime_columns: Columns to parse as datetimes. Default is the fields ending with DATETIME_SUFFIXES
+
+        Returns:
+            ResultTable
+        """
+        data = {column: [] for column in columns} if columns else {}
+        count = 0
+
+        for record in records:
+            if not columns and not record.keys() <= data.keys():
+                for key in record.keys() - data.keys():
+                    data[key] = [None] * count
+
+            for key, values in data.items():
+                values.append(record.get(key))
+
+            count += 1
+
+        if datetime_columns is None:
+            datetime_columns = [column for column in data if column.endswith(DATETIME_SUFFIXES)]
+
+        datetime_columns = set(datetime_columns)
+        return cls({column: _typed_column(values, column in datetime_columns) for column, values in data.items()})
+
+    @classmethod
+    def from_response(cls, api_response: ApiResponse, field: str = None, columns: List[str] = None,
+                      datetime_columns: List[str] = None) -> 'ResultTable':
+        """Build a table from the list data of an ApiResponse.
+
+        Args:
+            api_response: ApiResponse of a list endpoint
+            field: Field of the data holding the list, such as timeline or alerts. Default is the data itself
+            columns: Columns to keep. See from_records
+            datetime_columns: Columns to parse as datetimes. See from_records
+
+        Returns:
+            ResultTable
+        """
+        if api_response.is_error():
+            raise IrisClientException(f'Unable to build a table from an error response. {api_response.get_msg()}')
+
+        return cls.from_records(api_response.iter_data(field), columns=columns, datetime_columns=datetime_columns)
+
+    def __len__(self):
+        return self._length
+
+    def __repr__(self):
+        return f'<ResultTable rows={self._length} columns={len(self._columns)}>'
+
+    def __getitem__(self, column: str):
+        return self._columns[column]
+
+    def __contains__(self, column: str):
+        return column in self._columns
+
+    @property
+    def columns(self) -> List[str]:
+        """Names of the columns"""
+        return list(self._columns)
+
+    @property
+    def dtypes(self) -> Dict[str, str]:
+        """Type of each column: int64, nullable int64, float64, datetime64, datetime or object"""
+        return {column: _column_type(values) for column, values in self._columns.items()}
+
+    def rows(self) -> Iterator[dict]:
+        """Iterate over the rows of the table, as dicts
+
+        Returns:
+            Iterator of dicts
+        """
+        names = list(self._columns)
+        for row in zip(*self._columns.values()):
+            yield dict(zip(names, row))
+
+    def to_pandas(self) -> 'pandas.DataFrame':
+        """Export the table to a pandas DataFrame. Numeric and datetime64 columns are shared with the DataFrame
+        rather than copied. Columns of times with a UTC offset become timezone aware columns in UTC.
+
+        Returns:
+            pandas.DataFrame
+        """
+        if pandas is None:
+            raise IrisClientException('pandas is needed to export a ResultTable to a DataFrame')
+
+        series = {}
+        for column, values in self._columns.items():
+            values = _as_numpy(values)
+            if isinstance(values, list):
+                column_type = _column_type(values)
+                if column_type == 'datetime':
+                    # Times with a UTC offset are converted to UTC, pandas columns having a single timezone
+                    values = pandas.to_datetime(values, utc=any(value is not None and value.tzinfo is not None
+                                                                for value in values))
+
+                elif column_type == 'nullable int64':
+                    values = pandas.array(values, dtype='Int64')
+
+            series[column] = values
+
+        return pandas.DataFrame(series, copy=False)
+
+    def to_arrow(self) -> 'pyarrow.Table':
+        """Export the table to an Arrow table. Numeric and datetime64 columns are shared with the Arrow table
+        rather than copied. Nested objects which Arrow can not type consistently are stored as JSON strings.
+
+        Returns:
+            pyarrow.Table
+        """
+        if pyarrow is None:
+            raise IrisClientException('pyarrow is needed to export a ResultTable to Arrow')
+
+        arrays = {}
+        for column, values in self._columns.items():
+            values = _as_numpy(values)
+            try:
+                arrays[column] = pyarrow.array(values)
+
+            except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError, TypeError):
+                arrays[column] = pyarrow.array([json_backend.dumps(value).decode('utf-8') if value is not None
+                                                else None for value in values])
+
+        return pyarrow.table(arrays)
+
+    def to_parquet(self, path: Union[str, Path], **kwargs) -> None:
+        """Write the table to a Parquet file
+
+        Args:
+            path: File to write
+            **kwargs: Options of pyarrow.parquet.write_table, such as compression
+
+        Returns:
+            None
+        """
+        if pyarrow is None:
+            raise IrisClientException('pyarrow is needed to export a ResultTable to Parquet')
+
+        pyarrow.parquet.write_table(self.to_arrow(), str(path), **kwargs)
+
+
+def _typed_column(values: list, is_datetime: bool) -> Union[list, array.array, Any]:
+    """Convert the values of a column to the most compact type able to hold them
+
+    Args:
+        values: Values of the column
+        is_datetime: The column holds dates or times as strings
+
+    Returns:
+        array, datetime64 array or list
+    """
+    types = {type(value) for value in values}
+
+    if types == {int}:
+        try:
+            return array.array('q', values)
+        except OverflowError:
+            return values
+
+    if types and types <= {int, float, type(None)} and float in types:
+        return array.array('d', [float('nan') if value is None else value for value in values])
+
+    if is_datetime and types and types <= {str, type(None)}:
+        return _parse_datetimes(values)
+
+    return values
+
+
+def _parse_datetimes(values: list) -> Union[list, Any]:
+    """Parse a column of ISO 8601 dates and times. The column is parsed at once by numpy if it is installed.
+    numpy has no timezones and would silently shift the times with a UTC offset to UTC, so a column holding such
+    times is parsed one by one instead, into aware datetimes. A column mixing times with and without an offset
+    can not be ordered, and is left as is, as is a column some of whose values are not dates.
+
+    Args:
+        values: Strings or None
+
+    Returns:
+        datetime64 array, list of datetimes, or values
+    """
+    aware = [bool(_UTC_OFFSET_RE.search(value)) for value in values if value]
+    if any(aware):
+        if not all(aware):
+            log.warning('Column mixing times with and without a UTC offset left unparsed')
+            return values
+
+    elif numpy is not None:
+        try:
+            return numpy.array(values, dtype='datetime64[us]')
+        except ValueError:
+            pass
+
+    try:
+        return [datetime.datetime.fromisoformat(value) if value else None for value in values]
+
+    except ValueError:
+        return values
+
+
+def _column_type(values) -> str:
+    """Return the type of a column"""
+    if isinstance(values, array.array):
+        return 'int64' if values.typecode == 'q' else 'float64'
+
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        return 'datetime64'
+
+    types = {type(value) for value in values}
+    types.discard(type(None))
+
+    if types == {datetime.datetime}:
+        return 'datetime'
+
+    if types == {int}:
+        return 'nullable int64'
+
+    return 'object'
+
+
+def _as_numpy(values):
+    """View an array column as a numpy array without copying it. Other columns are returned as is."""
+    if numpy is not None and isinstance(values, array.array):
+        return numpy.frombuffer(values, dtype='int64' if values.typecode == 'q' else 'float64')
+
+    return values
@@ -0,0 +1,476 @@
+#  IRIS Client API Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import contextvars
+import inspect
+import logging as logger
+import os
+from typing import Any, Callable, List
+
+from dfir_iris_client.helper.concurrency import DEFAULT_MAX_WORKERS, BulkResult, RateLimiter, run_concurrently
+from dfir_iris_client.helper.errors import IrisClientException
+
+log = logger.getLogger(__name__)
+
+"""OPERATIONS_ORDER
+Order in which the operations on each type of object are flushed. Creations and updates follow this order, so that
+objects are created before the objects linking to them. Deletions follow the reverse order.
+Types not listed are flushed last, or first for deletions.
+"""
+OPERATIONS_ORDER = ['case', 'case_outcome_status', 'summary', 'notes_directory', 'notes_group', 'note', 'asset',
+                    'ioc', 'event', 'task', 'global_task', 'evidence', 'ds_folder', 'ds_file']
+
+"""_OPERATION_PREFIXES
+Prefixes of the Case methods recorded by a unit of work, and the kind of operation they perform.
+"""
+_OPERATION_PREFIXES = {
+    'add_': 'create',
+    'update_': 'update',
+    'delete_': 'delete'
+}
+
+"""_OPERATION_METHODS
+Case methods writing objects which are recorded by a unit of work although their name has none of the prefixes of
+_OPERATION_PREFIXES, and the kind of operation they perform. Other methods, such as set_cid, are never recorded.
+"""
+_OPERATION_METHODS = {
+    'set_summary': 'update',
+    'set_case_outcome_status': 'update',
+    'close_case': 'update',
+    'reopen_case': 'update',
+    'rename_ds_folder': 'update',
+    'move_ds_file': 'update',
+    'move_ds_folder': 'update'
+}
+
+"""_DELETE_METHODS
+Case methods deleting an IrisObject, by object name.
+"""
+_DELETE_METHODS = {
+    'asset': 'delete_asset',
+    'ioc': 'delete_ioc',
+    'event': 'delete_event',
+    'case_task': 'delete_task',
+    'global_task': 'delete_global_task',
+    'note': 'delete_note',
+    'evidence': 'delete_evidence'
+}
+
+_current_unit_of_work = contextvars.ContextVar('iris_unit_of_work', default=None)
+
+
+def _reset_after_fork() -> None:
+    """Detach a forked child from the unit of work active when it was forked. The child holds a copy of it which
+    is never flushed by the parent, so the calls of the child are issued directly instead of being recorded.
+    """
+    _current_unit_of_work.set(None)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def current_unit_of_work():
+    """Return the unit of work active in the current context, if any
+
+    Args:
+
+    Returns:
+        UnitOfWork or None
+    """
+    return _current_unit_of_work.get()
+
+
+class PendingResult(object):
+    """Outcome of an operation recorded by a unit of work, which is only known once the unit of work is flushed.
+    It is returned by the recorded calls in place of the ApiResponse. Calls merged in the same operation share the
+    same PendingResult.
+
+    Example:
+        with session.unit_of_work() as uow:
+            pending = uow.case(cid=1).add_ioc(value='evil.com', ioc_type='domain')
+
+        ioc_id = pending.result().get_data().get('ioc_id')
+    """
+
+    __slots__ = ('label', '_outcome', '_state')
+
+    def __init__(self, label: str):
+        self.label = label
+        self._outcome = None
+        self._state = 'pending'
+
+    def __repr__(self):
+        return f'<PendingResult {self.label} {self._state}>'
+
+    def done(self) -> bool:
+        """True once the operation was issued"""
+        return self._state == 'done'
+
+    def result(self) -> Any:
+        """Return the outcome of the operation, usually an ApiResponse
+
+        Returns:
+            Outcome of the operation. The exception it raised, if any, is raised again
+        """
+        if self._state == 'pending':
+            raise IrisClientException(f'{self.label} is not issued until the unit of work is flushed')
+
+        if self._state == 'discarded':
+            raise IrisClientException(f'{self.label} was discarded without being issued')
+
+        if isinstance(self._outcome, Exception):
+            raise self._outcome
+
+        return self._outcome
+
+    def _set(self, outcome: Any) -> None:
+        self._outcome = outcome
+        self._state = 'done'
+
+    def _discard(self) -> None:
+        if self._state == 'pending':
+            self._state = 'discarded'
+
+
+class _Operation(object):
+    """An operation recorded by a unit of work"""
+
+    __slots__ = ('kind', 'object_type', 'key', 'identity', 'label', 'func', 'arguments', 'pending')
+
+    def __init__(self, kind: str, object_type: str, key: Any, label: str, func: Callable, arguments: dict,
+                 identity: Any = None):
+        self.kind = kind
+        self.object_type = object_type
+        self.key = key
+        self.identity = identity
+        self.label = label
+        self.func = func
+        self.arguments = arguments
+        self.pending = PendingResult(label)
+
+    def __call__(self):
+        return self.func(**self.arguments)
+
+
+class _RecordingCase(object):
+    """Stands for a Case helper within a unit of work. Calls to methods creating, updating or deleting objects are
+    recorded to be issued when the unit of work is flushed, and return a PendingResult instead of an ApiResponse.
+    Other calls, such as getters, listings and set_cid, are issued immediately.
+    """
+
+    def __init__(self, unit_of_work, case):
+        self._uow = unit_of_work
+        self._case = case
+
+    def __getattr__(self, item):
+        attribute = getattr(self._case, item)
+        kind = _operation_kind(item)
+        if kind is None or not callable(attribute):
+            return attribute
+
+        def record(*args, **kwargs):
+            return self._uow.record_call(attribute, *args, **kwargs)
+
+        return record
+
+
+def _operation_kind(method_name: str):
+    """Return the kind of operation of a Case method from its name, or None if it is not recorded"""
+    if method_name in _OPERATION_METHODS:
+        return _OPERATION_METHODS[method_name]
+
+    for prefix, kind in _OPERATION_PREFIXES.items():
+        if method_name.startswith(prefix):
+            return kind
+
+    return None
+
+
+def _object_id_argument(object_type: str, signature: inspect.Signature):
+    """Return the name of the argument of a Case method identifying the object it writes. It is the argument named
+    after the type of object, such as event_id for events, comment_id for comments or folder_id for datastore
+    folders, otherwise the first argument ending with _id. Other IDs, such as parent_event_id, are data of the call.
+
+    Args:
+        object_type: Type of object, from the name of the method
+        signature: Signature of the bound method
+
+    Returns:
+        Name of the argument, or None if the method has none
+    """
+    named = f"{object_type.rsplit('_', 1)[-1]}_id"
+    if named in signature.parameters:
+        return named
+
+    for parameter in signature.parameters.values():
+        if parameter.name.endswith('_id') and parameter.kind in (inspect.Parameter.POSITIONAL_ONLY,
+                                                                 inspect.Parameter.POSITIONAL_OR_KEYWORD):
+            return parameter.name
+
+    return None
+
+
+def _order_of(object_type: str) -> int:
+    """Return the rank of a type of object in OPERATIONS_ORDER"""
+    try:
+        return OPERATIONS_ORDER.index(object_type)
+    except ValueError:
+        return len(OPERATIONS_ORDER)
+
+
+class UnitOfWork(object):
+    """Collects creations, updates and deletions of objects, and issues them at once when flushed.
+
+    Operations are recorded through the Case helper returned by case(), or by saving and deleting IrisObjects while
+    the unit of work is active. Repeated updates of the same object are merged in a single request, and updates of
+    deleted objects are dropped. On flush, creations are issued first, then updates, then deletions, each type of
+    object in the order of OPERATIONS_ORDER. The operations of the same step are issued concurrently, except for
+    updates of the same object by different methods or saves, which are issued one after the other in the order they
+    were recorded.
+
+    Used as a context manager, the unit of work is flushed on exit, unless an exception was raised. The outcome of
+    every operation is then available in result.
+
+    Example:
+        with session.unit_of_work() as uow:
+            case = uow.case(cid=1)
+            for ioc_id in ioc_ids:
+                case.update_ioc(ioc_id, ioc_tags=['retagged'])
+
+        print(uow.result.errors())
+
+    The recorded calls return a PendingResult rather than an ApiResponse, since nothing is sent before the flush.
+    """
+
+    def __init__(self, session, max_workers: int = DEFAULT_MAX_WORKERS, rate_limit: float = None,
+                 stop_on_error: bool = False):
+        """
+        Args:
+            session: ClientSession the operations are issued with
+            max_workers: Maximum number of concurrent requests
+            rate_limit: Maximum number of requests per second. Default is unlimited
+            stop_on_error: Stop flushing at the end of the first step in which an operation failed
+        """
+        self._s = session
+        self._max_workers = max_workers
+        self._rate_limit = rate_limit
+        self._stop_on_error = stop_on_error
+
+        self._operations = {}
+        self._saved_objects = {}
+        self._token = None
+        self._counter = 0
+
+        self.result = None
+
+    def __enter__(self):
+        self._token = _current_unit_of_work.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _current_unit_of_work.reset(self._token)
+        self._token = None
+
+        if exc_type is not None:
+            log.warning(f'Unit of work discarded after an exception. {len(self)} operations were not issued')
+            self.discard()
+            return
+
+        self.flush()
+
+    def __len__(self):
+        return len(self._operations) + len(self._saved_objects)
+
+    @property
+    def session(self):
+        """Session of the unit of work"""
+        return self._s
+
+    def case(self, cid: int = None) -> Any:
+        """Return a Case helper whose creations, updates and deletions are recorded in the unit of work.
+
+        Args:
+            cid: Case ID
+
+        Returns:
+            Recording Case helper
+        """
+        from dfir_iris_client.case import Case
+
+        return _RecordingCase(self, Case(session=self._s, case_id=cid))
+
+    def record_call(self, method: Callable, *args, **kwargs) -> PendingResult:
+        """Record a call to a Case method. Updates of the same object with the same method are merged, the
+        arguments set by the last call taking precedence. Objects are identified by their type, the argument of the
+        method holding their ID (see _object_id_argument) and the case ID.
+
+        Args:
+            method: Bound Case method
+            *args: Positional arguments of the call
+            **kwargs: Keyword arguments of the call
+
+        Returns:
+            PendingResult of the operation, holding its ApiResponse once the unit of work is flushed
+        """
+        name = method.__name__
+        kind = _operation_kind(name)
+        if kind is None:
+            raise IrisClientException(f'{name} is not a creation, update or deletion and can not be recorded')
+
+        object_type = name.split('_', 1)[1]
+        signature = inspect.signature(method)
+        arguments = signature.bind_partial(*args, **kwargs).arguments
+        cid = arguments.get('cid') or getattr(method.__self__, '_cid', None)
+
+        object_id = arguments.get(_object_id_argument(object_type, signature))
+
+        if kind == 'create':
+            self._counter += 1
+            key = (kind, name, self._counter)
+
+        else:
+            key = (kind, name, object_id, cid)
+
+        if kind == 'update' and key in self._operations:
+            # Unset arguments of the later call leave the values of the earlier calls untouched
+            self._operations[key].arguments.update({argument: value for argument, value in arguments.items()
+                                                    if value is not None})
+            return self._operations[key].pending
+
+        if kind == 'delete':
+            self._drop_updates(object_type, object_id, cid)
+
+        ids = object_id if object_id is not None else ''
+        label = f'{name}({ids})' if kind != 'create' else f'{name}#{self._counter}'
+        identity = (object_type, object_id, cid) if kind != 'create' else None
+        operation = _Operation(kind, object_type, key, label, method, dict(arguments), identity=identity)
+        self._operations[key] = operation
+        return operation.pending
+
+    def save(self, obj) -> None:
+        """Record the save of an IrisObject. An object saved several times is saved once, with all its changes.
+
+        Args:
+            obj: IrisObject
+
+        Returns:
+            None
+        """
+        self._saved_objects[id(obj)] = obj
+
+    def delete(self, obj) -> None:
+        """Record the deletion of an IrisObject. Pending saves of the object are dropped.
+
+        Args:
+            obj: IrisObject
+
+        Returns:
+            None
+        """
+        method_name = _DELETE_METHODS.get(obj.object_name)
+        if method_name is None:
+            raise IrisClientException(f'Objects {obj.object_name} can not be deleted')
+
+        self._saved_objects.pop(id(obj), None)
+        kwargs = {} if obj.object_name == 'global_task' else {'cid': obj._cid}
+        getattr(self.case(obj._cid), method_name)(obj.id, **kwargs)
+
+    def discard(self) -> None:
+        """Forget all the recorded operations. Their PendingResults are discarded"""
+        for operation in self._operations.values():
+            operation.pending._discard()
+
+        self._operations.clear()
+        self._saved_objects.clear()
+
+    def flush(self) -> BulkResult:
+        """Issue all the recorded operations and forget them.
+
+        Args:
+
+        Returns:
+            BulkResult keyed by a label of each operation
+        """
+        steps = self._plan()
+        self._operations.clear()
+        self._saved_objects.clear()
+
+        rate_limiter = RateLimiter(self._rate_limit) if self._rate_limit else None
+        results = {}
+
+        for step in steps:
+            outcomes = run_concurrently(lambda operation: operation(), step, max_workers=self._max_workers,
+                                        return_exceptions=True, rate_limiter=rate_limiter)
+            for operation, outcome in zip(step, outcomes):
+                operation.pending._set(outcome)
+
+            step_result = BulkResult({operation.label: outcome for operation, outcome in zip(step, outcomes)})
+            results.update(step_result.results)
+
+            if self._stop_on_error and not step_result:
+                log.error(f'Unit of work stopped after failures: {step_result.errors()}')
+                for operation in (operation for later_step in steps for operation in later_step):
+                    operation.pending._discard()
+                break
+
+        self.result = BulkResult(results)
+        return self.result
+
+    def _drop_updates(self, object_type: str, object_id: Any, cid: int) -> None:
+        """Drop the pending updates and saves of an object about to be deleted"""
+        identity = (object_type, object_id, cid)
+        for key, operation in list(self._operations.items()):
+            if operation.kind == 'update' and operation.identity == identity:
+                operation.pending._discard()
+                del self._operations[key]
+
+        for key, obj in list(self._saved_objects.items()):
+            if self._saved_identity(obj) == identity:
+                del self._saved_objects[key]
+
+    @staticmethod
+    def _saved_identity(obj) -> tuple:
+        """Return the identity of a saved IrisObject, as recorded for the calls of Case methods"""
+        object_type = 'task' if obj.object_name == 'case_task' else obj.object_name
+        return object_type, obj.id, obj._cid
+
+    def _plan(self) -> List[List[_Operation]]:
+        """Split the recorded operations in steps to be issued one after the other"""
+        operations = list(self._operations.values())
+
+        for obj in self._saved_objects.values():
+            identity = self._saved_identity(obj)
+            label = f'save_{obj.object_name}({obj.id})'
+            operations.append(_Operation('update', identity[0], None, label, obj._flush_save, {}, identity=identity))
+
+        steps = {}
+        updates = {}
+        for operation in operations:
+            rank = _order_of(operation.object_type)
+            if operation.kind == 'create':
+                step = (0, rank, 0)
+            elif operation.kind == 'update':
+                # Concurrent updates of the same object could overwrite each other, so they are issued one per step
+                repeat = updates.get(operation.identity, 0)
+                updates[operation.identity] = repeat + 1
+                step = (1, rank, repeat)
+            else:
+                step = (2, -rank, 0)
+
+            steps.setdefault(step, []).append(operation)
+
+        return [steps[step] for step in sorted(steps)]
@@ -14,22 +14,26 @@
 #  You should have received a copy of the GNU Lesser General Public License
 #  along with this program; if not, write to the Free Software Foundation,
 #  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
-from typing import Union, List
+from typing import Iterator, Union, List
 
+import contextlib
+import hashlib
 import logging as log
-import json
+import re
 
 from types import SimpleNamespace
 
+from dfir_iris_client.helper import json_backend
 from dfir_iris_client.helper.errors import ApiRequestFailure, InvalidApiResponse, OperationSuccess, IrisStatus, \
     OperationFailure, \
     InvalidObjectMapping, BaseOperationSuccess, IrisClientException
 from functools import reduce
+from operator import itemgetter
 from dfir_iris_client.helper.objects_def import objects_map
 
 
 def get_iris_session():
-    """Return the global variable client session
+    """Return the session of the current context set by use_session, otherwise the global variable client session
 
     Args:
 
@@ -37,12 +41,153 @@ def get_iris_session():
       ClientSession
 
     """
-    from dfir_iris_client.session import client_session
-    if client_session:
-        return client_session
+    from dfir_iris_client.session import get_session
+    session = get_session()
+    if session:
+        return session
     raise IrisClientException('IRIS client session not found')
 
 
+def _is_data_descriptor(cls, attribute: str) -> bool:
+    """Tell whether an attribute of a class is handled by a data descriptor, such as a property or
+    an iris_obj_property. These attributes need to be set with setattr to go through their setter.
+
+    Args:
+      cls: Class to inspect
+      attribute: Attribute name
+
+    Returns:
+      bool
+    """
+    for klass in cls.__mro__:
+        if attribute in vars(klass):
+            return hasattr(vars(klass)[attribute], '__set__')
+
+    return False
+
+
+def _compile_mapper(cls, object_name: str, strict: bool = False):
+    """Build the mapping function of a class from its objects_def entry. The entry is resolved once, and the
+    consecutive attributes which are not handled by a descriptor are fetched at once with an itemgetter and set
+    with a single update of the instance __dict__. The attributes are set in the order of objects_def, so that the
+    descriptors and set_id see the same state as with a setattr of each attribute in turn.
+
+    Args:
+      cls: Class of the objects to map
+      object_name: Name of the objects_def entry
+      strict: Fold the strict checks in the mapper
+
+    Returns:
+      Callable taking the object and the data dict
+    """
+    obj_def = objects_map.get(object_name)
+    if not obj_def:
+        raise IrisClientException(InvalidObjectMapping(f'Unrecognised {object_name} for mapping'))
+
+    # Each step is either a run of direct attributes (attributes, fields, getter), or a single attribute set
+    # through a descriptor or set_id (attribute, field)
+    steps = []
+    run = []
+
+    def close_run() -> None:
+        if not run:
+            return
+
+        attributes = tuple(attribute for attribute, _ in run)
+        fields = tuple(field for _, field in run)
+        if len(fields) > 1:
+            getter = itemgetter(*fields)
+        else:
+            getter = lambda data, field=fields[0]: (data[field],)
+
+        steps.append((attributes, fields, getter))
+        run.clear()
+
+    for attribute, field in obj_def.items():
+        if attribute == 'id' or _is_data_descriptor(cls, attribute):
+            close_run()
+            steps.append((attribute, field))
+
+        else:
+            run.append((attribute, field))
+
+    close_run()
+    all_fields = frozenset(obj_def.values())
+
+    def check_strict(obj, data_obj: dict, obj_type: str = None) -> None:
+        obj_type = obj_type if obj_type else object_name
+        for attribute, field in obj_def.items():
+            if not hasattr(obj, attribute):
+                raise IrisClientException(InvalidObjectMapping(message=f'Invalid object mapping for {obj_type}. '
+                                                                       f'Missing attribute'
+                                                                       f' {attribute} for {field}',
+                                                               data=data_obj))
+
+        missing = all_fields.difference(data_obj)
+        if missing:
+            field = next(field for field in obj_def.values() if field in missing)
+            raise IrisClientException(
+                InvalidObjectMapping(message=f'Invalid object mapping for {obj_type}. Missing field'
+                                             f' {field} in server data',
+                                     data=data_obj))
+
+    def mapper(obj, data_obj: dict, obj_type: str = None) -> None:
+        if strict:
+            check_strict(obj, data_obj, obj_type)
+
+        obj_dict = getattr(obj, '__dict__', None)
+        for step in steps:
+            if len(step) == 2:
+                attribute, field = step
+                if attribute == 'id':
+                    obj.set_id(data_obj.get(field))
+                else:
+                    setattr(obj, attribute, data_obj.get(field))
+
+                continue
+
+            attributes, fields, getter = step
+            try:
+                values = getter(data_obj)
+
+            except KeyError:
+                values = tuple(data_obj.get(field) for field in fields)
+
+            if obj_dict is not None:
+                obj_dict.update(zip(attributes, values))
+
+            else:
+                for attribute, value in zip(attributes, values):
+                    setattr(obj, attribute, value)
+
+    return mapper
+
+
+_mappers = {}
+
+
+def get_object_mapper(cls, object_name: str = None, strict: bool = False):
+    """Return the compiled mapping function of a class, building it on first use.
+
+    Args:
+      cls: Class of the objects to map
+      object_name: Name of the objects_def entry. Default is cls.object_name
+      strict: Fail if an attribute or a field is missing
+
+    Returns:
+      Callable taking the object and the data dict
+    """
+    object_name = object_name if object_name else cls.object_name
+    key = (cls, object_name, strict)
+
+    mapper = _mappers.get(key)
+    if mapper is None:
+        mapper = _compile_mapper(cls, object_name, strict=strict)
+        _mappers[key] = mapper
+
+    return mapper
+
+
 def map_object(obj, data_obj: dict, obj_type=None, strict=False) -> IrisStatus:
     """Map a Python IrisObject with a known Iris API return. The mapping is done
     thanks to objects_def. Each field is attributed to an attribute of the
@@ -51,9 +196,11 @@ def map_object(obj, data_obj: dict, obj_type=None, strict=False) -> IrisStatus:
     The methods takes advantage of iris_abj_attribute and iris_dynamic_attribute to
     preprocess data if needed.
 
+    The mapping of each object type is compiled on first use, see get_object_mapper.
+
     Args:
       obj: Object where attributes need to be set
-      obj_type: Force the object type. Unused (Default value = None)
+      obj_type: Force the object type. Only used in error messages (Default value = None)
       data_obj: Dict describing the data to set
       strict: Set to true to fail if an attribute is missing (Default value = False)
 
@@ -64,83 +211,232 @@ def map_object(obj, data_obj: dict, obj_type=None, strict=False) -> IrisStatus:
     if obj is None:
         return OperationFailure('Unable to map object. Provided object is null')
 
-    obj_def = objects_map.get(obj.object_name)
-    if not obj_def:
-        raise IrisClientException(InvalidObjectMapping(f'Unrecognised {obj_def} for mapping'))
-
-    for attribute in obj_def:
-
-        field = obj_def[attribute]
-        if not hasattr(obj, attribute) and strict:
-            obj_type = obj_type if obj_type else obj.object_name
-            raise IrisClientException(InvalidObjectMapping(message=f'Invalid object mapping for {obj_type}. '
-                                                                   f'Missing attribute'
-                                                                   f' {attribute} for {field}',
-                                                           data=data_obj))
-        if field not in data_obj and strict:
-            obj_type = obj_type if obj_type else obj.object_name
-            raise IrisClientException(
-                InvalidObjectMapping(message=f'Invalid object mapping for {obj_type}. Missing field'
-                                             f' {field} in server data',
-                                     data=data_obj))
+    get_object_mapper(type(obj), obj.object_name, strict=strict)(obj, data_obj, obj_type)
 
-        if attribute == 'id':
-            obj.set_id(data_obj.get(field))
+    return BaseOperationSuccess
 
-        else:
-            setattr(obj, attribute, data_obj.get(field))
 
-    return BaseOperationSuccess
+def map_objects(cls, data_objs: List[dict], strict=False, partial=False, identity_map=True, **kwargs) -> list:
+    """Build many IrisObjects of the same class from a list of Iris API returns, in one pass.
+    The mapping is resolved once for the whole list, see map_object.
 
+    By default, the objects are looked up in the identity map of the session first. If an object of the same
+    type, case and ID is already loaded, this canonical instance is returned instead of a new one. It is
+    refreshed with the data, unless it holds unsaved changes or the data is partial and the instance is not.
+    Objects of another class than the canonical instance are built as usual but not registered.
+
+    Partial objects built together are grouped in a HydrationBatch, so that accessing one of them fully loads them
+    all at once.
+
+    Args:
+      cls: IrisObject class to instantiate
+      data_objs: List of dicts describing the data of each object
+      strict: Set to true to fail if an attribute is missing (Default value = False)
+      partial: The data only partially describes the objects (Default value = False)
+      identity_map: Return the canonical instances of the objects already loaded (Default value = True)
+      **kwargs: Arguments passed to the class at init, such as cid. A session argument is passed as is to the
+                CompactIrisObjects, and used as the session of the current context to build the other IrisObjects
+
+    Returns:
+      List of objects, in the order of data_objs
 
-class ApiResponse(object):
-    """Handles API returns and error. It parses the standard API returns and build an
-    standard ApiResponse object.
     """
+    from dfir_iris_client.helper.hydration import HydrationBatch
+    from dfir_iris_client.helper.identity_map import get_identity_map
+    from dfir_iris_client.helper.iris_object import CompactIrisObject
+    from dfir_iris_client.session import use_session
+
+    mapper = get_object_mapper(cls, strict=strict)
+    id_field = objects_map.get(cls.object_name).get('id')
+
+    session = kwargs.get('session')
+    init_context = contextlib.nullcontext
+    if session is not None and not issubclass(cls, CompactIrisObject):
+        kwargs = {key: value for key, value in kwargs.items() if key != 'session'}
+        init_context = lambda: use_session(session)
+
+    imap = None
+    if identity_map and id_field:
+        imap = get_identity_map(session if session is not None else get_iris_session())
+
+    object_name = cls.object_name
+    cid = kwargs.get('cid')
+    batch = HydrationBatch() if partial and len(data_objs) > 1 else None
+
+    objs = []
+    for data_obj in data_objs:
+        canonical = imap.get(object_name, cid, data_obj.get(id_field)) if imap is not None else None
+
+        if canonical is not None and isinstance(canonical, cls):
+            if canonical.is_synced and (not partial or getattr(canonical, '_is_partial', False)):
+                if hasattr(canonical, '_is_partial'):
+                    canonical._is_partial = partial
+
+                mapper(canonical, data_obj)
+                canonical._set_sync_state(True)
+
+            if batch is not None and getattr(canonical, '_is_partial', False):
+                batch.add(canonical)
+
+            objs.append(canonical)
+            continue
+
+        with init_context():
+            obj = cls(**kwargs)
+
+        mapper(obj, data_obj)
+        if hasattr(obj, '_is_partial'):
+            obj._is_partial = partial
+
+        if hasattr(obj, '_set_sync_state'):
+            obj._set_sync_state(True)
+
+        if imap is not None and canonical is None:
+            obj = imap.add(obj)
 
-    def __init__(self, response: str = None, uri: str = None):
-        try:
+        if batch is not None:
+            batch.add(obj)
 
-            self._response = json.loads(response)
+        objs.append(obj)
 
-        except Exception as e:
-            log.error(e)
+    return objs
 
+
+"""_STATUS_TAIL_RE
+Matches the status when it is the last key of the response, as the server sorts the keys of its responses. The
+closing brace ending the document guarantees that the status belongs to the top-level object.
+"""
+_STATUS_TAIL_RE = re.compile(rb'"status"\s*:\s*"([a-z_]+)"\s*}\s*$')
+_STATUS_TAIL_RE_STR = re.compile(_STATUS_TAIL_RE.pattern.decode('ascii'))
+
+
+class ApiResponse(object):
+    """Handles API returns and error. It parses the standard API returns and build an
+    standard ApiResponse object. The response is parsed with the JSON backend selected in json_backend.
+
+    The raw response is kept as is and only parsed when its content is first accessed. Checking the status of
+    a response does not parse it whenever the status can be read from the end of the document.
+    """
+
+    def __init__(self, response: Union[str, bytes] = None, uri: str = None, digest: bytes = None,
+                 status_code: int = None):
         if not response:
             raise IrisClientException("Empty response from server")
 
+        self._raw = response
+        self._response = None
         self._uri = uri
+        self._digest = digest
+        # Raw response kept for get_digest only, until the digest is computed
+        self._body = response if digest is None else None
+        self._status_code = status_code
 
     def __repr__(self):
-        return json.dumps(self.as_json())
+        size = len(self._raw) if self._raw is not None else None
+        return f'<ApiResponse uri={self._uri} status={self.get_status()} size={size}>'
 
     def __bool__(self):
         return self.is_success()
 
+    def _load(self) -> Union[dict, None]:
+        """Parse the raw response on first call, and return the parsed response.
+        The raw response is released once parsed, unless it is still needed to compute its digest.
+
+        Returns:
+            dict or None if the response is not valid JSON
+        """
+        raw = self._raw
+        if raw is not None:
+            try:
+
+                response = json_backend.loads(raw)
+                self._response = response if isinstance(response, dict) else None
+
+            except Exception as e:
+                log.error(e)
+
+            self._raw = None
+
+        return self._response
+
+    def get_digest(self) -> bytes:
+        """Return a hash of the raw response, to tell whether two responses are identical. It is computed on first
+        call, on the raw response whether it was parsed or not.
+
+        Returns:
+            bytes
+        """
+        if self._digest is None:
+            body = self._body
+            if body is None:
+                # Computed meanwhile by another thread
+                return self._digest
+
+            if isinstance(body, str):
+                body = body.encode('utf-8')
+
+            self._digest = hashlib.blake2b(body, digest_size=16).digest()
+            self._body = None
+
+        return self._digest
+
+    def get_status(self) -> Union[str, None]:
+        """Return the status of the response, such as success or error, parsing it only if needed
+
+        Returns:
+            str or None if the response is invalid
+        """
+        raw = self._raw
+        if raw is not None:
+            match = _STATUS_TAIL_RE.search(raw[-64:]) if isinstance(raw, bytes) else \
+                _STATUS_TAIL_RE_STR.search(raw[-64:])
+            if match:
+                status = match.group(1)
+                return status.decode('utf-8') if isinstance(status, bytes) else status
+
+        response = self._load()
+        return response.get('status') if response is not None else None
+
+    def get_status_code(self) -> Union[int, None]:
+        """Return the HTTP status code the server replied with
+
+        Returns:
+            int or None if the response was not received from the server
+        """
+        return self._status_code
+
     def is_error(self):
         """:return: Bool - True if return is error"""
-        if not hasattr(self, "_response"):
-            return True
-
-        if self._response.get('status') != "success":
-            return True
-        return False
+        return self.get_status() != "success"
 
     def is_success(self):
         """:return: Bool - True if return is success"""
-        if not hasattr(self, "_response"):
-            return False
-
-        if self._response.get('status') == "success":
-            return True
-        return False
+        return self.get_status() == "success"
 
     def get_data(self):
         """ """
-        if not hasattr(self, "_response"):
+        response = self._load()
+        if response is None:
             return None
 
-        return self._response.get('data')
+        return response.get('data')
+
+    def iter_data(self, field: str = None) -> Iterator:
+        """Iterate over the items of a list data section, or of a list field of the data section, without copying it.
+        Nothing is yielded if the response is an error or the data is not a list.
+
+        Args:
+            field: Field of the data section holding the list. Default is the data section itself
+
+        Returns:
+            Iterator of items
+        """
+        data = self.get_data()
+        if field is not None:
+            data = data.get(field) if isinstance(data, dict) else None
+
+        if isinstance(data, list):
+            yield from data
 
     def get_data_field(self, field: Union[List[str], str], index: int = None):
         """
@@ -153,30 +449,32 @@ class ApiResponse(object):
         Returns:
             Value of the field
         """
-        if not hasattr(self, "_response"):
+        response = self._load()
+        if response is None:
             return None
 
         if index is not None:
             if isinstance(field, str):
-                return self._response.get('data')[index].get(field)
+                return response.get('data')[index].get(field)
 
             if isinstance(field, list):
-                return reduce(lambda d, key: d.get(key) if d else None, field, self._response.get('data')[index])
+                return reduce(lambda d, key: d.get(key) if d else None, field, response.get('data')[index])
 
         if isinstance(field, str):
-            return self._response.get('data').get(field)
+            return response.get('data').get(field)
 
         if isinstance(field, list):
-            return reduce(lambda d, key: d.get(key) if d else None, field, self._response.get('data'))
+            return reduce(lambda d, key: d.get(key) if d else None, field, response.get('data'))
 
         return None
 
     def get_msg(self):
         """ """
-        if not hasattr(self, "_response"):
+        response = self._load()
+        if response is None:
             return None
 
-        return self._response.get('message')
+        return response.get('message')
 
     def get_uri(self):
         """ """
@@ -184,10 +482,7 @@ class ApiResponse(object):
 
     def as_json(self):
         """ """
-        if not hasattr(self, "_response"):
-            return None
-
-        return self._response
+        return self._load()
 
     def log_error(self):
         """ """
@@ -301,7 +596,7 @@ def ClientApiError(error=None, msg=None):
         "message": msg if msg else "This response was generated client-side",
         "status": "error"
     }
-    return ApiResponse(json.dumps(resp))
+    return ApiResponse(json_backend.dumps(resp))
 
 
 EmptyApiResponse = ApiResponse('''{
@@ -327,4 +622,4 @@ def ClientApiData(message=None, data=None, status=None):
         "message": message if message else "This response was generated client-side",
         "status": status if status else "success"
     }
-    return json.dumps(resp)
+    return json_backend.dumps(resp).decode('utf-8')
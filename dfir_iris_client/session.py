@@ -14,17 +14,26 @@
 #  You should have received a copy of the GNU Lesser General Public License
 #  along with this program; if not, write to the Free Software Foundation,
 #  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
-import json
+import contextlib
+import contextvars
+import hashlib
 import logging as logger
 import os
-from typing import Union
+import threading
+import weakref
+from typing import Iterator, Union
 
 import requests
 from packaging.version import Version
 from requests import Response
+from requests.adapters import HTTPAdapter
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
 
+from dfir_iris_client.helper import json_backend
+from dfir_iris_client.helper.concurrency import DEFAULT_MAX_WORKERS
 from dfir_iris_client.helper.errors import IrisClientException
+from dfir_iris_client.helper.http_cache import ConditionalCache
+from dfir_iris_client.helper.response_cache import ResponseCache, parse_uri, write_matcher
 from dfir_iris_client.helper.utils import ApiResponse
 
 log = logger.getLogger(__name__)
@@ -42,17 +51,131 @@ Defines a global session, accessible by all classes. client_session is of type C
 """
 client_session = None
 
+"""_current_session
+Session of the current context, set by use_session. It takes precedence over client_session, so that concurrent
+threads or tasks can each work with their own session.
+"""
+_current_session = contextvars.ContextVar('iris_client_session', default=None)
+
+"""_sessions
+Registry of the named sessions. It holds strong references: a registered session stays alive until it is
+unregistered, even if nothing else references it.
+"""
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+"""_live_sessions
+Sessions alive in the process, whose connections are reset in the child processes after a fork.
+"""
+_live_sessions = weakref.WeakSet()
+
+
+def register_session(name: str, session: 'ClientSession') -> None:
+    """Register a session under a name, so that it can be retrieved with get_session or used with use_session.
+    A session already registered under the same name is replaced.
+
+    The registry keeps the session alive, along with its connections and caches, so that it can be retrieved by name
+    at any time. Processes which register sessions dynamically, such as one per tenant, should unregister the ones
+    they no longer use, otherwise they are never released.
+
+    Args:
+      name: Name of the session, such as the name of a tenant
+      session: ClientSession
+
+    Returns:
+      None
+    """
+    with _sessions_lock:
+        _sessions[name] = session
+
+
+def unregister_session(name: str) -> None:
+    """Remove a session from the registry, so that it is released once nothing else references it. Its connections
+    are not closed, see ClientSession.close. Does nothing if no session is registered under the name.
+
+    Args:
+      name: Name of the session
+
+    Returns:
+      None
+    """
+    with _sessions_lock:
+        _sessions.pop(name, None)
+
+
+def get_session(name: str = None) -> 'ClientSession':
+    """Return a registered session, or the session of the current context if no name is provided.
+    The session of the current context is the one set by use_session, otherwise the global client_session.
+
+    Args:
+      name: Name of the session
+
+    Returns:
+      ClientSession or None
+    """
+    if name is not None:
+        with _sessions_lock:
+            session = _sessions.get(name)
+
+        if session is None:
+            raise IrisClientException(f'No session registered under the name {name}')
+
+        return session
+
+    session = _current_session.get()
+    return session if session is not None else client_session
+
+
+@contextlib.contextmanager
+def use_session(session: Union['ClientSession', str]) -> Iterator['ClientSession']:
+    """Use a session in the current context. The objects and helpers relying on the global session, such as the
+    IrisObjects, use this session instead within the block. The concurrency helpers of the client carry the
+    session over to their threads.
+
+    Example:
+        def audit(tenant):
+            with use_session(tenant):
+                ...
+
+        with ThreadPoolExecutor() as executor:
+            executor.map(audit, ['tenant_a', 'tenant_b'])
+
+    Args:
+      session: ClientSession, or name of a registered session
+
+    Returns:
+      Iterator yielding the session
+    """
+    if isinstance(session, str):
+        session = get_session(session)
+
+    token = _current_session.set(session)
+    try:
+        yield session
+    finally:
+        _current_session.reset(token)
+
 
 class ClientSession(object):
     """Represents a client that can interacts with Iris. It is basic wrapper handling authentication and the requests
     to the server.
 
+    A session can be shared by many threads. Each thread issues its requests through its own pool of keep-alive
+    connections, and the shared state of the session, such as the trace of the requests, is guarded by locks.
+
+    A session can also be handed to child processes, for instance as an argument of a multiprocessing pool task.
+    It is pickled as its configuration only, and the child opens its own connections on its first request,
+    without checking the API key again. Forked children drop the connections inherited from their parent.
+
     Args:
 
     Returns:
 
     """
-    def __init__(self, apikey=None, host=None, agent="iris-client", ssl_verify=True, proxy=None, timeout=120):
+    def __init__(self, apikey=None, host=None, agent="iris-client", ssl_verify=True, proxy=None, timeout=120,
+                 name: str = None, set_global: bool = True, pool_maxsize: int = 10,
+                 http_cache: Union[bool, ConditionalCache] = False,
+                 response_cache: Union[bool, ResponseCache] = False, coalesce_gets: bool = True):
         """
         Initialize the ClientSession. APIKey validity is verified as well as API compatibility between the client
         and the server.
@@ -61,7 +184,9 @@ class ClientSession(object):
 
         If the client does not find itself compatible, an exception is raised.
 
-        Once successfully initialized, the session become available through global var client_session.
+        Once successfully initialized, the session become available through global var client_session, unless
+        set_global is unset. Processes driving several servers or API keys at once should rather name their
+        sessions and select them with use_session.
 
         Args:
             apikey: A valid API key. It can be fetched from My profile > API Key
@@ -70,6 +195,16 @@ class ClientSession(object):
             ssl_verify: Set or unset SSL verification
             proxy: Proxy parameters - For future use only
             timeout: Default timeout for requests
+            name: Register the session under this name. See register_session
+            set_global: Make the session the global client_session
+            pool_maxsize: Maximum number of keep-alive connections kept by each thread
+            http_cache: Revalidate the GET responses with the server instead of downloading and parsing them again
+                        when they did not change. Either True, or a ConditionalCache to set its bounds or directory
+            response_cache: Serve repeated GET requests locally for a while, evicting the responses affected by the
+                            writes of the session. Either True, or a ResponseCache to set its time to live by endpoint
+            coalesce_gets: Identical GET requests issued concurrently by several threads share a single request to
+                           the server, whose response is handed to all of them. A request issued after a write
+                           never shares a request sent before the write and which the write may affect
         """
         self._apikey = apikey
         self._host = host
@@ -77,9 +212,13 @@ class ClientSession(object):
         self._ssl_verify = ssl_verify
         self._proxy = proxy
         self._timeout = timeout
+        self._pool_maxsize = pool_maxsize
+        self._name = name
+        self._http_cache = ConditionalCache() if http_cache is True else http_cache or None
+        self._response_cache = ResponseCache() if response_cache is True else response_cache or None
+        self._coalesce_gets = coalesce_gets
         self._do_trace = os.getenv('IRIS_CLIENT_TRACE_REQUESTS', False)
-        if self._do_trace:
-            self._trace = {}
+        self._init_process_state()
 
         if not self._ssl_verify:
             requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
@@ -88,8 +227,161 @@ class ClientSession(object):
 
         self._check_api_compatibility()
 
+        if name is not None:
+            register_session(name, self)
+
+        if set_global:
+            global client_session
+            client_session = self
+
+    def _init_process_state(self) -> None:
+        """Init the state of the session which can not be shared with other processes: connections, locks and trace.
+
+        Args:
+
+        Returns:
+          None
+        """
+        self._local = threading.local()
+        self._http_sessions = weakref.WeakSet()
+        self._http_sessions_lock = threading.Lock()
+        self._trace_lock = threading.Lock()
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self._coalesced_requests = 0
+        if self._do_trace:
+            self._trace = {}
+
+        _live_sessions.add(self)
+
+    def __getstate__(self) -> dict:
+        """Pickle the session as its configuration only"""
+        return {
+            'apikey': self._apikey,
+            'host': self._host,
+            'agent': self._agent,
+            'ssl_verify': self._ssl_verify,
+            'proxy': self._proxy,
+            'timeout': self._timeout,
+            'pool_maxsize': self._pool_maxsize,
+            'name': self._name,
+            'http_cache': self._http_cache,
+            'response_cache': self._response_cache,
+            'coalesce_gets': self._coalesce_gets
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        """Restore a pickled session. The connections are opened lazily by the first request, and the API key is not
+        checked again. The session is registered under its name if it had one, and becomes the global session
+        if the process has none yet.
+        """
+        self._apikey = state['apikey']
+        self._host = state['host']
+        self._agent = state['agent']
+        self._ssl_verify = state['ssl_verify']
+        self._proxy = state['proxy']
+        self._timeout = state['timeout']
+        self._pool_maxsize = state['pool_maxsize']
+        self._name = state['name']
+        self._http_cache = state.get('http_cache')
+        self._response_cache = state.get('response_cache')
+        self._coalesce_gets = state.get('coalesce_gets', True)
+        self._do_trace = os.getenv('IRIS_CLIENT_TRACE_REQUESTS', False)
+        self._init_process_state()
+
+        if not self._ssl_verify:
+            requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
+
+        if self._name is not None:
+            with _sessions_lock:
+                _sessions.setdefault(self._name, self)
+
         global client_session
-        client_session = self
+        if client_session is None:
+            client_session = self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self) -> None:
+        """Close the connections of all the threads. The session remains usable, and new connections are opened
+        by the next requests.
+
+        Args:
+
+        Returns:
+          None
+        """
+        with self._http_sessions_lock:
+            http_sessions = list(self._http_sessions)
+            self._http_sessions.clear()
+
+        for http_session in http_sessions:
+            http_session.close()
+
+        self._local = threading.local()
+
+    def _http(self) -> requests.Session:
+        """Return the requests session of the current thread, creating it on first use. requests sessions are not
+        guaranteed to be thread-safe, hence one per thread. Each of them keeps its own pool of connections.
+
+        Args:
+
+        Returns:
+          requests.Session
+        """
+        http_session = getattr(self._local, 'http', None)
+        if http_session is None:
+            http_session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self._pool_maxsize)
+            http_session.mount('http://', adapter)
+            http_session.mount('https://', adapter)
+
+            with self._http_sessions_lock:
+                self._http_sessions.add(http_session)
+
+            self._local.http = http_session
+
+        return http_session
+
+    def get_trace(self) -> dict:
+        """Return a copy of the trace of the requests, if IRIS_CLIENT_TRACE_REQUESTS is set
+
+        Args:
+
+        Returns:
+          dict of URL to status code to the last request and response
+        """
+        if not self._do_trace:
+            return {}
+
+        with self._trace_lock:
+            return {url: dict(codes) for url, codes in self._trace.items()}
+
+    @property
+    def http_cache(self) -> Union[ConditionalCache, None]:
+        """Cache of the GET responses, if http_cache was set"""
+        return self._http_cache
+
+    @property
+    def response_cache(self) -> Union[ResponseCache, None]:
+        """Cache of the repeated GET requests, if response_cache was set"""
+        return self._response_cache
+
+    def _cache_key(self, uri: str) -> str:
+        """Return the key of a GET request in the HTTP cache. The key is bound to the API key, so that sessions
+        of different users sharing a cache directory never see each other's responses.
+
+        Args:
+          uri: URI requested
+
+        Returns:
+          str
+        """
+        return f'{hashlib.sha256(self._apikey.encode("utf-8")).hexdigest()[:16]} {self._pi_uri(uri)}'
 
     def preload_base_objects(self) -> None:
         """Preload the base objects most commonly used. This simply init the BaseObjects
@@ -105,6 +397,48 @@ class ClientSession(object):
         """
         pass
 
+    def use(self):
+        """Use the session in the current context. See use_session.
+
+        Example:
+            with session.use():
+                event = Event(cid=1)
+
+        Args:
+
+        Returns:
+          Context manager yielding the session
+        """
+        return use_session(self)
+
+    def unit_of_work(self, max_workers: int = DEFAULT_MAX_WORKERS, rate_limit: float = None,
+                     stop_on_error: bool = False):
+        """Return a unit of work collecting the creations, updates and deletions issued within it, to send them
+        at once when it exits. Repeated updates of the same object are merged, and the requests are issued
+        concurrently, creations first, then updates, then deletions. The recorded calls return a PendingResult,
+        whose ApiResponse is available once the unit of work exited.
+
+        Example:
+            with session.unit_of_work() as uow:
+                case = uow.case(cid=1)
+                pending = case.update_asset(asset_id=1, description='Patched')
+                ioc.description = 'Retagged'
+                ioc.save()
+
+            print(uow.result.errors(), pending.result())
+
+        Args:
+          max_workers: Maximum number of concurrent requests
+          rate_limit: Maximum number of requests per second. Default is unlimited
+          stop_on_error: Stop issuing the requests after the first step in which a request failed
+
+        Returns:
+          UnitOfWork
+        """
+        from dfir_iris_client.helper.unit_of_work import UnitOfWork
+
+        return UnitOfWork(self, max_workers=max_workers, rate_limit=rate_limit, stop_on_error=stop_on_error)
+
     def _check_api_compatibility(self) -> bool:
         """Checks that the server and client can work together.
         The methods expects the following :
@@ -181,6 +515,31 @@ class ClientSession(object):
 
         return self._pi_request(uri, type='GET', no_wrap=no_wrap)
 
+    def pi_get_stream(self, uri: str, path: str, cid: int = None, pairs: bool = False) -> Iterator:
+        """Issue a GET request and iterate over the records of a list of the response as they are received,
+        instead of loading the whole response. Peak memory is then tied to one record when ijson is installed.
+        See json_stream.iter_items.
+
+        Args:
+          uri: URI endpoint to request
+          path: Dotted path of the list in the response, such as data.timeline
+          cid: Target case ID
+          pairs: The path leads to an object, of which the (key, value) pairs are iterated instead
+
+        Returns:
+          Iterator of records
+        """
+        from dfir_iris_client.helper.json_stream import iter_items, iter_kvitems
+
+        if cid:
+            uri = f"{uri}?cid={cid}"
+
+        response = self._pi_request(uri, type='GET', stream=True)
+        if pairs:
+            return iter_kvitems(response, path, uri=uri)
+
+        return iter_items(response, path, uri=uri)
+
     def pi_post(self, uri: str, data: dict = None, cid: int = None) -> ApiResponse:
         """Issues a POSt request with the provided data. Simple wrapper around _pi_request
 
@@ -199,19 +558,24 @@ class ClientSession(object):
         return self._pi_request(uri, type='POST', data=data)
 
     def _pi_request(self, uri: str, type: str = None, data: dict = None,
-                    no_wrap: bool = False) -> Union[ApiResponse, Response]:
+                    no_wrap: bool = False, stream: bool = False,
+                    conditional: bool = True) -> Union[ApiResponse, Response]:
         """Make a request (GET or POST) and handle the errors. The authentication header is added.
 
         Args:
           uri: URI to request
           type: Type of the request [POST or GET]
           data: dict to send if request type is POST
+          no_wrap: Do not wrap the response in ApiResponse object
+          stream: Return the Response without reading its body, which is left to the caller. Implies no_wrap
+          conditional: Send the validators of the response held by the HTTP cache, if any, with a GET request
 
         Returns:
           ApiResponse or Response object
 
         """
 
+        generation = None
         try:
 
             headers = {
@@ -225,23 +589,44 @@ class ClientSession(object):
                 if data is None:
                     data = {}
 
-                response = requests.post(url=self._pi_uri(uri),
-                                         json=data,
-                                         verify=self._ssl_verify,
-                                         timeout=self._timeout,
-                                         headers=headers)
+                response = self._http().post(url=self._pi_uri(uri),
+                                             data=json_backend.dumps(data),
+                                             verify=self._ssl_verify,
+                                             timeout=self._timeout,
+                                             headers=headers)
 
-                self._trace_request(response)
+                self._trace_request(response, data=data)
+                self._drop_flights(uri)
 
             elif type == "GET":
                 log.debug(f'GET : {self._pi_uri(uri)}')
-                response = requests.get(url=self._pi_uri(uri),
-                                        verify=self._ssl_verify,
-                                        timeout=self._timeout,
-                                        headers=headers
-                                        )
 
-                self._trace_request(response)
+                if self._response_cache is not None and not no_wrap and not stream:
+                    api_response = self._response_cache.get(uri)
+                    if api_response is not None:
+                        log.debug(f'Served from the response cache : {uri}')
+                        return api_response
+
+                    generation = self._response_cache.generation(uri)
+
+                use_cache = self._http_cache is not None and not no_wrap and not stream
+                if use_cache:
+                    cache_key = self._cache_key(uri)
+                    if conditional:
+                        headers.update(self._http_cache.request_headers(cache_key))
+
+                if self._coalesce_gets and not no_wrap and not stream:
+                    response = self._coalesced_get(uri, headers)
+
+                else:
+                    response = self._http().get(url=self._pi_uri(uri),
+                                                verify=self._ssl_verify,
+                                                timeout=self._timeout,
+                                                headers=headers,
+                                                stream=stream
+                                                )
+
+                    self._trace_request(response, streamed=stream)
 
             else:
                 return ApiResponse()
@@ -256,7 +641,124 @@ class ClientSession(object):
 
         log.debug(f'Server replied with status {response.status_code}')
 
-        return ApiResponse(response.content, uri=uri) if not no_wrap else response
+        if no_wrap or stream:
+            return response
+
+        api_response = None
+        if type == "GET" and use_cache:
+            api_response = self._http_cache.handle(cache_key, response, uri)
+            if api_response is None and response.status_code == 304:
+                # The response the server validated was evicted from the cache meanwhile, so it is requested in full
+                log.debug(f'Cached response evicted before its validation, requesting it again : {uri}')
+                return self._pi_request(uri, type=type, conditional=False)
+
+        if api_response is None:
+            api_response = ApiResponse(response.content, uri=uri, status_code=response.status_code)
+
+        self._update_response_cache(type, uri, api_response, generation)
+
+        return api_response
+
+    def _coalesced_get(self, uri: str, headers: dict) -> Response:
+        """Issue a GET request, unless the same request is already in flight in another thread, in which case its
+        response is awaited and shared. The body is read before the response is handed over, so that every caller
+        builds its own ApiResponse from it. The requests in flight are no longer shared once a write affecting them
+        completes, see _drop_flights.
+
+        Args:
+          uri: URI to request
+          headers: Headers of the request
+
+        Returns:
+          Response
+        """
+        key = (uri, headers.get('If-None-Match'), headers.get('If-Modified-Since'))
+
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = _Flight()
+                self._flights[key] = flight
+
+            else:
+                self._coalesced_requests += 1
+
+        if not is_leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+
+            log.debug(f'Shared the response of an identical request in flight : {uri}')
+            return flight.response
+
+        try:
+            response = self._http().get(url=self._pi_uri(uri),
+                                        verify=self._ssl_verify,
+                                        timeout=self._timeout,
+                                        headers=headers)
+            response.content
+            self._trace_request(response)
+
+            flight.response = response
+            return response
+
+        except Exception as e:
+            flight.error = e
+            raise
+
+        finally:
+            with self._flights_lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+
+            flight.done.set()
+
+    def _drop_flights(self, uri: str) -> None:
+        """Stop sharing the GET requests in flight which a write may affect. They were sent before the write and
+        their responses may predate it, so the identical requests issued after the write send their own.
+
+        Args:
+          uri: URI of the write
+
+        Returns:
+          None
+        """
+        if not self._coalesce_gets:
+            return
+
+        is_affected = write_matcher(uri)
+        if is_affected is None:
+            return
+
+        with self._flights_lock:
+            for key in [key for key in self._flights if is_affected(*parse_uri(key[0]))]:
+                del self._flights[key]
+
+    @property
+    def coalesced_requests(self) -> int:
+        """Number of GET requests which shared the response of an identical request in flight"""
+        return self._coalesced_requests
+
+    def _update_response_cache(self, type: str, uri: str, api_response: ApiResponse, generation: int = None) -> None:
+        """Keep a successful GET response in the response cache, and evict the responses affected by a successful
+        write.
+
+        Args:
+          type: Type of the request [POST or GET]
+          uri: URI requested
+          api_response: Response of the server
+          generation: Generation of the scope of a GET request, taken before it was sent. See ResponseCache.put
+
+        Returns:
+          None
+        """
+        if self._response_cache is None or not api_response.is_success():
+            return
+
+        self._response_cache.invalidate(uri)
+        if type == "GET":
+            self._response_cache.put(uri, api_response, generation=generation)
 
     def pi_post_files(self, uri: str, files: dict = None, data: dict = None, cid: int = None) -> ApiResponse:
         """Issues a POST request in multipart with the provided data.
@@ -282,14 +784,15 @@ class ClientSession(object):
 
         try:
 
-            response = requests.post(url=self._pi_uri(uri),
-                                     files=files,
-                                     data=data,
-                                     verify=self._ssl_verify,
-                                     timeout=self._timeout,
-                                     headers=headers)
+            response = self._http().post(url=self._pi_uri(uri),
+                                         files=files,
+                                         data=data,
+                                         verify=self._ssl_verify,
+                                         timeout=self._timeout,
+                                         headers=headers)
 
             self._trace_request(response)
+            self._drop_flights(uri)
 
         except requests.exceptions.ConnectionError as e:
             raise IrisClientException("Unable to connect to endpoint {host}. "
@@ -301,13 +804,18 @@ class ClientSession(object):
 
         log.debug(f'Server replied with status {response.status_code}')
 
-        return ApiResponse(response.content, uri=uri)
+        api_response = ApiResponse(response.content, uri=uri, status_code=response.status_code)
+        self._update_response_cache("POST", uri, api_response)
 
-    def _trace_request(self, response: Response) -> None:
+        return api_response
+
+    def _trace_request(self, response: Response, data: dict = None, streamed: bool = False) -> None:
         """ Do a trace of the request and response.
 
         Args:
             response: Response object
+            data: Body of the request, if it was encoded as JSON. Avoids decoding it back
+            streamed: The body of the response is streamed to the caller, and is not traced
 
         Returns:
             None
@@ -319,49 +827,63 @@ class ClientSession(object):
         method = response.request.method
         code = response.status_code
 
-        try:
+        if data is not None:
+            body = data
 
-            if response.request.body:
-                body = response.request.body.decode('utf-8')
-                body = json.loads(body)
+        else:
+            try:
 
-            else:
-                body = '<No data>'
+                if response.request.body:
+                    body = json_backend.loads(response.request.body)
 
-        except Exception:
-            body = '<Invalid data>'
+                else:
+                    body = '<No data>'
 
-        try:
+            except Exception:
+                body = '<Invalid data>'
 
-            if response.json():
-                resp = response.json()
+        try:
 
-            else:
-                resp = response.content.decode('utf-8')
-                resp = json.loads(resp)
+            resp = json_backend.loads(response.content) if not streamed else '<Streamed data>'
 
         except Exception:
             resp = '<Invalid data>'
 
-        if url in self._trace:
-            if code in self._trace[url]:
-                self._trace[url][code] = {
-                    'body': body,
-                    'method': method,
-                    'response': resp
-                }
+        entry = {
+            'body': body,
+            'method': method,
+            'response': resp
+        }
 
-            else:
-                self._trace[url][code] = {
-                    'body': body,
-                    'method': method,
-                    'response': resp
-                }
-        else:
-            self._trace[url] = {
-                code: {
-                    'body': body,
-                    'method': method,
-                    'response': resp
-                }
-            }
+        with self._trace_lock:
+            self._trace.setdefault(url, {})[code] = entry
+
+
+class _Flight(object):
+    """GET request in flight, awaited by the identical requests issued meanwhile"""
+
+    __slots__ = ('done', 'response', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+
+
+def _reset_after_fork() -> None:
+    """Drop the connections and locks inherited by a forked child. The connections are shared with the parent and
+    the locks may have been held by threads which do not exist in the child. The other modules of the client holding
+    locks or per-thread state, such as the identity maps and the rate limiters, register their own handlers.
+    """
+    global _sessions_lock
+    _sessions_lock = threading.Lock()
+
+    for session in list(_live_sessions):
+        session._init_process_state()
+        for cache in (session._http_cache, session._response_cache):
+            if cache is not None:
+                cache._lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,147 @@
+#  IRIS Client API Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import json
+import os
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+from dfir_iris_client.session import ClientSession, API_VERSION
+
+STREAMED_RECORDS = 5000
+IOC_TYPES_ETAG = '"ioc-types-1"'
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Minimal stand-in of an IRIS server, echoing the requests it receives """
+    protocol_version = 'HTTP/1.1'
+    slow_requests = 0
+    tasks_version = 0
+
+    def log_message(self, format, *args):
+        """ """
+        pass
+
+    def _reply(self, data, headers: dict = None, status: str = 'success', code: int = 200):
+        """ """
+        body = json.dumps({'status': status, 'message': '', 'data': data}).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        """ """
+        url = urlparse(self.path)
+        if url.path == '/api/versions':
+            return self._reply({'api_min': API_VERSION, 'api_current': API_VERSION})
+
+        if url.path == '/case/timeline/events/list/filter/0':
+            return self._reply({'timeline': [{'event_id': index, 'event_title': f'event {index}', 'score': 0.5,
+                                              'event_date': f'2023-01-{index % 2 + 1:02d}T10:00:00.000000'}
+                                             for index in range(STREAMED_RECORDS)]})
+
+        if url.path == '/manage/ioc-types/list':
+            if self.headers.get('If-None-Match') == IOC_TYPES_ETAG:
+                self.send_response(304)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            return self._reply([{'type_id': 1, 'type_name': 'ip-dst'}], headers={'ETag': IOC_TYPES_ETAG})
+
+        if url.path.endswith('/slow'):
+            StandInHandler.slow_requests += 1
+            time.sleep(0.5)
+            return self._reply({'path': url.path})
+
+        if url.path == '/case/assets/list':
+            return self._reply({'assets': [{'asset_id': 1, 'asset_name': 'DC01'}, {'asset_id': 2, 'asset_name': 'WKS'}]})
+
+        if url.path == '/case/ioc/list':
+            if parse_qs(url.query).get('cid') == ['3']:
+                return self._reply(None, status='error', code=403)
+
+            return self._reply({'ioc': [{'ioc_id': 3, 'ioc_value': '10.0.0.1'}]})
+
+        if url.path == '/manage/cases/list':
+            return self._reply([{'case_id': cid, 'client_name': 'ACME' if cid % 2 else 'Other'}
+                                for cid in range(1, 6)])
+
+        if url.path == '/case/notes/directories/filter':
+            return self._reply([
+                {'id': 1, 'name': 'Investigation', 'parent_id': None, 'notes': [{'id': 6, 'title': 'Scope'}],
+                 'subdirectories': [{'id': 2, 'name': 'Host triage'}]},
+                {'id': 2, 'name': 'Host triage', 'parent_id': 1, 'notes': [{'id': 7, 'title': 'Timeline'}],
+                 'subdirectories': []}
+            ])
+
+        if url.path == '/case/tasks/list':
+            cid = parse_qs(url.query).get('cid')
+            if cid == ['1']:
+                return self._reply(None, status='error', code=403)
+
+            if cid == ['5']:
+                return self._reply({'tasks': [{'task_id': 1, 'task_status_id': 1}, {'task_id': 2, 'task_status_id': 4}]})
+
+            done = cid == ['4'] and StandInHandler.tasks_version > 0
+            return self._reply({'tasks': [{'task_id': 1, 'status_name': 'Done' if done else 'To do'},
+                                          {'task_id': 2, 'status_name': 'In progress'}]})
+
+        if url.path == '/manage/task-status/list':
+            return self._reply([{'id': 1, 'status_name': 'To do'}, {'id': 4, 'status_name': 'Done'}])
+
+        if url.path == '/datastore/list/tree':
+            return self._reply({'d-1': {'name': 'root', 'children': {}}, 'd-2': {'name': 'other', 'children': {}}})
+
+        self._reply({'path': url.path, 'query': parse_qs(url.query)})
+
+    def do_POST(self):
+        """ """
+        length = int(self.headers.get('Content-Length', 0))
+        self._reply({'path': urlparse(self.path).path, 'body': json.loads(self.rfile.read(length) or b'{}')})
+
+
+class StandInServerTest(unittest.TestCase):
+    """Base of the tests run against a StandInHandler server, with a traced session per test """
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.host = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        """ """
+        with mock.patch.dict(os.environ, {'IRIS_CLIENT_TRACE_REQUESTS': '1'}):
+            self.session = ClientSession(apikey='stand-in', host=self.host, set_global=False)
+
+    def tearDown(self):
+        """ """
+        self.session.close()
@@ -142,6 +142,26 @@ class AlertTest(InitIrisClientTest):
         for alert in parse_api_data(data, 'alerts'):
             assert_alert_isvalid(alert, parse_api_data(alert, 'alert_id'))
 
+    def test_get_alerts_chunked(self):
+        """ Test getting alerts from their ids in several chunks """
+        alert_data = load_alert_data()
+        alert_ids = []
+
+        for _ in range(5):
+            resp = self.alert.add_alert(alert_data)
+            assert bool(assert_api_resp(resp)) is True
+            alert_ids.append(get_data(resp, 'alert_id'))
+
+        alert_ids.reverse()
+        resp = self.alert.get_alerts(alert_ids, chunk_size=2)
+        assert bool(assert_api_resp(resp)) is True
+
+        alerts = parse_api_data(get_data_from_resp(resp), 'alerts')
+        assert [parse_api_data(alert, 'alert_id') for alert in alerts] == alert_ids
+
+        alerts = list(self.alert.iter_alerts_by_ids(alert_ids, chunk_size=2))
+        assert [parse_api_data(alert, 'alert_id') for alert in alerts] == alert_ids
+
     def test_add_alert(self):
         """ """
         alert_data = load_alert_data()
@@ -528,3 +548,80 @@ class AlertTest(InitIrisClientTest):
         resp = self.alert.filter_alerts(alert_owner_id=alert_owner_id)
 
         assert bool(assert_api_resp(resp)) is True
+
+    def test_iter_alerts(self):
+        """ Test iterating over all alerts across pages """
+        alert_data = load_alert_data()
+
+        for _ in range(3):
+            resp = self.alert.add_alert(alert_data)
+            assert bool(assert_api_resp(resp)) is True
+
+        alerts = list(self.alert.iter_alerts(per_page=2))
+        assert len(alerts) >= 3
+
+        alert_ids = [parse_api_data(alert, 'alert_id') for alert in alerts]
+        assert len(alert_ids) == len(set(alert_ids))
+
+    def test_iter_alerts_max_items(self):
+        """ Test iterating over alerts with a maximum number of items """
+        alert_data = load_alert_data()
+
+        for _ in range(3):
+            resp = self.alert.add_alert(alert_data)
+            assert bool(assert_api_resp(resp)) is True
+
+        alerts = list(self.alert.iter_alerts(max_items=3, per_page=2))
+        assert len(alerts) == 3
+
+        alerts = list(self.alert.iter_alerts(max_items=3, per_page=2, prefetch=False))
+        assert len(alerts) == 3
+
+    def test_bulk_update_alerts(self):
+        """ Test updating many alerts at once """
+        alert_data = load_alert_data()
+        alert_ids = []
+
+        for _ in range(3):
+            resp = self.alert.add_alert(alert_data)
+            assert bool(assert_api_resp(resp)) is True
+            alert_ids.append(get_data(resp, 'alert_id'))
+
+        result = self.alert.bulk_update_alerts(alert_ids + [-1], {'alert_title': 'bulk test'}, rate_limit=10)
+        assert bool(result) is False
+        assert result.succeeded() == alert_ids
+        assert result.failed() == [-1]
+
+        for alert_id in alert_ids:
+            assert get_data(result.get(alert_id), 'alert_title') == 'bulk test'
+
+    def test_bulk_delete_alerts(self):
+        """ Test deleting many alerts at once """
+        alert_data = load_alert_data()
+        alert_ids = []
+
+        for _ in range(3):
+            resp = self.alert.add_alert(alert_data)
+            assert bool(assert_api_resp(resp)) is True
+            alert_ids.append(get_data(resp, 'alert_id'))
+
+        result = self.alert.bulk_delete_alerts(alert_ids)
+        assert bool(result) is True
+        assert len(result) == 3
+
+    def test_bulk_merge_alerts(self):
+        """ Test merging many alerts into the same case """
+        alert_data = load_alert_data()
+        alert_ids = []
+
+        for _ in range(3):
+            resp = self.alert.add_alert(alert_data)
+            assert bool(assert_api_resp(resp)) is True
+            alert_ids.append(get_data(resp, 'alert_id'))
+
+        result = self.alert.bulk_merge_alerts(alert_ids, target_case_id=1, merge_note='bulk merge')
+        assert bool(result) is True
+        assert result.succeeded() == alert_ids
+
+        result = self.alert.bulk_merge_alerts(alert_ids, target_case_id={alert_ids[0]: 1}, merge_note='bulk merge')
+        assert result.failed() == alert_ids[1:]
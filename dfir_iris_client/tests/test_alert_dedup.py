@@ -0,0 +1,151 @@
+#  IRIS Client API Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import tempfile
+import unittest
+from pathlib import Path
+
+from dfir_iris_client.alert import Alert
+from dfir_iris_client.helper.alert_dedup import AlertDeduplicator
+from dfir_iris_client.helper.utils import ApiResponse, ClientApiData, assert_api_resp, get_data_from_resp
+from dfir_iris_client.tests.test_alert import load_alert_data
+from dfir_iris_client.tests.tests_helper import InitIrisClientTest, get_random_string
+
+
+class AlertDedupTest(InitIrisClientTest):
+
+    def setUp(self) -> None:
+        """ """
+        self.alert = Alert(self.session)
+
+    def test_add_duplicate_alert(self):
+        """ Test that a duplicate alert is not sent to the server """
+        dedup = AlertDeduplicator()
+        alert_data = load_alert_data()
+        alert_data['alert_source_ref'] = get_random_string()
+
+        resp = dedup.add_alert(self.alert, alert_data)
+        assert bool(assert_api_resp(resp)) is True
+        assert get_data_from_resp(resp).get('alert_id') is not None
+
+        resp = dedup.add_alert(self.alert, alert_data)
+        assert bool(assert_api_resp(resp)) is True
+        assert get_data_from_resp(resp).get('duplicate') is True
+        assert get_data_from_resp(resp).get('count') == 2
+
+        assert dedup.get_stats() == {'unique': 1, 'duplicates': 1, 'entries': 1}
+
+    def test_fingerprint_ignores_iocs_order(self):
+        """ Test that the order of the IOCs does not change the fingerprint """
+        dedup = AlertDeduplicator()
+        alert_data = load_alert_data()
+        alert_data['iocs'] = [{'ioc_value': 'a'}, {'ioc_value': 'b'}]
+
+        fingerprint = dedup.fingerprint(alert_data)
+        alert_data['iocs'] = list(reversed(alert_data['iocs']))
+
+        assert dedup.fingerprint(alert_data) == fingerprint
+
+        alert_data['alert_title'] = get_random_string()
+        assert dedup.fingerprint(alert_data) != fingerprint
+
+    def test_evicted_fingerprint_is_duplicate(self):
+        """ Test that fingerprints evicted from the LRU are still caught by the bloom filters """
+        dedup = AlertDeduplicator(fields=['alert_title'], max_entries=1, bloom_capacity=100)
+
+        assert dedup.check({'alert_title': 'first'}) is False
+        assert dedup.check({'alert_title': 'second'}) is False
+        assert dedup.check({'alert_title': 'first'}) is True
+
+    def test_persisted_state(self):
+        """ Test that duplicates are detected across restarts """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / 'dedup.json'
+
+            dedup = AlertDeduplicator(fields=['alert_title'], path=path)
+            assert dedup.check({'alert_title': 'persisted'}) is False
+            dedup.save()
+
+            dedup = AlertDeduplicator(fields=['alert_title'], path=path)
+            assert dedup.check({'alert_title': 'persisted'}) is True
+            assert dedup.check({'alert_title': 'new'}) is False
+
+
+class StandInAlert(object):
+    """Alert helper replying with the given outcomes, in order"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.sent = 0
+
+    def add_alert(self, alert_data):
+        self.sent += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+
+        return outcome
+
+
+class AlertDedupOfflineTest(unittest.TestCase):
+    """ Deduplicator tests which do not need a server """
+
+    success = ApiResponse(ClientApiData(status='success', data={'alert_id': 1}))
+    failure = ApiResponse(ClientApiData(status='error', message='Refused'))
+
+    def test_failed_alert_is_not_recorded(self):
+        """ Test that an alert which could not be sent is not seen as a duplicate afterwards """
+        dedup = AlertDeduplicator(fields=['alert_title'])
+        alert = StandInAlert(ConnectionError('down'), self.failure, self.success, self.success)
+
+        with self.assertRaises(ConnectionError):
+            dedup.add_alert(alert, {'alert_title': 'flaky'})
+
+        assert dedup.add_alert(alert, {'alert_title': 'flaky'}).is_error()
+        assert get_data_from_resp(dedup.add_alert(alert, {'alert_title': 'flaky'})).get('alert_id') == 1
+        assert alert.sent == 3
+
+        resp = dedup.add_alert(alert, {'alert_title': 'flaky'})
+        assert get_data_from_resp(resp).get('duplicate') is True
+        assert alert.sent == 3
+
+    def test_reserved_alert_is_duplicate(self):
+        """ Test that an alert reserved but not recorded yet is a duplicate, and new again once released """
+        dedup = AlertDeduplicator(fields=['alert_title'])
+        fingerprint = dedup.fingerprint({'alert_title': 'pending'})
+
+        assert dedup.check({'alert_title': 'pending'}, fingerprint=fingerprint, record=False) is False
+        assert dedup.check({'alert_title': 'pending'}) is True
+        assert dedup.get_stats()['entries'] == 0
+
+        dedup.release(fingerprint)
+        assert dedup.check({'alert_title': 'pending'}, record=False) is False
+
+        dedup.record(fingerprint)
+        assert dedup.get_stats()['entries'] == 1
+        assert dedup.check({'alert_title': 'pending'}) is True
+        assert dedup.duplicate_count({'alert_title': 'pending'}) == 2
+
+    def test_bloom_duplicate_keeps_window(self):
+        """ Test that a duplicate only known by the bloom filters does not restart its window in the LRU """
+        dedup = AlertDeduplicator(fields=['alert_title'], max_entries=1, bloom_capacity=100)
+
+        assert dedup.check({'alert_title': 'first'}) is False
+        assert dedup.check({'alert_title': 'second'}) is False
+        assert dedup.check({'alert_title': 'first'}) is True
+
+        assert dedup.duplicate_count({'alert_title': 'first'}) == 0
+        assert dedup.duplicate_count({'alert_title': 'second'}) == 1
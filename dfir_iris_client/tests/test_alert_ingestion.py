@@ -0,0 +1,188 @@
+#  IRIS Client API Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import io
+import json
+import threading
+import unittest
+
+from dfir_iris_client.alert_ingestion import AlertIngestionPipeline
+from dfir_iris_client.helper.utils import ApiResponse, ClientApiData
+from dfir_iris_client.tests.test_alert import load_alert_data, load_invalid_alert_data
+from dfir_iris_client.tests.test_alert_dedup import StandInAlert
+from dfir_iris_client.tests.tests_helper import InitIrisClientTest
+
+
+class AlertIngestionTest(InitIrisClientTest):
+
+    def test_submit_alerts(self):
+        """ Test submitting alerts through the pipeline """
+        results = []
+        with AlertIngestionPipeline(self.session, queue_size=2, workers=2,
+                                    on_result=lambda alert, resp: results.append(resp)) as pipeline:
+            for _ in range(5):
+                assert pipeline.submit(load_alert_data()) is True
+
+        stats = pipeline.get_stats()
+        assert stats['submitted'] == 5
+        assert stats['succeeded'] == 5
+        assert stats['queued'] == 0
+        assert len(results) == 5
+        assert all(resp.is_success() for resp in results)
+
+    def test_submit_invalid_alert(self):
+        """ Test that alerts refused by the server are counted as errors and not retried """
+        with AlertIngestionPipeline(self.session, workers=1) as pipeline:
+            pipeline.submit(load_invalid_alert_data())
+
+        stats = pipeline.get_stats()
+        assert stats['errors'] == 1
+        assert stats['retried'] == 0
+
+    def test_feed_jsonl(self):
+        """ Test feeding the pipeline from a JSONL stream """
+        stream = io.StringIO('\n'.join(json.dumps(load_alert_data()) for _ in range(3)) + '\n\ninvalid line\n')
+
+        with AlertIngestionPipeline(self.session, workers=2) as pipeline:
+            assert pipeline.feed_jsonl(stream) == 3
+
+        stats = pipeline.get_stats()
+        assert stats['succeeded'] == 3
+        assert stats['rejected'] == 1
+
+    def test_submit_backpressure(self):
+        """ Test that alerts are rejected when the queue is full and the caller does not block """
+        pipeline = AlertIngestionPipeline(self.session, queue_size=1)
+
+        assert pipeline.submit(load_alert_data(), block=False) is True
+        assert pipeline.submit(load_alert_data(), block=False) is False
+
+        pipeline.start()
+        pipeline.stop(wait=True)
+
+        stats = pipeline.get_stats()
+        assert stats['rejected'] == 1
+        assert stats['succeeded'] == 1
+
+
+class BlockedAlert(StandInAlert):
+    """Alert helper holding every submission until released"""
+
+    def __init__(self, *outcomes):
+        super().__init__(*outcomes)
+        self.released = threading.Event()
+
+    def add_alert(self, alert_data):
+        self.released.wait()
+        return super().add_alert(alert_data)
+
+
+class AlertIngestionOfflineTest(unittest.TestCase):
+    """ Pipeline tests which do not need a server """
+
+    success = ApiResponse(ClientApiData(status='success', data={'alert_id': 1}), status_code=200)
+    unavailable = ApiResponse(ClientApiData(status='error', message='Unavailable'), status_code=503)
+    throttled = ApiResponse(ClientApiData(status='error', message='Too many requests'), status_code=429)
+    refused = ApiResponse(ClientApiData(status='error', message='Refused'), status_code=400)
+
+    def pipeline(self, alert, **kwargs):
+        """ Build a pipeline submitting to the given stand-in alert helper """
+        pipeline = AlertIngestionPipeline(None, retry_delay=0, **kwargs)
+        pipeline._alert = alert
+        return pipeline
+
+    def test_unavailable_reply_is_retried(self):
+        """ Test that throttled and unavailable replies are retried until the alert is accepted """
+        alert = StandInAlert(self.unavailable, self.throttled, self.success)
+        results = []
+
+        with self.pipeline(alert, workers=1, on_result=lambda data, resp: results.append(resp)) as pipeline:
+            pipeline.submit({'alert_title': 'retried'})
+
+        stats = pipeline.get_stats()
+        assert alert.sent == 3
+        assert stats['retried'] == 2
+        assert stats['succeeded'] == 1
+        assert results == [self.success]
+
+    def test_retries_are_bounded(self):
+        """ Test that an alert is given up once the retries are exhausted """
+        alert = StandInAlert(self.unavailable, self.unavailable, self.unavailable)
+
+        with self.pipeline(alert, workers=1, max_retries=2) as pipeline:
+            pipeline.submit({'alert_title': 'unavailable'})
+
+        stats = pipeline.get_stats()
+        assert alert.sent == 3
+        assert stats['retried'] == 2
+        assert stats['errors'] == 1
+
+    def test_refused_reply_is_not_retried(self):
+        """ Test that an alert refused by the server is not retried """
+        alert = StandInAlert(self.refused)
+
+        with self.pipeline(alert, workers=1) as pipeline:
+            pipeline.submit({'alert_title': 'refused'})
+
+        stats = pipeline.get_stats()
+        assert alert.sent == 1
+        assert stats['retried'] == 0
+        assert stats['errors'] == 1
+
+    def test_backpressure(self):
+        """ Test that alerts are rejected when the queue is full and the caller does not block """
+        alert = BlockedAlert(*[self.success] * 3)
+        pipeline = self.pipeline(alert, queue_size=1, workers=1)
+
+        assert pipeline.submit({'alert_title': '1'}, block=False) is True
+        assert pipeline.submit({'alert_title': '2'}, block=False) is False
+        assert pipeline.submit({'alert_title': '3'}, timeout=0.01) is False
+
+        pipeline.start()
+        alert.released.set()
+        pipeline.stop(wait=True)
+
+        stats = pipeline.get_stats()
+        assert alert.sent == 1
+        assert stats['rejected'] == 2
+        assert stats['succeeded'] == 1
+
+    def test_stop_with_full_queue(self):
+        """ Test that stopping without waiting returns while producers keep the queue full """
+        alert = BlockedAlert(*[self.success] * 1000)
+        pipeline = self.pipeline(alert, queue_size=1, workers=2)
+        pipeline.start()
+
+        producing = threading.Event()
+        producing.set()
+
+        def produce():
+            while producing.is_set():
+                pipeline.submit({'alert_title': 'flood'}, timeout=0.01)
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+
+        stopper = threading.Thread(target=pipeline.stop, kwargs={'wait': False}, daemon=True)
+        stopper.start()
+        alert.released.set()
+        stopper.join(timeout=10)
+
+        producing.clear()
+        producer.join(timeout=10)
+
+        assert not stopper.is_alive()
+        assert alert.sent < 1000
@@ -719,6 +719,45 @@ class CaseTest(InitIrisClientTest):
         ret = self.case.delete_ioc(ioc_id=ioc_id)
         assert assert_api_resp(ret, soft_fail=False)
 
+    def test_unit_of_work_merges_updates(self):
+        """ """
+        ret = self.case.add_ioc(value="dummy ioc", ioc_type='AS', ioc_tlp='amber')
+        assert assert_api_resp(ret, soft_fail=False)
+        ioc_id = parse_api_data(get_data_from_resp(ret), 'ioc_id')
+
+        with self.session.unit_of_work() as uow:
+            case = uow.case(cid=1)
+            case.update_ioc(ioc_id=ioc_id, description="new dummy description")
+            case.update_ioc(ioc_id=ioc_id, ioc_tags=['tag1', 'tag2'])
+
+            assert len(uow) == 1
+
+        assert bool(uow.result) is True
+
+        data = get_data_from_resp(self.case.get_ioc(ioc_id=ioc_id))
+        assert parse_api_data(data, 'ioc_description') == "new dummy description"
+        assert parse_api_data(data, 'ioc_tags') == "tag1,tag2"
+
+        ret = self.case.delete_ioc(ioc_id=ioc_id)
+        assert assert_api_resp(ret, soft_fail=False)
+
+    def test_unit_of_work_drops_updates_of_deleted(self):
+        """ """
+        ret = self.case.add_ioc(value="dummy ioc", ioc_type='AS', ioc_tlp='amber')
+        assert assert_api_resp(ret, soft_fail=False)
+        ioc_id = parse_api_data(get_data_from_resp(ret), 'ioc_id')
+
+        with self.session.unit_of_work() as uow:
+            case = uow.case(cid=1)
+            case.update_ioc(ioc_id=ioc_id, description="new dummy description")
+            case.delete_ioc(ioc_id=ioc_id)
+
+        assert bool(uow.result) is True
+        assert len(uow.result) == 1
+
+        ret = self.case.get_ioc(ioc_id=ioc_id)
+        assert bool(assert_api_resp(ret)) is False
+
     def test_update_ioc_full_invalid_ioc_tlp(self):
         """ """
         ret = self.case.add_ioc(value="dummy ioc", ioc_type='AS', ioc_tlp='amber')
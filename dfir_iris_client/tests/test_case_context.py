@@ -0,0 +1,35 @@
+#  IRIS Client API Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+from dfir_iris_client.case import Case
+from dfir_iris_client.tests.stand_in_server import STREAMED_RECORDS, StandInServerTest
+
+
+class CaseContextTest(StandInServerTest):
+    """ Collections of a case preloaded at once """
+
+    def test_preload_case(self):
+        """ Test that the collections of a case are fetched at once and indexed """
+        context = Case(self.session, case_id=1).preload()
+
+        assert context.errors.keys() == {'tasks'}
+        assert len(context.events) == STREAMED_RECORDS
+        assert context.asset_id('DC01') == 1
+        assert context.missing_assets(['DC01', 'SRV']) == ['SRV']
+        assert context.ioc_id('10.0.0.1') == 3
+        assert context.note_id('Investigation/Scope') == 6
+        assert context.note_id('Investigation/Host triage/Timeline') == 7
+        assert list(context.ds_tree) == ['d-1', 'd-2']
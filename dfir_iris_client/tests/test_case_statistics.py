@@ -0,0 +1,96 @@
+#  IRIS Client API Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import json
+import unittest
+
+from dfir_iris_client.case import Case
+from dfir_iris_client.helper.case_statistics import StatisticsAggregator, compute_counters
+from dfir_iris_client.helper.errors import IrisClientException
+from dfir_iris_client.helper.utils import ApiResponse
+from dfir_iris_client.tests.stand_in_server import STREAMED_RECORDS, StandInHandler, StandInServerTest
+
+
+def make_api_response(data) -> ApiResponse:
+    """Build a successful response of the server """
+    return ApiResponse(json.dumps({'status': 'success', 'message': '', 'data': data}))
+
+
+class CaseStatisticsTest(unittest.TestCase):
+    """ Statistics computed from the responses of a case """
+
+    def responses(self, tasks: list) -> dict:
+        """ """
+        return {'tasks': make_api_response({'tasks': tasks}), 'iocs': make_api_response({'ioc': []}),
+                'assets': make_api_response({'assets': []}), 'events': make_api_response({'timeline': []})}
+
+    def test_task_status_ids(self):
+        """ Test that the tasks listed with a status ID only are counted by the name of their status """
+        responses = self.responses([{'task_id': 1, 'task_status_id': 1}, {'task_id': 2, 'task_status_id': 4},
+                                    {'task_id': 3, 'status_name': 'In progress'}])
+
+        counters = compute_counters(responses, task_statuses={1: 'To do', 4: 'Done'})
+        assert counters['tasks_by_status'] == {'To do': 1, 'Done': 1, 'In progress': 1}
+        assert counters['counts']['open_tasks'] == 2
+
+        with self.assertRaises(IrisClientException):
+            compute_counters(self.responses([{'task_id': 1, 'task_status_id': 4}]))
+
+    def test_digest_of_raw_response(self):
+        """ Test that the digest of a response is the same whether it was parsed or not """
+        raw = json.dumps({'status': 'success', 'message': '', 'data': {'tasks': [{'task_id': 1}]}}, indent=2)
+        parsed = ApiResponse(raw)
+        parsed.get_data()
+        assert parsed._digest is None
+
+        assert parsed.get_digest() == ApiResponse(raw).get_digest()
+        assert parsed._body is None
+        assert parsed.get_digest() == ApiResponse(raw.encode('utf-8')).get_digest()
+        assert parsed.get_digest() != make_api_response({'tasks': [{'task_id': 2}]}).get_digest()
+
+
+class StatisticsAggregatorTest(StandInServerTest):
+    """ Statistics aggregated over many cases """
+
+    def test_statistics_aggregator(self):
+        """ Test that statistics are aggregated over cases and only recomputed for the cases which changed """
+        StandInHandler.tasks_version = 0
+        aggregator = StatisticsAggregator(Case(self.session))
+
+        totals = aggregator.refresh(cids=[2, 4])
+        assert totals['counts']['open_tasks'] == 4
+        assert totals['counts']['assets'] == 4
+        assert totals['events_per_period'] == {'2023-01-01': STREAMED_RECORDS, '2023-01-02': STREAMED_RECORDS}
+        assert aggregator.last_refresh['recomputed'] == 2
+
+        StandInHandler.tasks_version = 1
+        totals = aggregator.refresh(cids=[1, 2, 4])
+        assert totals['counts']['open_tasks'] == 3
+        assert totals['tasks_by_status'] == {'To do': 1, 'In progress': 2, 'Done': 1}
+        assert aggregator.last_refresh == {'cases': 3, 'recomputed': 1, 'unchanged': 1, 'failed': 1, 'removed': 0}
+        assert list(aggregator.errors) == [1]
+
+        totals = aggregator.refresh(cids=[4])
+        assert totals['counts']['open_tasks'] == 1
+        assert aggregator.last_refresh['removed'] == 1
+
+    def test_task_status_ids(self):
+        """ Test that the names of the task statuses are fetched for the tasks listed with a status ID only """
+        aggregator = StatisticsAggregator(Case(self.session))
+
+        totals = aggregator.refresh(cids=[5])
+        assert totals['tasks_by_status'] == {'To do': 1, 'Done': 1}
+        assert totals['counts']['open_tasks'] == 1
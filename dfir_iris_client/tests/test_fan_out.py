@@ -0,0 +1,85 @@
+#  IRIS Client API Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import unittest
+
+from dfir_iris_client.case import Case
+from dfir_iris_client.helper.fan_out import CaseQuery
+from dfir_iris_client.tests.stand_in_server import StandInServerTest
+
+
+class StandInCase(object):
+    """Stand-in of a Case streaming the IOCs of its cases, failing midway for the cases listed in failing """
+
+    def __init__(self, records: int, failing: set = None):
+        self.records = records
+        self.failing = failing or set()
+
+    def list_iocs(self, cid: int, stream: bool = False):
+        """ """
+        for index in range(self.records):
+            if cid in self.failing and index == self.records // 2:
+                raise TimeoutError(f'Timeout while streaming case {cid}')
+
+            yield {'ioc_id': index, 'ioc_value': f'10.0.{cid}.{index}'}
+
+
+class CaseQueryErrorsTest(unittest.TestCase):
+    """ Failures of the cases of a query and of its callbacks """
+
+    def test_partial_case(self):
+        """ Test that a case failing midway is reported in errors, and that the records yielded before are kept """
+        query = CaseQuery(StandInCase(records=10, failing={2}), 'iocs', cids=[1, 2])
+        records = list(query)
+
+        assert len([record for record in records if record['cid'] == 1]) == 10
+        assert len([record for record in records if record['cid'] == 2]) == 5
+        assert list(query.errors) == [2]
+        assert 'Timeout' in query.errors[2]
+
+    def test_where_errors_propagate(self):
+        """ Test that the exceptions raised by where stop the query and are raised to the caller """
+        def where(record):
+            if record['ioc_id'] == 3:
+                raise KeyError('ioc_type')
+
+            return True
+
+        query = CaseQuery(StandInCase(records=10), 'iocs', cids=[1, 2, 3], where=where)
+        with self.assertRaises(KeyError):
+            list(query)
+
+        assert query.errors == {}
+
+
+class CaseQueryTest(StandInServerTest):
+    """ Queries over many cases """
+
+    def test_query_cases(self):
+        """ Test that a query over many cases merges their records and reports the failing cases """
+        case = Case(self.session)
+
+        query = case.query_cases('iocs', cids=[1, 2, 3], fields=['ioc_value'])
+        assert sorted(ioc['cid'] for ioc in query) == [1, 2]
+        assert list(query.errors) == [3]
+
+        query = case.query_cases('assets', where=lambda asset: asset['asset_name'] == 'DC01',
+                                 case_where=lambda listed: listed['client_name'] == 'ACME')
+        assert sorted((asset['cid'], asset['asset_id']) for asset in query) == [(1, 1), (3, 1), (5, 1)]
+        assert query.errors == {}
+
+        first = next(iter(case.query_cases('events', cids=list(range(1, 9)))))
+        assert first['event_title'].startswith('event')
@@ -0,0 +1,150 @@
+#  IRIS Client API Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import json
+import os
+import pickle
+import stat
+import tempfile
+import unittest
+from pathlib import Path
+
+from requests import Response
+
+from dfir_iris_client.helper.http_cache import ConditionalCache
+from dfir_iris_client.tests.stand_in_server import StandInServerTest
+
+
+def make_response(data, etag: str = None) -> Response:
+    """Build a successful response of the server """
+    response = Response()
+    response.status_code = 200
+    response._content = json.dumps({'status': 'success', 'message': '', 'data': data}).encode('utf-8')
+    if etag is not None:
+        response.headers['ETag'] = etag
+
+    return response
+
+
+class ConditionalCacheDiskTest(unittest.TestCase):
+    """ Responses stored in the directory of a ConditionalCache """
+
+    def setUp(self) -> None:
+        """ """
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.directory = Path(self.temp_dir.name) / 'cache'
+
+    def tearDown(self) -> None:
+        """ """
+        self.temp_dir.cleanup()
+
+    def store(self, cache: ConditionalCache, index: int, size: int = 10) -> None:
+        """ """
+        cache.handle(f'key {index}', make_response({'index': index, 'padding': 'x' * size}), f'case/ioc/{index}')
+
+    def test_disk_eviction_by_count(self):
+        """ Test that the oldest files are removed once the directory holds too many responses """
+        cache = ConditionalCache(directory=self.directory, max_disk_entries=3)
+        for index in range(6):
+            self.store(cache, index)
+
+        assert len(list(self.directory.glob('*.cache'))) == 3
+        assert cache._read('key 0') is None
+        assert cache._read('key 5') is not None
+
+        reopened = ConditionalCache(directory=self.directory, max_disk_entries=2)
+        assert len(list(self.directory.glob('*.cache'))) == 2
+        assert reopened._read('key 3') is None
+        assert reopened._read('key 5') is not None
+
+    def test_disk_eviction_by_size(self):
+        """ Test that the oldest files are removed once the directory grows too large """
+        cache = ConditionalCache(directory=self.directory, max_disk_bytes=3000)
+        for index in range(5):
+            self.store(cache, index, size=1000)
+
+        files = list(self.directory.glob('*.cache'))
+        assert len(files) == 2
+        assert sum(path.stat().st_size for path in files) <= 3000
+        assert cache._read('key 4') is not None
+
+    @unittest.skipUnless(os.name == 'posix', 'POSIX permissions')
+    def test_file_permissions(self):
+        """ Test that the directory and the files are private to the user """
+        cache = ConditionalCache(directory=self.directory)
+        self.store(cache, 1)
+
+        assert stat.S_IMODE(self.directory.stat().st_mode) & 0o077 == 0
+        for path in self.directory.glob('*.cache'):
+            assert stat.S_IMODE(path.stat().st_mode) == 0o600
+
+    def test_no_store(self):
+        """ Test that the endpoints matching no_store are neither kept in memory nor written to disk """
+        cache = ConditionalCache(directory=self.directory, no_store=['manage/users/*'])
+
+        assert cache.handle('users', make_response([{'user_id': 1}], etag='"1"'), 'manage/users/list') is None
+        assert cache.handle('iocs', make_response([{'ioc_id': 1}], etag='"2"'), 'case/ioc/list?cid=1') is not None
+
+        assert len(cache) == 1
+        assert cache.request_headers('users') == {}
+        assert cache.request_headers('iocs') == {'If-None-Match': '"2"'}
+        assert len(list(self.directory.glob('*.cache'))) == 1
+        assert pickle.loads(pickle.dumps(cache)).stores('manage/users/list') is False
+
+
+class EvictingCache(ConditionalCache):
+    """ConditionalCache evicting every response once its validators are sent """
+
+    def request_headers(self, key: str) -> dict:
+        headers = super().request_headers(key)
+        self.clear()
+        return headers
+
+
+class ConditionalCacheTest(StandInServerTest):
+    """ GET responses revalidated with the server """
+
+    def test_conditional_cache(self):
+        """ Test that unchanged GET responses are served from the cache, with or without validators """
+        with tempfile.TemporaryDirectory() as directory:
+            self.session._http_cache = ConditionalCache(directory=directory)
+
+            first = self.session.pi_get('manage/ioc-types/list')
+            assert self.session.pi_get('manage/ioc-types/list') is first
+            assert f'{self.host}/manage/ioc-types/list' in self.session.get_trace()
+            assert 304 in self.session.get_trace()[f'{self.host}/manage/ioc-types/list']
+
+            events = self.session.pi_get('case/timeline/events/list/filter/0')
+            assert self.session.pi_get('case/timeline/events/list/filter/0') is events
+            assert self.session.pi_get('echo', cid=1).get_data() == self.session.pi_get('echo', cid=1).get_data()
+
+            assert self.session.http_cache.stats() == {'not_modified': 1, 'unchanged': 2, 'changed': 0, 'stored': 3}
+
+            session = pickle.loads(pickle.dumps(self.session))
+            assert len(session.http_cache) == 0
+            assert session.pi_get('manage/ioc-types/list').get_data() == first.get_data()
+            assert session.http_cache.stats()['not_modified'] == 1
+
+    def test_not_modified_after_eviction(self):
+        """ Test that a response evicted while the server validated it is requested again in full """
+        self.session._http_cache = EvictingCache()
+
+        first = self.session.pi_get('manage/ioc-types/list')
+        second = self.session.pi_get('manage/ioc-types/list')
+
+        assert second.get_data() == first.get_data()
+        assert set(self.session.get_trace()[f'{self.host}/manage/ioc-types/list']) == {200, 304}
+        assert self.session.http_cache.stats()['stored'] == 2
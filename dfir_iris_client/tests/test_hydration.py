@@ -0,0 +1,112 @@
+#  IRIS Client API Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import unittest
+
+from dfir_iris_client.helper.hydration import prefetch
+from dfir_iris_client.helper.utils import map_objects
+from dfir_iris_client.tests.test_iris_object import Asset, StandInSession, asset_data
+
+
+class HydrationTest(unittest.TestCase):
+    """ Batch hydration of partial IrisDynamicObjects """
+
+    def setUp(self) -> None:
+        """ """
+        self.assets = [asset_data(asset_id) for asset_id in range(1, 6)]
+        self.session = StandInSession({'case/assets/list': {'assets': self.assets}})
+
+    def load_partial(self, count: int = 5) -> list:
+        """ """
+        partial_data = [{'asset_id': asset['asset_id'], 'asset_name': asset['asset_name']}
+                        for asset in self.assets[:count]]
+        return map_objects(Asset, partial_data, cid=1, session=self.session, partial=True)
+
+    def test_batch_hydrated_by_one_list_call(self):
+        """ Test that accessing a partial object fully loads the whole batch with a single list request """
+        assets = self.load_partial()
+
+        assert assets[2].description == 'Domain controller'
+        assert self.session.requests == [('GET', 'case/assets/list', 1, None)]
+        assert all(not asset.is_partial and asset.is_synced for asset in assets)
+        assert all(asset._batch is None for asset in assets)
+
+        assert [asset.name for asset in assets] == [f'asset-{asset_id}' for asset_id in range(1, 6)]
+        assert len(self.session.requests) == 1
+
+    def test_prefetch(self):
+        """ Test that prefetch loads a collection with a single list request """
+        assets = self.load_partial()
+
+        ret = prefetch(assets)
+
+        assert bool(ret) is True
+        assert ret.data == {'loaded': 5}
+        assert self.session.requests == [('GET', 'case/assets/list', 1, None)]
+        assert all(not asset.is_partial for asset in assets)
+
+    def test_objects_missing_from_list(self):
+        """ Test that the objects missing from the list are loaded on their own """
+        assets = self.load_partial()
+        self.session.replies['case/assets/list'] = {'assets': self.assets[:3]}
+        self.session.replies['case/assets/4'] = asset_data(4, asset_description='Workstation')
+        self.session.replies['case/assets/5'] = asset_data(5, asset_description='Workstation')
+
+        assert bool(prefetch(assets)) is True
+        assert sorted(uri for _, uri, _, _ in self.session.requests) == ['case/assets/4', 'case/assets/5',
+                                                                          'case/assets/list']
+        assert [asset.description for asset in assets] == ['Domain controller'] * 3 + ['Workstation'] * 2
+
+    def test_local_changes_survive_batch(self):
+        """ Test that loading a batch does not overwrite the members changed locally """
+        assets = self.load_partial()
+        assets[0]._description = 'Edited'
+        assets[0].mark_dirty('_description')
+
+        assert assets[1].description == 'Domain controller'
+        assert assets[0]._description == 'Edited'
+        assert assets[0].dirty_attributes == {'_description'}
+        assert assets[0].is_synced is False
+        assert assets[0].is_partial is True
+        assert all(not asset.is_partial and asset.is_synced for asset in assets[1:])
+
+    def test_failed_batch_leaves_objects_partial(self):
+        """ Test that objects which could not be loaded stay partial and are reported """
+        assets = self.load_partial()
+        del self.session.replies['case/assets/list']
+
+        ret = prefetch(assets)
+
+        assert bool(ret) is False
+        assert set(ret.data) == set(assets)
+        assert all(asset.is_partial for asset in assets)
+        assert all(asset.is_synced for asset in assets)
+        assert assets[0]._name == 'asset-1'
+        assert assets[0]._description is None
+
+        with self.assertRaises(Exception):
+            assets[0].description
+
+        assert assets[0].is_partial is True
+
+        self.session.replies['case/assets/list'] = {'assets': self.assets}
+        self.session.replies['case/assets/1'] = self.assets[0]
+        assert assets[0].description == 'Domain controller'
+        assert assets[0].is_partial is False
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,640 @@
+#  IRIS Client API Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import gc
+import json
+import unittest
+import weakref
+
+from dfir_iris_client.helper import iris_object
+from dfir_iris_client.helper.errors import IrisClientException, InvalidObjectMapping
+from dfir_iris_client.helper.identity_map import get_identity_map
+from dfir_iris_client.helper.iris_object import IrisDynamicObject, IrisObject, compact_class, get_case_helper, \
+    iris_dynamic_property, iris_obj_property, save_objects
+from dfir_iris_client.helper.objects_def import objects_map
+from dfir_iris_client.helper.utils import ApiResponse, get_object_mapper, map_objects
+from dfir_iris_client.session import use_session
+
+
+class StandInSession(object):
+    """Stand-in of a ClientSession replying to the helpers from canned data, and recording their requests.
+    A reply is the data of a successful response, a callable building it from the body of the request, or an
+    exception to raise. URIs without reply get an error response.
+    """
+
+    def __init__(self, replies: dict = None):
+        self.replies = dict(replies or {})
+        self.requests = []
+
+    def pi_get(self, uri: str, cid: int = None, no_wrap: bool = False) -> ApiResponse:
+        """ """
+        return self._reply('GET', uri, cid, None)
+
+    def pi_post(self, uri: str, data: dict = None, cid: int = None) -> ApiResponse:
+        """ """
+        return self._reply('POST', uri, cid, data)
+
+    def _reply(self, method: str, uri: str, cid: int, data: dict) -> ApiResponse:
+        """ """
+        self.requests.append((method, uri, cid, data))
+        reply = self.replies.get(uri)
+        if callable(reply):
+            reply = reply(data)
+
+        if isinstance(reply, Exception):
+            raise reply
+
+        if reply is None:
+            return ApiResponse(json.dumps({'message': f'No reply for {uri}', 'data': None, 'status': 'error'}))
+
+        return ApiResponse(json.dumps({'message': '', 'data': reply, 'status': 'success'}))
+
+
+def setattr_map(obj, data_obj: dict, strict: bool = False) -> None:
+    """Reference mapping, setting each attribute of objects_def in turn as map_object originally did """
+    obj_def = objects_map.get(obj.object_name)
+    for attribute in obj_def:
+        field = obj_def[attribute]
+        if not hasattr(obj, attribute) and strict:
+            raise IrisClientException(InvalidObjectMapping(message=f'Invalid object mapping for {obj.object_name}. '
+                                                                   f'Missing attribute'
+                                                                   f' {attribute} for {field}',
+                                                           data=data_obj))
+        if field not in data_obj and strict:
+            raise IrisClientException(
+                InvalidObjectMapping(message=f'Invalid object mapping for {obj.object_name}. Missing field'
+                                             f' {field} in server data',
+                                     data=data_obj))
+
+        if attribute == 'id':
+            obj.set_id(data_obj.get(field))
+
+        else:
+            setattr(obj, attribute, data_obj.get(field))
+
+
+class RecordingProperty(object):
+    """Data descriptor recording the attributes already set on the instance whenever it is set """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+
+        return instance.__dict__.get(f'_recorded{self.name}')
+
+    def __set__(self, instance, value):
+        instance.log.append((self.name, sorted(key for key in instance.__dict__ if key != 'log')))
+        instance.__dict__[f'_recorded{self.name}'] = value
+
+
+class RecordingEvent(object):
+    """Object mapped from the event entry of objects_def, with a descriptor in the middle of the entry """
+    object_name = 'event'
+
+    date = RecordingProperty('date')
+
+    def __init__(self):
+        self.log = []
+
+    @property
+    def id(self) -> int:
+        return self.__dict__.get('_id')
+
+    def set_id(self, id: int) -> None:
+        self.log.append(('id', sorted(key for key in self.__dict__ if key != 'log')))
+        self._id = id
+
+
+class StrictEvent(RecordingEvent):
+    """Event with all the attributes of objects_def defined beforehand """
+
+    def __init__(self):
+        super().__init__()
+        for attribute in objects_map['event']:
+            if attribute not in ('id', 'date'):
+                setattr(self, attribute, None)
+
+
+def event_data(**overrides) -> dict:
+    """Return the server data of an event """
+    data = {field: f'value of {field}' for field in objects_map['event'].values()}
+    data.update(overrides)
+    return data
+
+
+class ObjectMapperTest(unittest.TestCase):
+    """ Compiled mappers of get_object_mapper against the reference setattr mapping """
+
+    def assert_same_mapping(self, cls, data: dict, strict: bool = False) -> None:
+        """ """
+        compiled, reference = cls(), cls()
+        get_object_mapper(cls, strict=strict)(compiled, data)
+        setattr_map(reference, data, strict=strict)
+
+        assert compiled.__dict__ == reference.__dict__
+
+    def test_same_state_as_setattr(self):
+        """ Test that the compiled mapper leaves the object as the setattr mapping does """
+        self.assert_same_mapping(RecordingEvent, event_data())
+
+    def test_attributes_set_in_objects_def_order(self):
+        """ Test that descriptors and set_id see the attributes preceding them in objects_def, and only those """
+        event = RecordingEvent()
+        get_object_mapper(RecordingEvent)(event, event_data())
+
+        assert event.log == [('id', []), ('date', ['_category', '_color', '_content', '_id'])]
+
+    def test_unknown_and_missing_fields(self):
+        """ Test that unknown fields are ignored and missing fields are mapped to None when not strict """
+        data = event_data(unknown_field='ignored')
+        del data['event_title']
+        del data['event_date']
+
+        self.assert_same_mapping(RecordingEvent, data)
+
+        event = RecordingEvent()
+        get_object_mapper(RecordingEvent)(event, data)
+        assert event._title is None
+        assert event.date is None
+        assert not hasattr(event, 'unknown_field')
+
+    def test_strict_mapping(self):
+        """ Test that the strict mapper accepts complete data and fails as the setattr mapping does otherwise """
+        self.assert_same_mapping(StrictEvent, event_data(), strict=True)
+
+        data = event_data()
+        del data['event_tz']
+        errors = []
+        for mapping in (lambda obj: get_object_mapper(StrictEvent, strict=True)(obj, data),
+                        lambda obj: setattr_map(obj, data, strict=True)):
+            with self.assertRaises(IrisClientException) as context:
+                mapping(StrictEvent())
+
+            errors.append(str(context.exception))
+
+        assert errors[0] == errors[1]
+        assert 'event_tz' in errors[0]
+
+        with self.assertRaises(IrisClientException) as context:
+            get_object_mapper(RecordingEvent, strict=True)(RecordingEvent(), event_data())
+
+        assert 'Missing attribute' in str(context.exception)
+
+
+class Note(IrisObject):
+    """IrisObject with iris_obj_property attributes """
+    object_name = 'note'
+
+    def __init__(self, cid: int = None):
+        super().__init__(cid=cid)
+        self._title = None
+        self._content = None
+
+    @iris_obj_property
+    def title(self):
+        """ """
+        return self._title
+
+    @iris_obj_property
+    def content(self):
+        """ """
+        return self._content
+
+
+class Asset(IrisDynamicObject):
+    """IrisDynamicObject loading itself from the case helper """
+    object_name = 'asset'
+
+    def __init__(self, cid: int = None):
+        super().__init__(cid=cid)
+        self._name = None
+        self._description = None
+
+    @iris_dynamic_property
+    def name(self):
+        """ """
+        return self._name
+
+    @iris_dynamic_property
+    def description(self):
+        """ """
+        return self._description
+
+    def init_from_id(self, id: int = None):
+        """ """
+        ret = self._ch.get_asset(asset_id=id, cid=self._cid)
+        if ret.is_error():
+            return ret
+
+        return self.init_from_data(ret.get_data())
+
+
+def asset_data(asset_id: int, **fields) -> dict:
+    """Return the server data of an asset """
+    data = {'asset_id': asset_id, 'asset_name': f'asset-{asset_id}', 'asset_description': 'Domain controller'}
+    data.update(fields)
+    return data
+
+
+class CompactIrisObjectTest(unittest.TestCase):
+    """ Slotted objects generated by compact_class """
+
+    def setUp(self) -> None:
+        """ """
+        self.session = StandInSession()
+
+    def test_compact_class_is_generated_once(self):
+        """ Test that compact_class generates a single slotted class per objects_def entry """
+        CompactEvent = compact_class('event')
+
+        assert compact_class('event') is CompactEvent
+        assert CompactEvent.__name__ == 'CompactEvent'
+        assert compact_class('case_task').__name__ == 'CompactCaseTask'
+        assert set(CompactEvent.__slots__) == set(objects_map['event']) - {'id'}
+
+        with self.assertRaises(IrisClientException):
+            compact_class('unknown')
+
+    def test_slots(self):
+        """ Test that compact objects have no __dict__ and only accept their mapped attributes """
+        event = compact_class('event')(cid=1, session=self.session)
+
+        assert not hasattr(event, '__dict__')
+        assert event._title is None
+        assert event.date is None
+
+        event._title = 'Lateral movement'
+        assert event._title == 'Lateral movement'
+
+        with self.assertRaises(AttributeError):
+            event.unknown = 1
+
+        with self.assertRaises(AttributeError):
+            event.unknown
+
+    def test_compact_object_mapping(self):
+        """ Test that compact objects are mapped from server data and reach the session through their helper """
+        CompactEvent = compact_class('event')
+        event = CompactEvent(cid=1, session=self.session)
+        event.init_from_data({'event_id': 3, 'event_title': 'Logon', 'event_tz': '+00:00'})
+
+        assert event.id == 3
+        assert event._title == 'Logon'
+        assert event._tz == '+00:00'
+        assert event._s is self.session
+        assert event._ch is get_case_helper(self.session, 1)
+        assert event.is_synced is True
+
+        event.mark_dirty('_title')
+        assert event.dirty_attributes == {'_title'}
+        assert event.is_synced is False
+
+
+class IrisObjectPropertyTest(unittest.TestCase):
+    """ iris_obj_property descriptors of IrisObjects """
+
+    def test_descriptor_get_set(self):
+        """ Test that the properties read and write the underlying attributes and record them as dirty """
+        with use_session(StandInSession()):
+            note = Note(cid=1)
+
+        get_object_mapper(Note)(note, {'note_id': 2, 'note_title': 'Triage', 'note_content': 'Done'})
+        note._set_sync_state(True)
+
+        assert note.title == 'Triage'
+        assert note.dirty_attributes == frozenset()
+
+        note.title = 'Triage notes'
+        assert note._title == 'Triage notes'
+        assert note.title == 'Triage notes'
+        assert note.is_synced is False
+        assert note.dirty_attributes == {'_title'}
+
+
+class CaseHelperTest(unittest.TestCase):
+    """ Case helpers shared by the IrisObjects """
+
+    def test_helpers_are_shared(self):
+        """ Test that objects of the same session and case share their helper, and switch helper with set_cid """
+        session = StandInSession()
+        with use_session(session):
+            first, second, other = Note(cid=1), Note(cid=1), Note(cid=2)
+
+        assert first._ch is second._ch
+        assert first._ch is not other._ch
+        assert first._ch._s is session
+        assert first._ch._cid == 1
+
+        second.set_cid(2)
+        assert second._ch is other._ch
+        assert first._ch._cid == 1
+        assert get_case_helper(StandInSession(), 1) is not first._ch
+
+    def test_helpers_released_with_session(self):
+        """ Test that the helpers and their session are released with the last object using them """
+        session = StandInSession()
+        session_ref = weakref.ref(session)
+        CompactEvent = compact_class('event')
+        events = [CompactEvent(cid=1, session=session) for _ in range(3)]
+        key = (id(session), 1)
+
+        assert iris_object._case_helpers.get(key) is events[0]._ch
+
+        del session, events
+        gc.collect()
+
+        assert session_ref() is None
+        assert key not in iris_object._case_helpers
+
+
+class IdentityMapTest(unittest.TestCase):
+    """ Identity map of the IrisObjects of a session, as used by map_objects """
+
+    def setUp(self) -> None:
+        """ """
+        self.session = StandInSession()
+
+    def test_session_argument(self):
+        """ Test that map_objects builds IrisObjects of the session provided, whatever their class """
+        asset, = map_objects(Asset, [asset_data(1)], cid=1, session=self.session)
+        event, = map_objects(compact_class('event'), [{'event_id': 1}], cid=1, session=self.session)
+
+        assert asset._s is self.session
+        assert event._s is self.session
+        assert asset in get_identity_map(self.session)
+
+    def test_canonical_instance_reused(self):
+        """ Test that loading the same server object twice returns the same instance, refreshed and synced """
+        first, = map_objects(Asset, [asset_data(1)], cid=1, session=self.session)
+        second, other_case = map_objects(Asset, [asset_data(1, asset_name='DC01')], cid=1, session=self.session) + \
+            map_objects(Asset, [asset_data(1)], cid=2, session=self.session)
+
+        assert second is first
+        assert first.name == 'DC01'
+        assert first.is_synced is True
+        assert other_case is not first
+
+        assert map_objects(Asset, [asset_data(1)], cid=1, session=self.session, identity_map=False)[0] is not first
+
+    def test_canonical_instance_refresh(self):
+        """ Test that the canonical instance is not refreshed over local changes, nor by partial data """
+        asset, = map_objects(Asset, [asset_data(1)], cid=1, session=self.session)
+        asset.description = 'Changed locally'
+
+        assert map_objects(Asset, [asset_data(1, asset_description='Server')], cid=1, session=self.session)[0] is asset
+        assert asset.description == 'Changed locally'
+        assert asset.dirty_attributes == {'_description'}
+
+        other, = map_objects(Asset, [asset_data(2)], cid=1, session=self.session)
+        map_objects(Asset, [{'asset_id': 2, 'asset_name': 'partial'}], cid=1, session=self.session, partial=True)
+
+        assert other.is_partial is False
+        assert other.name == 'asset-2'
+        assert other.description == 'Domain controller'
+        assert other.is_synced is True
+
+    def test_weak_eviction(self):
+        """ Test that objects are released from the identity map once nothing else uses them """
+        assets = map_objects(Asset, [asset_data(1), asset_data(2)], cid=1, session=self.session)
+        identity_map = get_identity_map(self.session)
+
+        assert len(identity_map) == 2
+
+        del assets
+        gc.collect()
+
+        assert len(identity_map) == 0
+        asset, = map_objects(Asset, [asset_data(1)], cid=1, session=self.session)
+        assert identity_map.get('asset', 1, 1) is asset
+        assert asset.name == 'asset-1'
+
+
+class TaggedAsset(Asset):
+    """Asset with state of its own set at init """
+
+    def __init__(self, cid: int = None):
+        super().__init__(cid=cid)
+        self.labels = []
+        self.name = 'unnamed'
+
+
+class ResetTest(unittest.TestCase):
+    """ Reset of IrisObjects """
+
+    def setUp(self) -> None:
+        """ """
+        self.session = StandInSession({'case/assets/1': asset_data(1, asset_name='DC01')})
+
+    def test_reset_is_not_dirty(self):
+        """ Test that reset clears the mapped attributes without marking them dirty nor loading the object """
+        asset, = map_objects(Asset, [asset_data(1)], cid=1, session=self.session, partial=True)
+        asset.reset(keep_id=True, keep_cid=True)
+
+        assert self.session.requests == []
+        assert asset.dirty_attributes == frozenset()
+        assert asset.is_synced is False
+        assert asset.is_partial is False
+        assert asset._name is None
+        assert asset.id == 1
+        assert asset._cid == 1
+
+    def test_reset_restores_init_state(self):
+        """ Test that reset restores the state set by the init of subclasses, in the session of the object """
+        other_session = StandInSession()
+        asset, = map_objects(TaggedAsset, [asset_data(1)], cid=1, session=self.session)
+        asset.labels.append('triage')
+
+        with use_session(other_session):
+            asset.reset()
+
+        assert asset.labels == []
+        assert asset._name == 'unnamed'
+        assert asset.id is None
+        assert asset._cid is None
+        assert asset._s is self.session
+        assert asset not in get_identity_map(self.session)
+
+    def test_sync(self):
+        """ Test that sync reloads the object after a reset keeping its ID and case """
+        asset, = map_objects(Asset, [asset_data(1)], cid=1, session=self.session)
+        asset.description = 'Changed locally'
+
+        assert asset.sync().is_success()
+        assert asset.name == 'DC01'
+        assert asset.description == 'Domain controller'
+        assert asset.dirty_attributes == frozenset()
+        assert asset.is_synced is True
+
+    def test_compact_reset(self):
+        """ Test that compact objects are reset through their slots """
+        event = compact_class('event')(cid=1, session=self.session)
+        event.init_from_data({'event_id': 3, 'event_title': 'Logon'})
+        event.reset(keep_cid=True)
+
+        assert event._title is None
+        assert event.id is None
+        assert event._cid == 1
+        assert event._s is self.session
+        assert event.dirty_attributes == frozenset()
+        assert event.is_synced is False
+
+
+def echo_update(id_field: str, object_id: int):
+    """Return a reply to the updates of an object, made of the body received """
+    return lambda data: dict({key: value for key, value in data.items() if key != 'cid'}, **{id_field: object_id})
+
+
+class SaveTest(unittest.TestCase):
+    """ Saving the dirty attributes of IrisObjects """
+
+    def setUp(self) -> None:
+        """ """
+        self.event = {'event_id': 3, 'event_title': 'Logon', 'event_content': 'Interactive logon',
+                      'event_raw': 'raw', 'event_source': 'EVTX', 'event_in_graph': True, 'event_in_summary': False,
+                      'event_assets': [4, 5], 'event_iocs': [6], 'event_category_id': 2, 'event_color': None,
+                      'event_date': '2023-01-31T08:00:00.000000', 'event_date_wtz': '2023-01-31T09:00:00.000000',
+                      'event_tags': 'logon,rdp', 'event_tz': '+01:00', 'custom_attributes': {}}
+        self.task = {'task_id': 7, 'task_title': 'Triage', 'task_description': 'Collect artifacts',
+                     'task_assignees': [{'id': 1, 'name': 'analyst'}], 'task_status_id': 1, 'task_tags': '',
+                     'task_open_date': '2023-01-31', 'custom_attributes': None}
+
+        self.session = StandInSession({
+            'case/assets/update/1': echo_update('asset_id', 1),
+            'case/assets/update/2': echo_update('asset_id', 2),
+            'case/timeline/events/3': self.event,
+            'case/timeline/events/update/3': echo_update('event_id', 3),
+            'case/tasks/7': self.task,
+            'case/tasks/update/7': echo_update('task_id', 7)
+        })
+
+    def posts(self) -> list:
+        """ """
+        return [(uri, data) for method, uri, _, data in self.session.requests if method == 'POST']
+
+    def test_partial_body(self):
+        """ Test that only the dirty attributes are sent to the endpoints accepting partial bodies, without a read """
+        asset = compact_class('asset')(cid=1, session=self.session)
+        asset.init_from_data(asset_data(1))
+        asset.tags = ['dc', 'tier0']
+        asset.mark_dirty('tags')
+
+        ret = asset.save()
+
+        assert bool(ret) is True
+        assert self.posts() == [('case/assets/update/1', {'asset_tags': 'dc,tier0', 'cid': 1})]
+        assert len(self.session.requests) == 1
+        assert asset.is_synced is True
+        assert asset.dirty_attributes == frozenset()
+
+    def test_partial_object_save(self):
+        """ Test that the attributes a partial object did not load are not sent """
+        asset, = map_objects(Asset, [{'asset_id': 1, 'asset_name': 'DC01'}], cid=1, session=self.session,
+                             partial=True)
+        self.session.replies['case/assets/1'] = asset_data(1, asset_name='DC01')
+
+        asset.description = 'Tier 0'
+        asset.save()
+
+        assert self.posts() == [('case/assets/update/1', {'asset_description': 'Tier 0', 'cid': 1})]
+
+    def test_full_body_from_current_version(self):
+        """ Test that the endpoints requiring full bodies get the current version with the dirty attributes over it """
+        event = compact_class('event')(cid=1, session=self.session)
+        event.init_from_data({'event_id': 3, 'event_title': 'Logon'})
+        event._title = 'Remote logon'
+        event._tags = ['logon', 'rdp', 'lateral']
+        event.mark_dirty('_title', '_tags')
+
+        assert bool(event.save()) is True
+
+        (uri, body), = self.posts()
+        expected = {field: self.event[field] for field in self.event if field not in ('event_id', 'event_date_wtz')}
+        expected.update({'event_title': 'Remote logon', 'event_tags': 'logon,rdp,lateral', 'cid': 1})
+
+        assert uri == 'case/timeline/events/update/3'
+        assert body == expected
+        assert event._content == 'Interactive logon'
+
+    def test_task_body(self):
+        """ Test that the assignees and the status of tasks are sent as the update endpoint expects them """
+        task = compact_class('case_task')(cid=1, session=self.session)
+        task.init_from_data({'task_id': 7})
+        task.status = 2
+        task.mark_dirty('status')
+
+        task.save()
+        body = self.posts()[-1][1]
+
+        assert body['task_status_id'] == 2
+        assert body['task_assignees_id'] == [1]
+        assert 'task_open_date' not in body
+        assert 'task_status' not in body
+
+        task.assignee = 3
+        task.mark_dirty('assignee')
+        task.save()
+
+        assert self.posts()[-1][1]['task_assignees_id'] == [3]
+
+    def test_read_only_attributes(self):
+        """ Test that read only attributes are refused rather than silently dropped """
+        event = compact_class('event')(cid=1, session=self.session)
+        event.init_from_data({'event_id': 3})
+        event.mark_dirty('_date_wtz')
+
+        ret = event.save()
+
+        assert bool(ret) is False
+        assert '_date_wtz' in str(ret)
+        assert self.session.requests == []
+
+    def test_nothing_to_save(self):
+        """ Test that objects without dirty attributes are not sent """
+        asset, = map_objects(Asset, [asset_data(1)], cid=1, session=self.session)
+
+        assert bool(asset.save()) is True
+        assert self.session.requests == []
+
+    def test_failed_save_keeps_changes(self):
+        """ Test that the dirty attributes are kept when the server refuses the update """
+        asset, = map_objects(Asset, [asset_data(2)], cid=1, session=self.session)
+        self.session.replies['case/assets/update/2'] = None
+        asset.description = 'Refused'
+
+        assert bool(asset.save()) is False
+        assert asset.dirty_attributes == {'_description'}
+        assert asset.is_synced is False
+
+    def test_save_objects(self):
+        """ Test that save_objects saves every dirty object, once, and reports each of them """
+        assets = map_objects(Asset, [asset_data(1), asset_data(2), asset_data(3)], cid=1, session=self.session)
+        assets[0].description = 'First'
+        assets[1].description = 'Second'
+
+        results = save_objects(assets)
+
+        assert sorted(uri for uri, _ in self.posts()) == ['case/assets/update/1', 'case/assets/update/2']
+        assert results.is_success()
+        assert len(results) == 3
+        assert all(bool(results.get(('asset', 1, asset.id))) for asset in assets)
+        assert all(asset.is_synced for asset in assets)
+
+
+if __name__ == '__main__':
+    unittest.main()
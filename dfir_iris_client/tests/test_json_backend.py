@@ -0,0 +1,36 @@
+#  IRIS Client API Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+from dfir_iris_client.helper import json_backend
+from dfir_iris_client.tests.stand_in_server import StandInServerTest
+
+
+class JsonBackendTest(StandInServerTest):
+    """ JSON backends exchanging data with the server """
+
+    def test_json_backends(self):
+        """ Test that every JSON backend installed exchanges the same data with the server """
+        data = {'text': 'caf\u00e9 \u2603', 'big': 2 ** 70, 'nested': {'list': [1, 2.5, None, True]}}
+
+        try:
+            for name in json_backend.BACKENDS:
+                assert json_backend.set_backend(name).name == name
+
+                resp = self.session.pi_post('json/backend', data=data)
+                assert resp.get_data().get('body') == data
+
+        finally:
+            json_backend.set_backend()
@@ -0,0 +1,35 @@
+#  IRIS Client API Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+from dfir_iris_client.case import Case
+from dfir_iris_client.tests.stand_in_server import STREAMED_RECORDS, StandInServerTest
+
+
+class JsonStreamTest(StandInServerTest):
+    """ Lists streamed from the responses """
+
+    def test_stream_list(self):
+        """ Test that a streamed list yields the same records as the full response """
+        case = Case(self.session, case_id=1)
+
+        events = case.list_events(stream=True)
+        assert not isinstance(events, list)
+
+        streamed = list(events)
+        assert len(streamed) == STREAMED_RECORDS
+        assert streamed == case.list_events().get_data().get('timeline')
+
+        assert [node_id for node_id, _ in case.list_ds_tree(stream=True)] == ['d-1', 'd-2']
@@ -0,0 +1,88 @@
+#  IRIS Client API Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import json
+import unittest
+
+from dfir_iris_client.helper.response_cache import ResponseCache
+from dfir_iris_client.helper.utils import ApiResponse
+from dfir_iris_client.tests.stand_in_server import StandInServerTest
+
+
+def make_api_response(data) -> ApiResponse:
+    """Build a successful response of the server """
+    return ApiResponse(json.dumps({'status': 'success', 'message': '', 'data': data}))
+
+
+class ResponseCacheGenerationTest(unittest.TestCase):
+    """ Responses received while a write invalidated their scope """
+
+    def setUp(self) -> None:
+        """ """
+        self.cache = ResponseCache()
+
+    def put_after(self, uri: str, write_uri: str) -> bool:
+        """Put the response of a GET request during which a write completed, and tell whether it was kept """
+        generation = self.cache.generation(uri)
+        self.cache.invalidate(write_uri)
+        self.cache.put(uri, make_api_response({'uri': uri}), generation=generation)
+
+        return self.cache.get(uri) is not None
+
+    def test_stale_response_not_kept(self):
+        """ Test that a response is not kept if a write of its scope completed while it was requested """
+        assert self.put_after('case/ioc/list?cid=1', 'case/ioc/update/5?cid=1') is False
+        assert self.put_after('case/ioc/5?cid=1', 'case/ioc/delete/5?cid=1') is False
+        assert self.put_after('case/ioc/list?cid=1', 'case/ioc/add') is False
+        assert self.put_after('manage/cases/list', 'manage/cases/update/1?cid=1') is False
+
+    def test_other_scopes_kept(self):
+        """ Test that writes of other scopes do not prevent a response from being kept """
+        assert self.put_after('case/ioc/list?cid=2', 'case/ioc/update/5?cid=1') is True
+        assert self.put_after('case/assets/list?cid=1', 'case/ioc/update/5?cid=1') is True
+        assert self.put_after('manage/users/list', 'api/ping') is True
+
+    def test_generation_is_optional(self):
+        """ Test that a response put without generation is kept as before """
+        self.cache.invalidate('case/ioc/update/5?cid=1')
+        self.cache.put('case/ioc/list?cid=1', make_api_response([]))
+
+        assert self.cache.get('case/ioc/list?cid=1') is not None
+
+
+class ResponseCacheTest(StandInServerTest):
+    """ GET responses served locally until a write affects them """
+
+    def test_response_cache(self):
+        """ Test that repeated GET requests are served locally until a write affects them """
+        self.session._response_cache = ResponseCache()
+
+        ioc = self.session.pi_get('case/ioc/5', cid=1)
+        assert self.session.pi_get('case/ioc/5', cid=1) is ioc
+        iocs = self.session.pi_get('case/ioc/list', cid=1)
+        other_iocs = self.session.pi_get('case/ioc/list', cid=2)
+        other_ioc = self.session.pi_get('case/ioc/6', cid=1)
+        self.session.pi_get('api/ping', cid=1)
+        assert len(self.session.response_cache) == 4
+
+        assert self.session.pi_post('case/ioc/update/5', data={'ioc_tags': 'updated'}, cid=1)
+        assert self.session.pi_get('case/ioc/5', cid=1) is not ioc
+        assert self.session.pi_get('case/ioc/list', cid=1) is not iocs
+        assert self.session.pi_get('case/ioc/list', cid=2) is other_iocs
+        assert self.session.pi_get('case/ioc/6', cid=1) is other_ioc
+
+        assert self.session.response_cache.stats() == {'hits': 3, 'misses': 6, 'expired': 0, 'evicted': 0,
+                                                       'invalidated': 2}
@@ -0,0 +1,79 @@
+#  IRIS Client API Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import datetime
+import unittest
+
+from dfir_iris_client.case import Case
+from dfir_iris_client.helper.result_table import ResultTable, numpy, pandas
+from dfir_iris_client.tests.stand_in_server import STREAMED_RECORDS, StandInServerTest
+
+
+class ResultTableTest(unittest.TestCase):
+    """ Typing of the columns of a ResultTable """
+
+    def test_datetimes(self):
+        """ Test that naive times are parsed into datetime64 columns if numpy is installed """
+        table = ResultTable.from_records([{'event_date': '2023-01-01T10:00:00.000000'}, {'event_date': None}])
+
+        assert table.dtypes == {'event_date': 'datetime64' if numpy is not None else 'datetime'}
+        assert str(table['event_date'][0]).startswith('2023-01-01')
+
+    def test_datetimes_with_offset(self):
+        """ Test that times with a UTC offset are parsed into aware datetimes rather than shifted to UTC """
+        table = ResultTable.from_records([{'event_date': '2023-01-01T10:00:00+02:00'},
+                                          {'event_date': '2023-01-02T10:00:00Z'}, {'event_date': None}])
+
+        assert table.dtypes == {'event_date': 'datetime'}
+        assert table['event_date'][0] == datetime.datetime(2023, 1, 1, 10, tzinfo=datetime.timezone(
+            datetime.timedelta(hours=2)))
+        assert table['event_date'][0].utcoffset() == datetime.timedelta(hours=2)
+        assert table['event_date'][1].utcoffset() == datetime.timedelta(0)
+
+        if pandas is not None:
+            df = table.to_pandas()
+            assert str(df['event_date'].dt.tz) == 'UTC'
+            assert df['event_date'][0] == pandas.Timestamp('2023-01-01T08:00:00Z')
+
+    def test_mixed_offsets_left_unparsed(self):
+        """ Test that a column mixing times with and without a UTC offset is kept as strings """
+        values = ['2023-01-01T10:00:00+02:00', '2023-01-01T10:00:00']
+        table = ResultTable.from_records([{'event_date': value} for value in values])
+
+        assert table.dtypes == {'event_date': 'object'}
+        assert list(table['event_date']) == values
+
+
+class ResultTableStreamTest(StandInServerTest):
+    """ ResultTables built from the responses of the server """
+
+    def test_stream_to_table(self):
+        """ Test that a streamed list is built into typed columns """
+        case = Case(self.session, case_id=1)
+
+        table = ResultTable.from_records(case.list_events(stream=True))
+        assert len(table) == STREAMED_RECORDS
+        assert table.dtypes == {'event_id': 'int64', 'event_title': 'object', 'score': 'float64',
+                                'event_date': 'datetime64'}
+        assert list(table['event_id']) == list(range(STREAMED_RECORDS))
+
+        response_table = ResultTable.from_response(case.list_events(), 'timeline')
+        assert list(response_table.rows()) == list(table.rows())
+
+        if pandas is not None:
+            df = table.to_pandas()
+            assert df.shape == (STREAMED_RECORDS, 4)
+            assert df['event_id'].dtype == 'int64'
@@ -0,0 +1,304 @@
+#  IRIS Client API Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import gc
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+import unittest
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from dfir_iris_client.helper import identity_map
+from dfir_iris_client.helper.alert_dedup import AlertDeduplicator
+from dfir_iris_client.helper.concurrency import RateLimiter, iter_concurrently, run_concurrently
+from dfir_iris_client.helper.errors import IrisClientException
+from dfir_iris_client.helper.unit_of_work import UnitOfWork, current_unit_of_work
+from dfir_iris_client.session import ClientSession, get_session, register_session, unregister_session, use_session
+from dfir_iris_client.tests.stand_in_server import StandInHandler, StandInServerTest
+
+THREADS = 16
+REQUESTS_PER_THREAD = 50
+
+
+def get_path_in_child(session: ClientSession, path: str) -> str:
+    """Issue a request from a child process """
+    return session.pi_get(path).get_data().get('path')
+
+
+class StandInClientSession(object):
+    """Stand-in of a ClientSession, as held by the registry and the current context """
+
+    def __init__(self, name: str):
+        self.name = name
+
+
+class SessionRegistryTest(unittest.TestCase):
+    """ Named sessions and the session of the current context """
+
+    def setUp(self):
+        """ """
+        self.tenants = {name: StandInClientSession(name) for name in ('tenant_a', 'tenant_b')}
+        for name, session in self.tenants.items():
+            register_session(name, session)
+
+    def tearDown(self):
+        """ """
+        for name in self.tenants:
+            unregister_session(name)
+
+    def test_use_session_scope(self):
+        """ Test that use_session applies to its block only, by name or by session """
+        outside = get_session()
+        with use_session('tenant_a') as session:
+            assert session is self.tenants['tenant_a']
+            assert get_session() is session
+
+            with use_session(self.tenants['tenant_b']):
+                assert get_session() is self.tenants['tenant_b']
+
+            assert get_session() is session
+
+        assert get_session() is outside
+
+    def test_run_concurrently_scope(self):
+        """ Test that the calls of run_concurrently run with the session of the caller, and that the sessions they
+        set do not leak to each other nor to the caller """
+        def worker(name):
+            before = get_session()
+            with use_session(name):
+                time.sleep(0.01)
+                inside = get_session()
+
+            return before, inside, get_session()
+
+        with use_session('tenant_a'):
+            results = run_concurrently(worker, ['tenant_b', 'tenant_a'] * 8, max_workers=8)
+            assert get_session() is self.tenants['tenant_a']
+
+        for (before, inside, after), name in zip(results, ['tenant_b', 'tenant_a'] * 8):
+            assert before is self.tenants['tenant_a']
+            assert inside is self.tenants[name]
+            assert after is self.tenants['tenant_a']
+
+    def test_iter_concurrently_scope(self):
+        """ Test that iter_concurrently keeps the session of the context it was called from, even when its results
+        are consumed from another one """
+        with use_session('tenant_a'):
+            results = iter_concurrently(lambda _: get_session(), range(4), max_workers=2)
+
+        with use_session('tenant_b'):
+            sessions = list(results)
+
+        assert sessions == [self.tenants['tenant_a']] * 4
+
+    def test_concurrent_scopes(self):
+        """ Test that threads using different sessions each see their own, down to their concurrent calls """
+        def tenant_worker(name):
+            with use_session(name):
+                return set(iter_concurrently(lambda _: get_session(), range(8), max_workers=4))
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            sessions = list(executor.map(tenant_worker, ['tenant_a', 'tenant_b']))
+
+        assert sessions == [{self.tenants['tenant_a']}, {self.tenants['tenant_b']}]
+
+    def test_unregister_releases_session(self):
+        """ Test that the registry keeps a session alive until it is unregistered """
+        register_session('transient', StandInClientSession('transient'))
+        released = weakref.ref(get_session('transient'))
+        gc.collect()
+        assert released() is not None
+
+        unregister_session('transient')
+        gc.collect()
+        assert released() is None
+
+        with self.assertRaises(IrisClientException):
+            get_session('transient')
+
+
+class ForkTest(unittest.TestCase):
+    """ State of the client inherited by forked children """
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'fork is not available')
+    def test_fork_resets_process_state(self):
+        """ Test that a child forked while other threads hold the locks of the client gets fresh ones, and is
+        detached from the unit of work of its parent """
+        session = StandInClientSession('forked')
+        session_map = identity_map.get_identity_map(session)
+        rate_limiter = RateLimiter(rate=1000)
+        deduplicator = AlertDeduplicator()
+        deduplicator.check({'alert_title': 'Reserved'}, record=False)
+
+        locks = [identity_map._identity_maps_lock, session_map._lock, rate_limiter._lock, deduplicator._lock]
+        held = threading.Event()
+        release = threading.Event()
+
+        def hold_locks():
+            for lock in locks:
+                lock.acquire()
+            held.set()
+            release.wait()
+            for lock in locks:
+                lock.release()
+
+        holder = threading.Thread(target=hold_locks)
+        holder.start()
+        held.wait()
+
+        try:
+            with UnitOfWork(session):
+                pid = os.fork()
+                if pid == 0:
+                    fresh = [identity_map._identity_maps_lock, session_map._lock, rate_limiter._lock,
+                             deduplicator._lock]
+                    ok = current_unit_of_work() is None and \
+                        deduplicator.duplicate_count({'alert_title': 'Reserved'}) == 0 and \
+                        all(lock.acquire(timeout=1) for lock in fresh)
+                    os._exit(0 if ok else 1)
+
+        finally:
+            release.set()
+            holder.join()
+
+        _, status = os.waitpid(pid, 0)
+        assert os.WEXITSTATUS(status) == 0
+
+
+class SessionThreadSafetyTest(StandInServerTest):
+    """ """
+
+    def test_concurrent_requests(self):
+        """ Test that responses are not mixed up when a session is hammered from many threads """
+        def worker(index):
+            mismatches = 0
+            for request in range(REQUESTS_PER_THREAD):
+                token = f'{index}-{request}'
+                if request % 2:
+                    resp = self.session.pi_post(f'stress/{index}', data={'token': token})
+                    mismatches += resp.get_data().get('body') != {'token': token}
+
+                else:
+                    resp = self.session.pi_get(f'stress/{index}', cid=request + 1)
+                    mismatches += resp.get_data().get('query') != {'cid': [str(request + 1)]}
+
+                mismatches += resp.get_data().get('path') != f'/stress/{index}'
+
+            return mismatches
+
+        with ThreadPoolExecutor(max_workers=THREADS) as executor:
+            mismatches = list(executor.map(worker, range(THREADS)))
+
+        assert sum(mismatches) == 0
+
+        trace = self.session.get_trace()
+        for index in range(THREADS):
+            assert f'{self.host}/stress/{index}' in trace
+
+        assert len(self.session._http_sessions) <= THREADS + 1
+
+    def test_close_reopens_connections(self):
+        """ Test that a closed session can still be used """
+        self.session.close()
+        assert len(self.session._http_sessions) == 0
+
+        resp = self.session.pi_get('after/close')
+        assert resp.get_data().get('path') == '/after/close'
+
+    def test_pickle_session(self):
+        """ Test that a session is pickled as its configuration and reconnects on its first request """
+        payload = pickle.dumps(self.session)
+        assert b'http.client' not in payload and b'_thread' not in payload
+
+        session = pickle.loads(payload)
+        assert session._host == self.session._host
+        assert len(session._http_sessions) == 0
+
+        resp = session.pi_get('after/unpickle')
+        assert resp.get_data().get('path') == '/after/unpickle'
+
+    def test_process_pool(self):
+        """ Test that a session can be used from spawned and forked children """
+        self.session.pi_get('warm/up')
+
+        for method in ('spawn', 'fork'):
+            if method not in multiprocessing.get_all_start_methods():
+                continue
+
+            with multiprocessing.get_context(method).Pool(2) as pool:
+                paths = pool.starmap(get_path_in_child, [(self.session, f'child/{index}') for index in range(4)])
+
+            assert paths == [f'/child/{index}' for index in range(4)]
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'fork is not available')
+    def test_fork_resets_connections(self):
+        """ Test that a forked child drops the connections inherited from its parent """
+        self.session.pi_get('warm/up')
+        assert len(self.session._http_sessions) == 1
+
+        pid = os.fork()
+        if pid == 0:
+            ok = len(self.session._http_sessions) == 0 and \
+                self.session.pi_get('forked').get_data().get('path') == '/forked'
+            os._exit(0 if ok else 1)
+
+        _, status = os.waitpid(pid, 0)
+        assert os.WEXITSTATUS(status) == 0
+        assert self.session.pi_get('parent').get_data().get('path') == '/parent'
+
+    def test_coalesce_gets(self):
+        """ Test that identical GET requests issued at once share a single request to the server """
+        StandInHandler.slow_requests = 0
+        barrier = threading.Barrier(THREADS)
+
+        def worker(_):
+            barrier.wait()
+            return self.session.pi_get('slow', cid=1)
+
+        with ThreadPoolExecutor(max_workers=THREADS) as executor:
+            responses = list(executor.map(worker, range(THREADS)))
+
+        assert all(resp.get_data() == {'path': '/slow'} for resp in responses)
+        assert StandInHandler.slow_requests < THREADS / 2
+        assert self.session.coalesced_requests == THREADS - StandInHandler.slow_requests
+
+    def test_coalesce_gets_after_write(self):
+        """ Test that a GET request issued after a write does not share a request sent before it and which the write
+        may affect """
+        StandInHandler.slow_requests = 0
+
+        def wait_for_flights(count):
+            while len(self.session._flights) < count:
+                time.sleep(0.01)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            before = [executor.submit(self.session.pi_get, 'case/ioc/slow', cid=cid) for cid in (1, 2)]
+            wait_for_flights(2)
+
+            assert self.session.pi_post('case/ioc/update/5', data={}, cid=1).is_success()
+            other_case = self.session.pi_get('case/ioc/slow', cid=2)
+            after_write = self.session.pi_get('case/ioc/slow', cid=1)
+
+            assert all(future.result().is_success() for future in before)
+
+        assert after_write.get_data() == {'path': '/case/ioc/slow'}
+        assert other_case.get_data() == {'path': '/case/ioc/slow'}
+        assert StandInHandler.slow_requests == 3
+        assert self.session.coalesced_requests == 1
+
@@ -0,0 +1,150 @@
+#  IRIS Client API Source Code
+#  contact@dfir-iris.org
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU Lesser General Public
+#  License as published by the Free Software Foundation; either
+#  version 3 of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#  Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import unittest
+
+from dfir_iris_client.helper.errors import IrisClientException
+from dfir_iris_client.helper.unit_of_work import PendingResult, UnitOfWork
+from dfir_iris_client.tests.test_iris_object import StandInSession
+
+
+def asset(asset_id: int) -> dict:
+    """Return the server data of an asset """
+    return {'asset_id': asset_id, 'asset_name': f'asset-{asset_id}', 'asset_type_id': 1, 'analysis_status_id': 1,
+            'asset_compromise_status_id': 0, 'asset_description': '', 'asset_tags': ''}
+
+
+class UnitOfWorkTest(unittest.TestCase):
+    """ Recording and flushing of the writes of a unit of work """
+
+    def setUp(self) -> None:
+        """ """
+        self.session = StandInSession({
+            'case/assets/1': asset(1),
+            'case/assets/update/1': asset(1),
+            'case/assets/delete/1': {}
+        })
+
+    def posts(self) -> list:
+        """ """
+        return [(uri, data) for method, uri, _, data in self.session.requests if method == 'POST']
+
+    def test_set_cid_not_recorded(self):
+        """ Test that set_cid and the reads are issued immediately rather than recorded """
+        with UnitOfWork(self.session) as uow:
+            case = uow.case(cid=2)
+            assert case.set_cid(1) is True
+            assert case.get_asset(asset_id=1).is_success()
+            case.update_asset(asset_id=1, description='Patched')
+
+            assert len(uow) == 1
+            assert self.posts() == []
+
+        (uri, body), = self.posts()
+        assert uri == 'case/assets/update/1'
+        assert body['cid'] == 1
+        assert body['asset_description'] == 'Patched'
+
+    def test_pending_results(self):
+        """ Test that recorded calls return a PendingResult holding the response once flushed """
+        with UnitOfWork(self.session) as uow:
+            case = uow.case(cid=1)
+            pending = case.update_asset(asset_id=1, description='Patched')
+            merged = case.update_asset(asset_id=1, tags=['dc'])
+
+            assert isinstance(pending, PendingResult)
+            assert merged is pending
+            assert pending.done() is False
+            with self.assertRaises(IrisClientException):
+                pending.result()
+
+        assert pending.done() is True
+        assert pending.result().is_success()
+        assert len(self.posts()) == 1
+
+    def test_discarded_results(self):
+        """ Test that the PendingResults of operations which are never issued report it """
+        with UnitOfWork(self.session) as uow:
+            case = uow.case(cid=1)
+            update = case.update_asset(asset_id=1, description='Patched')
+            delete = case.delete_asset(asset_id=1)
+
+        assert delete.result().is_success()
+        with self.assertRaises(IrisClientException):
+            update.result()
+
+        uow = UnitOfWork(self.session)
+        with self.assertRaises(ValueError):
+            with uow:
+                discarded = uow.case(cid=1).update_asset(asset_id=1, description='Lost')
+                raise ValueError()
+
+        with self.assertRaises(IrisClientException):
+            discarded.result()
+
+        assert self.posts() == [('case/assets/delete/1', None)]
+
+    def test_updates_merged_by_object(self):
+        """ Test that updates are merged by the ID of the object they write, not by the other IDs they pass """
+        self.session.replies['case/timeline/events/1'] = {'event_id': 1, 'event_title': 'Initial'}
+        self.session.replies['case/timeline/events/update/1'] = {'event_id': 1}
+
+        with UnitOfWork(self.session) as uow:
+            case = uow.case(cid=1)
+            pending = case.update_event(1, title='Moved', parent_event_id=3)
+            assert case.update_event(1, color='red') is pending
+            assert len(uow) == 1
+
+        (uri, body), = self.posts()
+        assert uri == 'case/timeline/events/update/1'
+        assert body['event_title'] == 'Moved'
+        assert body['event_color'] == 'red'
+        assert body['parent_event_id'] == 3
+
+    def test_updates_of_same_object_issued_in_turn(self):
+        """ Test that a save and an update of the same object are not issued concurrently """
+        saved = []
+
+        class SavedAsset(object):
+            object_name = 'asset'
+            id = 1
+            _cid = 1
+
+            def _flush_save(self):
+                saved.append(self)
+
+        uow = UnitOfWork(self.session)
+        uow.case(cid=1).update_asset(asset_id=1, description='Patched')
+        uow.save(SavedAsset())
+        uow.case(cid=1).update_asset(asset_id=2, description='Other')
+
+        steps = uow._plan()
+        assert [[operation.label for operation in step] for step in steps] == [
+            ['update_asset(1)', 'update_asset(2)'], ['save_asset(1)']
+        ]
+
+        uow.flush()
+        assert len(saved) == 1
+        assert [uri for uri, _ in self.posts()] == ['case/assets/update/1']
+
+        uow.case(cid=1).update_asset(asset_id=1, description='Patched')
+        uow.save(SavedAsset())
+        uow.case(cid=1).delete_asset(asset_id=1)
+        assert len(uow) == 1
+
+
+if __name__ == '__main__':
+    unittest.main()
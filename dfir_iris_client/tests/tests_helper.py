@@ -91,7 +91,7 @@ class InitIrisClientTest(unittest.TestCase):
             trace_file = traces_dir / f'{datetime.datetime.now()}.json'
 
             with open(trace_file, 'w') as f:
-                f.write(json.dumps(cls.session._trace, indent=4))
+                f.write(json.dumps(cls.session.get_trace(), indent=4))
 
             print(f'Traces written in {trace_file}')
 
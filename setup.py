@@ -46,5 +46,12 @@ setuptools.setup(
         'requests',
         'packaging',
         'deprecated'
-    ]
+    ],
+     extras_require={
+         'orjson': ['orjson'],
+         'msgspec': ['msgspec'],
+         'ijson': ['ijson'],
+         'pandas': ['pandas'],
+         'arrow': ['pyarrow']
+     }
  )